@@ -1,6 +1,6 @@
 # try:
 from .serial_instrument import SerialInstrument
-from .gds import GDS_scope
+from .gds import GDS_scope, GDS_raw_series
 from .afg import AFG
 from .bridge12 import Bridge12
 from .instrument_control import instrument_control
@@ -8,6 +8,7 @@ from .instrument_control import instrument_control
 __all__ = [
     "SerialInstrument",
     "GDS_scope",
+    "GDS_raw_series",
     "AFG",
     "Bridge12",
     "instrument_control",
@@ -23,6 +24,12 @@ from .gpib_eth import prologix_connection
 from .logobj import logobj
 from .hall_probe import LakeShore475
 from .field_feedback import adjust_main_field, ramp_field
+from .field_calibration import field_calibration
+from .field_lock import field_lock
+from .dip_tracker import dip_tracker
+from .field_sampler import field_sampler
+from .power_ramp import ramp_power, settle_model
+from .tuning_curve_store import tuning_curve_store
 from .genesys import genesys
 from .inst_dict_property import inst_dict_property
 from .shim_current_mapping import ShimDictMapping
@@ -32,12 +39,19 @@ __all__ += [
     "HP8672A",
     "LakeShore475",
     "adjust_main_field",
+    "dip_tracker",
+    "field_calibration",
+    "field_lock",
+    "field_sampler",
     "genesys",
     "gigatronics",
     "inst_dict_property",
     "logobj",
     "prologix_connection",
     "ramp_field",
+    "ramp_power",
+    "settle_model",
+    "tuning_curve_store",
     "ShimDictMapping",
     "channel_property",
 ]
@@ -1,5 +1,8 @@
-from pylab import *
 from pyspecdata import nddata,strm
+from numpy import asarray, ascontiguousarray, frombuffer, int16
+import hashlib
+import json
+import os
 from .serial_instrument import SerialInstrument
 
 import logging
@@ -26,23 +29,38 @@ class AFG_Channel_Properties (object):
         """
         self.ch = ch
         self.afg = afg
+        self.loaded_hash = None # hash (see :func:`AFG.waveform_hash`) of
+        #                         what we last uploaded to the volatile
+        #                         waveform memory of this channel
         return
     def digital_ndarray(self, data, rate=50e6):
         """Take a numpy ndarray `data`, and set it up for AWG output
         Default rate set to 50 MHz
+
+        The (slow) upload is skipped if the waveform memory of the channel
+        already holds the same data, once quantized -- see
+        :attr:`loaded_hash`.
+        The rate doesn't change what's stored, so it's always applied.
         """
-        print("About to output the ndarray...")
-        cmd = ['SOUR%d:DATA:DAC VOLATILE,'%self.ch]
-        cmd += [self.afg.binary_block(data)]
-        self.afg.write(*cmd)
+        data = self.afg.quantize(data)
+        thishash = self.afg.waveform_hash(data)
+        if thishash == self.loaded_hash:
+            logger.debug(
+                "CH%d already holds this waveform, so not uploading" % self.ch
+            )
+        else:
+            print("About to output the ndarray...")
+            self.loaded_hash = None # in case the upload doesn't finish
+            cmd = ["SOUR%d:DATA:DAC VOLATILE," % self.ch]
+            cmd += [self.afg.binary_block(data)]
+            self.afg.write(*cmd)
+            self.loaded_hash = thishash
         print("Initial ndArray frequency set to",rate/len(data))
         self.afg.write('SOUR%d:APPL:USER %+0.7E'%(self.ch, rate/len(data)))
-        self.afg.check_idn()
         self.afg.write('SOUR%d:ARB:OUTP'%self.ch)
-        self.afg.check_idn()
         #self.afg.write('SOUR%d:FUNC USER'%self.ch)
+        self.afg.wait_complete()
         self.freq = rate/len(data)
-        self.afg.check_idn()
         return
     @property
     def freq(self):
@@ -158,7 +176,7 @@ class AFG_Channel_Properties (object):
             self.afg.write('SOUR%d:SWE:STAT ON'%self.ch)
         else:
             self.afg.write('SOUR%d:SWE:STAT OFF'%self.ch)
-        self.afg.check_idn()
+        self.afg.wait_complete()
         return
     
 class AFG (SerialInstrument):
@@ -168,7 +186,14 @@ class AFG (SerialInstrument):
     
     `self[0]` will return self.CH1 and `self[1]` will return self.CH2
     """
-    def __init__(self,model='2225'):
+    waveform_file = None
+
+    def __init__(self,model='2225',waveform_file=None):
+        """If `waveform_file` (a JSON file name) is given, the table of
+        which setup memory holds which waveform (see :attr:`waveform_slots`)
+        is kept there, so that :func:`use_waveform` still works after
+        reconnecting."""
+        self.waveform_file = waveform_file
         super().__init__('AFG-'+model)
         logger.debug(strm("identify from within AFG",super(self.__class__,self).respond('*idn?')))
         logger.debug("I should have just opened the serial connection")
@@ -255,12 +280,31 @@ class AFG (SerialInstrument):
         return      
         ###ALEC 2017-10-06
         
+    def quantize(self,data):
+        """Convert `data` (whose absolute value must be less than 1) to the
+        16 bit integers that are sent to the AFG.
+
+        Data that is already int16 is assumed to be quantized, and is
+        returned as-is."""
+        data = asarray(data)
+        if data.dtype == int16:
+            return data
+        assert (
+            abs(data) < 1.1
+        ).all(), "all data must have absolute value less than 1"
+        return int16(data * 511)
+
+    @staticmethod
+    def waveform_hash(data):
+        """Return a hash of the quantized (see :func:`quantize`) waveform
+        `data` -- two waveforms with the same hash give the same output."""
+        return hashlib.sha1(ascontiguousarray(data).tobytes()).hexdigest()
+
     def binary_block(self,data):
         """Converts array `data` into a binary string of IEE488.2 format
         
         (data is sent as a 16 bit integer)"""
-        assert all(abs(data)<1.1), "all data must have absolute value less than 1"
-        data = int16(data*511).tostring()
+        data = self.quantize(data).tobytes()
         data_len = len(data)
         data_len = str(data_len)
         assert (len(data_len) < 10), "the number describing the data length must be less than ten digits long, but your data length is "+data_len
@@ -276,6 +320,174 @@ class AFG (SerialInstrument):
         self.write('SOUR%d:SWE:TIME %+0.4E'%(ch,time))
         self.demand('SOUR%d:SWE:TIME?'%ch, time)
         return
+    n_slots = 10 # the AFG-2225 has setup memories 0-9
+
+    @property
+    def waveform_slots(self):
+        """A dictionary, keyed by setup memory number, of the waveforms
+        stored with :func:`store_waveform` -- each value is a dictionary
+        giving the `name`, `ch`, `hash`, `rate` and length `n` of the
+        waveform.
+
+        The AFG can't tell us what its memories hold, so this only knows
+        about waveforms stored through this object, or (if
+        `waveform_file` is set) listed in `waveform_file`."""
+        if not hasattr(self, "_waveform_slots"):
+            self._waveform_slots = {}
+            self._verified_slots = set()
+            if self.waveform_file is not None and os.path.exists(
+                self.waveform_file
+            ):
+                with open(self.waveform_file) as fp:
+                    self._waveform_slots = {
+                        int(k): v for k, v in json.load(fp).items()
+                    }
+        return self._waveform_slots
+
+    def _save_waveform_slots(self):
+        "write :attr:`waveform_slots` to `waveform_file`, if it's set"
+        if self.waveform_file is None:
+            return
+        with open(self.waveform_file, "w") as fp:
+            json.dump(self.waveform_slots, fp, indent=1)
+
+    def store_waveform(self,name,data,rate=50e6,ch=1,slot=None):
+        """Store the waveform `data` in one of the AFG's non-volatile setup
+        memories under `name`, so that :func:`use_waveform` can switch to
+        it later without uploading it again.
+
+        The waveform is uploaded to channel `ch` (see
+        :func:`AFG_Channel_Properties.digital_ndarray`), and the setup --
+        which includes the arbitrary waveform -- is saved with ``*SAV``.
+        If the memory used for `name` already holds the same waveform
+        (same hash, channel, and rate), nothing is sent at all.
+
+        Which memory holds which waveform is kept on this object (see
+        :attr:`waveform_slots`), and in `waveform_file` if that's set --
+        otherwise, after reconnecting to the AFG, the library is empty, and
+        each waveform has to be stored again before :func:`use_waveform`
+        can find it.
+
+        Parameters
+        ==========
+
+        name : str
+
+            What you will call the waveform in :func:`use_waveform`.
+
+        slot : int or None
+
+            The setup memory to use.
+            By default, reuse the memory that already holds `name`, or else
+            take the first one that's free.
+
+        Returns
+        =======
+
+        slot : int
+
+            The setup memory that holds the waveform.
+        """
+        data = self.quantize(data)
+        thiswaveform = dict(
+            name=name,
+            ch=ch,
+            hash=self.waveform_hash(data),
+            rate=rate,
+            n=len(data),
+        )
+        slots = self.waveform_slots
+        named = [k for k, v in slots.items() if v["name"] == name]
+        if slot is None:
+            if len(named) > 0:
+                slot = named[0]
+            else:
+                free = [j for j in range(self.n_slots) if j not in slots]
+                if len(free) == 0:
+                    raise ValueError(
+                        "all %d setup memories are in use -- pass slot to"
+                        " overwrite one of them" % self.n_slots
+                    )
+                slot = free[0]
+        elif not 0 <= slot < self.n_slots:
+            raise ValueError("there is no setup memory %d" % slot)
+        if slots.get(slot) == thiswaveform:
+            logger.debug("setup memory %d already holds %s" % (slot, name))
+            return slot
+        for j in named:
+            del slots[j]
+        slots.pop(slot, None) # in case the save doesn't finish
+        self._save_waveform_slots()
+        self[ch-1].digital_ndarray(data, rate=rate)
+        self.save(slot)
+        self.wait_complete()
+        slots[slot] = thiswaveform
+        self._verified_slots.add(slot)
+        self._save_waveform_slots()
+        return slot
+
+    def read_waveform(self,ch,n):
+        """Read back the first `n` points of the waveform memory of channel
+        `ch`, as the (quantized) 16 bit integers that were uploaded."""
+        with self.io_lock:
+            self.write("SOUR%d:DATA:DAC? VOLATILE,0,%d" % (ch, n))
+            data = self.read_block()
+            self.read_binary(1) # the newline that follows the block
+        return frombuffer(data, dtype=int16)
+
+    def write(self,*args):
+        """Send `args` to the AFG (see :func:`SerialInstrument.write`).
+
+        ``*RST`` and ``*RCL`` (so also :func:`reset` and :func:`recall`)
+        replace what's in the waveform memory of both channels, so they
+        clear :attr:`AFG_Channel_Properties.loaded_hash`."""
+        cmd = args[0]
+        cmd = cmd.decode("utf-8") if type(cmd) is bytes else str(cmd)
+        if cmd.strip().upper().startswith(("*RST", "*RCL")):
+            for j in [self.CH1, self.CH2]:
+                j.loaded_hash = None
+        return super().write(*args)
+
+    def use_waveform(self,name):
+        """Switch to the waveform stored as `name` by
+        :func:`store_waveform`, with a single ``*RCL``.
+
+        Note that this recalls the whole setup that was saved with the
+        waveform, for both channels.
+
+        The first time a memory that was only listed in `waveform_file` is
+        recalled, the waveform is read back, to check that it still
+        matches the recorded hash (in case the memory was overwritten from
+        somewhere else) -- if it doesn't, the memory is dropped from the
+        table, and you get a ValueError."""
+        slot = [
+            k for k, v in self.waveform_slots.items() if v["name"] == name
+        ]
+        if len(slot) == 0:
+            raise KeyError(
+                "no waveform called %s has been stored -- use"
+                " store_waveform first" % name
+            )
+        slot = slot[0]
+        thiswaveform = self.waveform_slots[slot]
+        self.recall(slot) # clears loaded_hash on both channels
+        self.wait_complete()
+        if slot not in self._verified_slots:
+            thishash = self.waveform_hash(
+                self.read_waveform(thiswaveform["ch"], thiswaveform["n"])
+            )
+            if thishash != thiswaveform["hash"]:
+                del self.waveform_slots[slot]
+                self._save_waveform_slots()
+                raise ValueError(
+                    "setup memory %d no longer holds %s -- use"
+                    " store_waveform to store it again" % (slot, name)
+                )
+            self._verified_slots.add(slot)
+        # we only know what the channel the waveform was stored from holds
+        self[thiswaveform["ch"] - 1].loaded_hash = thiswaveform["hash"]
+        return
+
     @property
     def CH1(self):
         "Properties of channel 1 (on, burst, etc.) -- given as a :class:`AFG_Channel_Properties` object"
@@ -284,9 +496,11 @@ class AFG (SerialInstrument):
         else:
             self._ch1_class = AFG_Channel_Properties(1,self)
         return self._ch1_class
+
     @CH1.deleter
     def CH1(self):
         del self._ch1_class
+
     @property
     def CH2(self):
         "Properties of channel 2 (on, burst, etc.) -- given as a :class:`AFG_Channel_Properties` object"
@@ -295,6 +509,7 @@ class AFG (SerialInstrument):
         else:
             self._ch2_class = AFG_Channel_Properties(2,self)
         return self._ch2_class
+
     @CH2.deleter
     def CH2(self):
         del self._ch2_class
@@ -8,9 +8,12 @@ from serial.tools.list_ports import comports
 from serial import Serial
 from numpy import r_
 import numpy as np
+from collections import defaultdict, deque
+import threading
 import time
 import logging
 from .log_inst import logger
+from .tuning_curve_store import tuning_curve_store
 
 
 def generate_beep(f, dur):
@@ -18,22 +21,171 @@ def generate_beep(f, dur):
     return
 
 
+def consensus_estimate(values, n, tol, k=3.0):
+    """A robust estimate of the value behind a series of noisy integer
+    readings.
+
+    Readings further than ``k`` (scaled) median absolute deviations, or
+    `tol`, whichever is larger, from the median are rejected as outliers.
+    If at least `n` readings remain, and they spread over no more than
+    `tol`, they are taken to agree.
+
+    Parameters
+    ==========
+    values: list of int
+    n: int
+        How many readings need to agree.
+    tol: int
+        How far apart agreeing readings can be.
+
+    Returns
+    =======
+    retval: tuple or None
+        ``(estimate, uncertainty)`` -- the mean of the readings that agree,
+        and its standard error -- or None if the readings don't agree yet.
+    """
+    values = np.asarray(values, dtype=float)
+    median = np.median(values)
+    mad = 1.4826 * np.median(abs(values - median))
+    inliers = values[abs(values - median) <= max(tol, k * mad)]
+    if len(inliers) < n or inliers.max() - inliers.min() > tol:
+        return None
+    if len(inliers) == 1:
+        return inliers[0], 0.0
+    return inliers.mean(), inliers.std(ddof=1) / np.sqrt(len(inliers))
+
+
+class reply_stream(object):
+    """Reads the lines that come from a serial device continuously, in a
+    background thread, and timestamps them as they arrive.
+
+    Lines are handed out in order by :func:`next_line`, and :func:`mark`
+    skips everything that has arrived so far -- this replaces flushing the
+    input buffer, which could throw away a reply that's on its way.
+    """
+
+    def __init__(self, readline, maxlen=1000):
+        """
+        Parameters
+        ==========
+        readline: function
+            Returns the next line from the device, or whatever part of it
+            arrived before a (short) timeout.
+        maxlen: int
+            The number of lines to hold on to.
+        """
+        self._readline = readline
+        self.lines = deque(maxlen=maxlen)  # (number, time, line)
+        self.n_lines = 0  # number of lines received so far
+        self.cursor = 0  # number of the last line handed out or skipped
+        self.cond = threading.Condition()
+        self._stop = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run, name="Bridge12 reader", daemon=True
+        )
+        self.thread.start()
+
+    def _run(self):
+        partial = b""
+        while not self._stop.is_set():
+            try:
+                partial += self._readline()
+            except Exception as e:
+                # e.g. the port was closed under us
+                logger.debug("Bridge12 reader stopping: " + repr(e))
+                break
+            if partial.endswith(b"\n"):
+                with self.cond:
+                    self.n_lines += 1
+                    self.lines.append((self.n_lines, time.time(), partial))
+                    self.cond.notify_all()
+                partial = b""
+
+    def stop(self):
+        self._stop.set()
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+
+    def mark(self):
+        """skip the lines that have arrived so far"""
+        with self.cond:
+            self.cursor = self.n_lines
+            return self.cursor
+
+    def next_line(self, timeout):
+        """Return the next line that hasn't been handed out or skipped, as
+        a (timestamp, line) tuple, or None if nothing arrives within
+        `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while True:
+                if self.n_lines > self.cursor:
+                    for n, t, line in self.lines:
+                        if n > self.cursor:
+                            self.cursor = n
+                            return t, line
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.cond.wait(remaining)
+
+
 class Bridge12(Serial):
-    def __init__(self, *args, **kwargs):
-        # Grab the port labeled as Arduino (since the Bridge12 microcontroller
-        # is an Arduino)
-        cport = comports()
-        if type(cport) is list and hasattr(cport[0], "device"):
-            portlist = [
-                j.device for j in comports() if "Arduino Due" in j.description
-            ]
+    reply_timeout = 3  # s to wait for a line from the Bridge12
+    # {{{ how :func:`consensus_int` reads each quantity -- `n` readings
+    #     that agree within `tol`, after throwing away `n_burn` readings,
+    #     giving up after `max_reads`
+    consensus_settings = {
+        b"power?\r": dict(n=2, tol=0, max_reads=20),
+        b"txpowerdbm?\r": dict(n=2, tol=0, max_reads=20, n_burn=3),
+        b"rxpowerdbm?\r": dict(n=3, tol=1, max_reads=22),
+    }
+    # }}}
+    # steps (in Hz) up to this size are trusted without reading the frequency
+    # back -- see :func:`set_freq`
+    unverified_freq_step = 1e6
+    freq_settle_time = 10e-3  # s for the synthesizer to settle
+    # if set, a stored 10 dBm tuning curve up to this old (in s) is used by
+    # lock_on_dip, rather than running a new one -- as long as the Rx
+    # around its dip still reads within survey_check_tol (in dB) of what
+    # was stored
+    survey_max_age = None
+    survey_check_tol = 1.0
+
+    # the Bridge12 prints these (in no particular order) as it boots
+    boot_messages = [
+        "MPS Started",
+        "System Ready",
+        "Synthesizer detected",
+        "Power updated",
+    ]
+    _cached_port = None  # (device, hwid) of the Arduino Due we last found
+
+    @classmethod
+    def find_port(cls):
+        """Return the device of the port labeled as Arduino (since the
+        Bridge12 microcontroller is an Arduino).
+
+        The comports are only listed once, and if the port that we found
+        last time is still there (with the same hardware id), it's used
+        without searching for it again."""
+        cport = list(comports())
+        if len(cport) > 0 and hasattr(cport[0], "device"):
+            if cls._cached_port is not None:
+                for j in cport:
+                    if (j.device, j.hwid) == cls._cached_port:
+                        return j.device
+            portlist = [j for j in cport if "Arduino Due" in j.description]
             if len(portlist) == 0:
                 portlist = [
-                    j.device for j in comports() if "2A03:003D" in j.usb_info()
+                    j for j in cport if "2A03:003D" in j.usb_info()
                 ]  # "2A03:003D" stands for Arduino Due Vendor ID:Device ID
-        elif type(next(cport)) is tuple:
+            if len(portlist) == 1:
+                cls._cached_port = (portlist[0].device, portlist[0].hwid)
+            portlist = [j.device for j in portlist]
+        elif len(cport) > 0 and type(cport[0]) is tuple:
             logger.debug("using fallback comport method")
-            portlist = [j[0] for j in comports() if "Arduino Due" in j[1]]
+            portlist = [j[0] for j in cport if "Arduino Due" in j[1]]
         else:
             raise RuntimeError("Not sure how how to grab the USB ports!!!")
         assert len(portlist) == 1, (
@@ -57,12 +209,34 @@ class Bridge12(Serial):
                         j.usb_info(),
                         j.vid,
                     )
-                    for j in comports()
+                    for j in cport
                 ]
             )
         )
-        thisport = portlist[0]
+        return portlist[0]
+
+    def __init__(
+        self, *args, tuning_curve_file=None, survey_max_age=None, **kwargs
+    ):
+        """
+        Parameters
+        ==========
+        tuning_curve_file: str or None
+            If given, every tuning curve is also kept in this HDF5 file (see
+            :class:`tuning_curve_store`).
+        survey_max_age: float or None
+            If given (along with `tuning_curve_file`), :func:`lock_on_dip`
+            reuses a stored 10 dBm curve up to this old (in s), rather than
+            running a new one -- but only if a quick probe around its dip
+            still agrees with it.
+            Only use this if the sample, tube and cavity haven't changed
+            since then!
+        """
+        thisport = self.find_port()
         super().__init__(thisport, timeout=3, baudrate=115200)
+        self._query_lock = threading.RLock()
+        self._history = defaultdict(lambda: deque(maxlen=100))
+        self.start_reader()
         # this number represents the highest possible reasonable value for the
         # Rx power -- it is lowered as we observe the Tx values
         # 1/8/24 updated to give as a 10*dBm value
@@ -73,47 +247,191 @@ class Bridge12(Serial):
         )
         self.frq_sweep_10dBm_has_been_run = False
         self.tuning_curve_data = {}
+        if tuning_curve_file is None:
+            self.tuning_curves = None
+        else:
+            self.tuning_curves = tuning_curve_store(tuning_curve_file)
+        self._trust_stored_survey = True
+        self.survey_max_age = survey_max_age
         self._inside_with_block = False
         self.fit_data = {}
         print("init done")
 
-    def bridge12_wait(self):
-        # time.sleep(5)
-        def look_for(this_str):
-            for j in range(1000):
-                a = self.read_until(
-                    (this_str + "\r\n").encode("utf-8")
-                ).decode("utf-8")
-                time.sleep(0.1)
-                logger.debug("look for " + this_str + " try" + str(j + 1))
-                if this_str in a:
+    def bridge12_wait(self, timeout=60):
+        """Wait for the Bridge12 to boot -- *i.e.* until it has printed all
+        of `boot_messages` (in any order) -- for no more than `timeout`
+        seconds in total."""
+        remaining = list(self.boot_messages)
+        deadline = time.monotonic() + timeout
+        while len(remaining) > 0:
+            reply = self._stream.next_line(max(deadline - time.monotonic(), 0))
+            if reply is None:
+                raise RuntimeError(
+                    "The Bridge12 didn't finish booting within %g s -- it"
+                    " never told me: %s" % (timeout, ", ".join(remaining))
+                )
+            line = reply[1].decode("utf-8", errors="replace")
+            for this_str in list(remaining):
+                if this_str in line:
                     logger.debug("found: " + this_str)
+                    print(this_str)
+                    remaining.remove(this_str)
+        return
+
+    # {{{ all reading goes through a reply_stream
+    def start_reader(self):
+        """Start reading the Bridge12 continuously in the background.
+        From here on, :func:`readline`, :func:`read_until`, and
+        :func:`reset_input_buffer` work on the lines that it collects."""
+        self.timeout = 0.1  # so that the reader notices when it's stopped
+        self._stream = reply_stream(lambda: Serial.read_until(self, b"\n"))
+
+    def close(self):
+        if getattr(self, "_stream", None) is not None:
+            self._stream.stop()
+            self._stream = None
+        super().close()
+
+    def readline(self, size=-1):
+        """the next line from the Bridge12 (empty if nothing arrives within
+        `reply_timeout`)"""
+        if getattr(self, "_stream", None) is None:
+            return super().readline(size)
+        reply = self._stream.next_line(self.reply_timeout)
+        return b"" if reply is None else reply[1]
+
+    def read_until(self, expected=b"\n", size=None):
+        """read lines until one ends with `expected` (or until nothing
+        arrives within `reply_timeout`), and return all of them"""
+        if getattr(self, "_stream", None) is None:
+            return super().read_until(expected, size)
+        retval = b""
+        while not retval.endswith(expected):
+            reply = self._stream.next_line(self.reply_timeout)
+            if reply is None:
+                break
+            retval += reply[1]
+        return retval
+
+    def reset_input_buffer(self):
+        "skip everything that the Bridge12 has sent so far"
+        if getattr(self, "_stream", None) is None:
+            return super().reset_input_buffer()
+        self._stream.mark()
+
+    def int_query(self, cmd, n=1, numtries=10):
+        """Send the query `cmd` `n` times back-to-back (so this costs about
+        one round trip, regardless of `n`), and return the `n` integer
+        replies.
+
+        Anything left over from before, and anything that isn't an integer
+        (*e.g.* the garbage that the MPS spews when you use the front
+        panel) is skipped, rather than flushed.
+        If a reply goes missing, the missing queries are sent again, up to
+        `numtries` times.
+
+        Parameters
+        ----------
+        cmd: bytes
+            Query for the B12.
+        n: int
+            Number of replies to collect.
+
+        Returns
+        -------
+        retval: list of int
+            The replies, in the order that they came in.
+            They're also stored (with their timestamps) for
+            :func:`recent_ints`.
+        """
+        with self._query_lock:
+            self.reset_input_buffer()
+            replies = []
+            for j in range(numtries):
+                for k in range(n - len(replies)):
+                    self.write(cmd)
+                while len(replies) < n:
+                    reply = self._stream.next_line(self.reply_timeout)
+                    if reply is None:
+                        logger.debug("no reply to %r, asking again" % cmd)
+                        break
+                    t, line = reply
+                    try:
+                        replies.append((t, int(line)))
+                    except ValueError:
+                        if line.startswith(b"E001"):
+                            logger.debug("Got error E001, skipping it")
+                        else:
+                            logger.debug("skipping B12 garbage: %r" % line)
+                if len(replies) == n:
                     break
+            else:
+                raise ValueError(
+                    "I tried running %d times and couldn't get %d integers!!!"
+                    % (numtries, n)
+                )
+        self._history[cmd].extend(replies)
+        return [v for t, v in replies]
 
-        look_for("MPS Started")
-        print("MPS Started")
-        look_for("System Ready")
-        print("System Ready")
-        look_for("Synthesizer detected")
-        print("Synthesizer detected")
-        look_for("Power updated")
-        print("Power updated")
-        return
+    def consensus_int(self, cmd):
+        """Read the integer quantity given by the query `cmd` until
+        readings agree -- see :func:`consensus_estimate` and
+        :attr:`consensus_settings` (for the settings used with each query).
+
+        The first `n` readings are requested together, then one more at a
+        time, using the most recent ``2*n`` readings at each step.
+        The number of readings used is logged (at the debug level), so that
+        the settings can be tuned for speed *vs.* robustness.
+
+        Returns
+        -------
+        estimate: float
+            In the units of the Bridge12 (*e.g.* 10*dBm).
+        uncertainty: float
+            Standard error of `estimate`.
+        """
+        settings = dict(n_burn=0, k=3.0)
+        settings.update(self.consensus_settings[cmd])
+        n = settings["n"]
+        values = self.int_query(cmd, n=settings["n_burn"] + n)[
+            settings["n_burn"] :
+        ]
+        n_reads = len(values)
+        while True:
+            retval = consensus_estimate(
+                values[-2 * n :], n, settings["tol"], k=settings["k"]
+            )
+            if retval is not None:
+                logger.debug(
+                    "%r: %g +/- %g from %d readings"
+                    % (cmd, retval[0], retval[1], n_reads)
+                )
+                return retval
+            if n_reads >= settings["max_reads"]:
+                raise ValueError(
+                    "I tried %d times to grab a consistent value for %r, and"
+                    " could not (most recent %s)"
+                    % (n_reads, cmd, values[-2 * n :])
+                )
+            values += self.int_query(cmd)
+            n_reads += 1
+
+    def recent_ints(self, cmd, max_age=1.0):
+        """the integer replies to `cmd` that arrived within the last
+        `max_age` seconds, oldest first"""
+        oldest = time.time() - max_age
+        return [v for t, v in self._history[cmd] if t > oldest]
+
+    # }}}
 
     def help(self):
         self.write(b"help\r")  # command for "help"
         logger.info("after help:")
-        entire_response = ""
-        start = time.time()
-        entire_response += self.readline()
-        time_to_read_a_line = time.time() - start
-        grab_more_lines = True
-        while grab_more_lines:
-            time.sleep(3 * time_to_read_a_line)
-            more = self.read_all()
+        entire_response = b""
+        more = self.readline()
+        while len(more) > 0:
             entire_response += more
-            if len(more) == 0:
-                grab_more_lines = False
+            more = self.readline()
         logger.info(repr(entire_response))
 
     def wgstatus_int_singletry(self):
@@ -121,8 +439,7 @@ class Bridge12(Serial):
 
     def wgstatus_int(self):
         "need two consecutive responses that match"
-        c = self.wgstatus_int_singletry()
-        d = self.wgstatus_int_singletry()
+        c, d = self.int_query(b"wgstatus?\r", n=2)
         while c != d:
             c = d
             d = self.wgstatus_int_singletry()
@@ -158,8 +475,7 @@ class Bridge12(Serial):
 
     def ampstatus_int(self):
         "need two consecutive responses that match"
-        a = self.ampstatus_int_singletry()
-        b = self.ampstatus_int_singletry()
+        a, b = self.int_query(b"ampstatus?\r", n=2)
         while a != b:
             a = b
             b = self.ampstatus_int_singletry()
@@ -192,8 +508,7 @@ class Bridge12(Serial):
 
     def rfstatus_int(self):
         "need two consecutive responses that match"
-        f = self.rfstatus_int_singletry()
-        g = self.rfstatus_int_singletry()
+        f, g = self.int_query(b"rfstatus?\r", n=2)
         while f != g:
             f = g
             g = self.rfstatus_int_singletry()
@@ -227,13 +542,8 @@ class Bridge12(Serial):
         return self.power_int() / 10
 
     def power_int(self):
-        "need two consecutive responses that match"
-        h = self.power_int_singletry()
-        i = self.power_int_singletry()
-        while h != i:
-            h = i
-            i = self.power_int_singletry()
-        return h
+        "need responses that match -- see :func:`consensus_int`"
+        return int(round(self.consensus_int(b"power?\r")[0]))
 
     def calit_power(self, dBm):
         """This bypasses all safeties of the bridge12 and is to be used ONLY
@@ -317,51 +627,34 @@ class Bridge12(Serial):
             "dBm" % (setting, result)
         )
 
-    def rxpowerdbm_float(self):
-        """read the integer value for the Rx power -- loops three times to
-        check a consistent Rx is being read.
+    def rxpowerdbm_float(self, return_uncertainty=False):
+        """read the Rx power (in dBm) -- reads until a consistent Rx is
+        being read (see :func:`consensus_int`).
 
-        If all three tries are above safe_rx_level_int, triggers a safety
+        If the result is above safe_rx_level_int, triggers a safety
         interlock.
-        """
-        self.reset_input_buffer()
 
-        def grab_consist_value():
-            rx_try1 = self.robust_int_response(b"rxpowerdbm?\r")
-            rx_try2 = self.robust_int_response(b"rxpowerdbm?\r")
-            for j in range(20):
-                rx_try3 = self.robust_int_response(b"rxpowerdbm?\r")
-                if (
-                    abs(rx_try1 - rx_try2) < 2
-                    and abs(rx_try2 - rx_try3) < 2
-                    and abs(rx_try3 - rx_try1) < 2
-                ):
-                    return (rx_try1 + rx_try2 + rx_try3) / 3.0
-                else:
-                    rx_try1, rx_try2 = rx_try2, rx_try3
-            raise ValueError(
-                "I tried 20 times to grab a consistent power, and could not"
-                " (most recent %f, %f, %f)" % (rx_try1, rx_try2, rx_try3)
-            )
-
-        retval = grab_consist_value()
+        If `return_uncertainty` is set, return the standard error as well.
+        """
+        retval, err = self.consensus_int(b"rxpowerdbm?\r")
         assert retval < self.safe_rx_level_int, "safety interlock triggered"
-        return retval / 10.0  # above is in units of 10*dBm, return as dBm
+        # above is in units of 10*dBm, return as dBm
+        if return_uncertainty:
+            return retval / 10.0, err / 10.0
+        return retval / 10.0
 
     def txpowerdbm_int_singletry(self):
         return self.robust_int_response(b"txpowerdbm?\r")
 
-    def txpowerdbm_float(self):
-        "need two consecutive responses that match"
-        for j in range(3):
-            # burn a few measurements
-            self.txpowerdbm_int_singletry()
-        h = self.txpowerdbm_int_singletry()
-        i = self.txpowerdbm_int_singletry()
-        while h != i:
-            h = self.txpowerdbm_int_singletry()
-            i = self.txpowerdbm_int_singletry()
-        return float(h) / 10.0
+    def txpowerdbm_float(self, return_uncertainty=False):
+        """need responses that match -- see :func:`consensus_int`
+
+        If `return_uncertainty` is set, return the standard error as well.
+        """
+        retval, err = self.consensus_int(b"txpowerdbm?\r")
+        if return_uncertainty:
+            return retval / 10.0, err / 10.0
+        return retval / 10.0
 
     def calib_set_freq(self, Hz):
         """Use only for setting frequency of the Bridge12 for calibration
@@ -369,7 +662,7 @@ class Bridge12(Serial):
         setting = int(Hz / 1e3 + 0.5)
         self.write(b"freq %d\r" % (setting))
 
-    def set_freq(self, Hz):
+    def set_freq(self, Hz, verify=True):
         """set frequency
 
         Parameters
@@ -378,6 +671,11 @@ class Bridge12(Serial):
             gives the connection
         Hz: float
             frequency values -- give a Hz as a floating point number
+        verify: bool
+            Read the frequency back to check it.
+            If False, trust the command, and just wait for the synthesizer
+            to settle (only sensible for small steps -- see
+            :func:`freq_step_is_small`).
         """
         if hasattr(self, "freq_bounds"):
             assert Hz >= self.freq_bounds[0], (
@@ -390,6 +688,10 @@ class Bridge12(Serial):
             )
         setting = int(Hz / 1e3 + 0.5)
         self.write(b"freq %d\r" % (setting))
+        self._freq_setting = setting
+        if not verify:
+            time.sleep(self.freq_settle_time)
+            return
         if self.freq_int() != setting:
             for j in range(10):
                 result = self.freq_int()
@@ -401,6 +703,14 @@ class Bridge12(Serial):
                 % (result, setting)
             )
 
+    def freq_step_is_small(self, Hz):
+        """is `Hz` within `unverified_freq_step` of the last frequency that
+        was set?"""
+        return (
+            hasattr(self, "_freq_setting")
+            and abs(Hz - self._freq_setting * 1e3) <= self.unverified_freq_step
+        )
+
     def get_freq(self):
         return self.freq_int() * 1e3
 
@@ -409,19 +719,17 @@ class Bridge12(Serial):
         return self.robust_int_response(b"freq?\r")
 
     def robust_int_response(self, cmd, numtries=10):
-        """Flushes the buffer and sends the command/query to the B12 and looks
-        for a response that it can interpret as an integer.
+        """Sends the command/query to the B12 and looks for a response that
+        it can interpret as an integer.
 
-        Importantly, it ensures that the returned message is an
-        integer and if not (implying there is junk left over in the
-        buffer), it resets the input buffer and asks again until an
-        integer value is received
+        Importantly, it ensures that the returned message is an integer --
+        anything else (*e.g.* junk from the front panel) is skipped (see
+        :func:`int_query`).
 
         Parameters
         ----------
-        cmd: str
-            Query for the B12.  The routine handles encoding, so this is a
-            normal string.
+        cmd: bytes
+            Query for the B12.
         numtries: int
             How many times should I try to get a sane response?
 
@@ -430,46 +738,7 @@ class Bridge12(Serial):
         retval: int
             The value that the B12 responded with.
         """
-        if self.in_waiting > 0:
-            temp = self.read(self.in_waiting)
-            print("WARNING, I found junk in the buffer:", temp)
-        self.reset_input_buffer()
-        for j in range(10):
-            success = False
-            self.write(cmd)
-            retval = self.readline()
-            if retval.startswith(b"E001"):
-                print("Got error E001, trying again")
-            elif len(retval) == 0:
-                print("Got an empty string")
-            else:
-                try:
-                    retval = int(retval)
-                    success = True
-                except Exception:
-                    print(
-                        "WARNING (robust try",
-                        j,
-                        '): B12 is spewing garbage!!: "'
-                        + retval.decode()
-                        + '"',
-                    )
-            if success:
-                return retval
-            else:
-                self.reset_input_buffer()  # we want to be able to change the
-                #                            power using the MPS front panel,
-                #                            and when we do this, the MPS likes
-                #                            to spew garbage
-                #                            NOTE: I can check for stuff by
-                #                                  looking at in_waiting, but I
-                #                                  need to remember that it
-                #                                  takes time after a write
-                #                                  command for stuff to move
-                #                                  into the buffer
-        raise ValueError(
-            "I tried running 10 times and couldn't get an integer!!!"
-        )
+        return self.int_query(cmd, numtries=numtries)[0]
 
     def freq_sweep(self, freq, dummy_readings=1, fast_run=False):
         """Sweep over an array of frequencies.
@@ -499,12 +768,7 @@ class Bridge12(Serial):
         )  # change to the screen that shows the reflection
         rxvalues = np.zeros(len(freq))
         txvalues = np.zeros(len(freq))
-        if not self.frq_sweep_10dBm_has_been_run:
-            if self.cur_pwr_int != 100:
-                raise ValueError(
-                    "You must run the frequency sweep for the first time at"
-                    " 10 dBm"
-                )
+        self._check_first_sweep()
         # FREQUENCY AND RXPOWER SWEEP
         for j in range(dummy_readings):
             print("*** *** ***")
@@ -524,6 +788,18 @@ class Bridge12(Serial):
             self.set_freq(f)  # is this what I would put here (the 'f')?
             rxvalues[j] = self.rxpowerdbm_float()
             txvalues[j] = self.txpowerdbm_float()
+        self._store_tuning_curve(freq, rxvalues, txvalues)
+        return rxvalues, txvalues
+
+    def _check_first_sweep(self):
+        if not self.frq_sweep_10dBm_has_been_run:
+            if self.cur_pwr_int != 100:
+                raise ValueError(
+                    "You must run the frequency sweep for the first time at"
+                    " 10 dBm"
+                )
+
+    def _store_tuning_curve(self, freq, rxvalues, txvalues):
         if self.cur_pwr_int == 100:
             self.frq_sweep_10dBm_has_been_run = True
             # reset the safe rx level to the top of the tuning curve at 10 dBm
@@ -534,7 +810,141 @@ class Bridge12(Serial):
         self.tuning_curve_data[sweep_name + "_rx"] = rxvalues
         self.tuning_curve_data[sweep_name + "_freq"] = freq
         self.last_sweep_name = sweep_name
-        return rxvalues, txvalues
+        if self.tuning_curves is not None:
+            self.tuning_curves.add(
+                freq, rxvalues, txvalues, self.cur_pwr_int / 10.0
+            )
+
+    def _load_stored_survey(self, freq):
+        """If the tuning curve store holds a 10 dBm curve that covers the
+        frequencies `freq` (that we would otherwise sweep), and that's no
+        older than `survey_max_age`, use it as the 10 dBm curve -- as long as
+        the Rx around its dip still agrees with it (see
+        :func:`_survey_still_matches`).
+        If `survey_max_age` isn't set, stored curves are never used.
+
+        Note that the range that's checked is that of `freq` itself --
+        *e.g.* ``r_[9.81e9:9.83e9:0.5e6]`` stops at 9.8295 GHz.
+
+        Returns
+        =======
+        found: bool
+        """
+        if (
+            self.tuning_curves is None
+            or not self.survey_max_age
+            or not self._trust_stored_survey
+        ):
+            return False
+        freq_range = (min(freq), max(freq))
+        curve = self.tuning_curves.latest(
+            10.0, freq_range=freq_range, max_age=self.survey_max_age
+        )
+        if curve is None or not self._survey_still_matches(curve):
+            return False
+        logger.info(
+            "Using the 10 dBm run from %s"
+            % time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(curve["time"]))
+        )
+        mask = (curve["freq"] >= freq_range[0]) & (
+            curve["freq"] <= freq_range[1]
+        )
+        for j in ["rx", "tx", "freq"]:
+            self.tuning_curve_data["10dBm_" + j] = curve[j][mask]
+        self.last_sweep_name = "10dBm"
+        self.frq_sweep_10dBm_has_been_run = True
+        return True
+
+    def _survey_still_matches(self, curve):
+        """Read the Rx (at 10 dBm) at the dip of a stored tuning curve, and
+        two points to either side of it, and check that they agree with
+        the stored values to within `survey_check_tol`.
+
+        Returns
+        =======
+        matches: bool
+        """
+        j = np.argmin(curve["rx"])
+        idx = np.unique(np.clip(r_[j - 2, j, j + 2], 0, len(curve["rx"]) - 1))
+        rx = np.empty(len(idx))
+        for k, f in enumerate(curve["freq"][idx]):
+            self.set_freq(f)
+            rx[k] = self.rxpowerdbm_float()
+        discrepancy = abs(rx - curve["rx"][idx]).max()
+        if discrepancy > self.survey_check_tol:
+            logger.info(
+                "The stored 10 dBm run is %0.1f dB off from the Rx around its"
+                " dip now, so I'm not using it" % discrepancy
+            )
+            return False
+        return True
+
+    def adaptive_freq_sweep(self, freq, n_refine=8, read_tx=False):
+        """A faster alternative to :func:`freq_sweep`: after a coarse pass
+        over `freq`, concentrate points around the minimum of the Rx (the
+        dip) with a golden-section search.
+
+        Compared to :func:`freq_sweep`, it also skips the Tx reads (unless
+        `read_tx` is set), and doesn't read back frequencies that are
+        within `unverified_freq_step` of the previous one (see
+        :func:`set_freq`).
+        The same restrictions apply (**must** be run at 10 dBm the first
+        time around), and the result is stored in the same way.
+
+        Parameters
+        ==========
+        freq: array of floats
+            frequencies in Hz for the coarse pass
+        n_refine: int
+            number of points to add around the minimum
+
+        Returns
+        =======
+        freq: array
+            The frequencies (rounded to the kHz that the Bridge12 actually
+            uses) where Rx was read, in order.
+        rxvalues: array
+        txvalues: array
+            (nan if `read_tx` isn't set)
+        """
+        self.write(b"screen 2\r")
+        self._check_first_sweep()
+        points = {}
+
+        def measure(f):
+            f = int(f / 1e3 + 0.5) * 1e3
+            if f not in points:
+                self.set_freq(f, verify=not self.freq_step_is_small(f))
+                points[f] = (
+                    self.rxpowerdbm_float(),
+                    self.txpowerdbm_float() if read_tx else np.nan,
+                )
+            return points[f][0]
+
+        coarse = [measure(f) for f in freq]
+        # {{{ golden-section search, bracketed by the neighbors of the
+        #     lowest point of the coarse pass
+        j = int(np.argmin(coarse))
+        a, b = freq[max(j - 1, 0)], freq[min(j + 1, len(freq) - 1)]
+        invphi = (np.sqrt(5) - 1) / 2
+        c, d = b - invphi * (b - a), a + invphi * (b - a)
+        rx_c, rx_d = measure(c), measure(d)
+        for j in range(n_refine - 2):
+            if b - a < 2e3:
+                break  # the Bridge12 only sets whole kHz
+            if rx_c < rx_d:
+                b, d, rx_d = d, c, rx_c
+                c = b - invphi * (b - a)
+                rx_c = measure(c)
+            else:
+                a, c, rx_c = c, d, rx_d
+                d = a + invphi * (b - a)
+                rx_d = measure(d)
+        # }}}
+        freq = np.array(sorted(points.keys()))
+        rxvalues, txvalues = np.array([points[f] for f in freq]).T
+        self._store_tuning_curve(freq, rxvalues, txvalues)
+        return freq, rxvalues, txvalues
 
     def lock_on_dip(
         self,
@@ -542,9 +952,17 @@ class Bridge12(Serial):
         ini_step=0.5e6,  # should be half 3 dB width for Q=10,000
         dBm_increment=3,
         n_freq_steps=15,
+        adaptive=True,
     ):
         """
-        1.  Retrieves the 10 dBm if it has been run, or runs one if it has not.
+        By default, every sweep here (and in :func:`zoom`) is an
+        :func:`adaptive_freq_sweep` -- the same grid, plus a few points
+        concentrated on the minimum, without the Tx reads.
+        Pass ``adaptive=False`` to get the old behavior, where every sweep
+        is a :func:`freq_sweep` over an evenly spaced grid.
+
+        1.  Retrieves the 10 dBm if it has been run (or if a recent one is
+            stored -- see `tuning_curve_file`), or runs one if it has not.
         2.  Makes sure that the first point of the tuning curve gives a
             reflection that's high enough (i.e. that we're not starting in the
             middle of the dip)
@@ -570,9 +988,12 @@ class Bridge12(Serial):
                     + "ini step: "
                     + str(ini_step)
                 )
-                logger.info("Did not find previous 10 dBm run, running now")
                 self.set_power(10.0)
-                rx, tx = self.freq_sweep(freq)
+                if not self._load_stored_survey(freq):
+                    logger.info(
+                        "Did not find previous 10 dBm run, running now"
+                    )
+                    self._dip_sweep(freq, adaptive)
             rx_dBm, freq = [
                 self.tuning_curve_data["%gdBm_%s" % (10.0, j)]
                 for j in ["rx", "freq"]
@@ -601,6 +1022,7 @@ class Bridge12(Serial):
                     self.frq_sweep_10dBm_has_been_run = (
                         False  # we don't trust the 10dBm guy that was run
                     )
+                    self._trust_stored_survey = False
                 else:
                     self.set_rf(False)
                     self.set_wg(False)
@@ -609,9 +1031,9 @@ class Bridge12(Serial):
                         " lower than the rx_dBm of the dip, which doesn't make"
                         " sense -- check %gdBm_%s" % (10.0, rx_dBm)
                     )
-        assert self.frq_sweep_10dBm_has_been_run, (
-            "I should have run the 10 dBm curve -- not sure what happened"
-        )
+        assert (
+            self.frq_sweep_10dBm_has_been_run
+        ), "I should have run the 10 dBm curve -- not sure what happened"
         over_diff = r_[
             0, np.diff(np.int32(over_bool))
         ]  # should indicate whether this position has lifted over (+1) or
@@ -649,10 +1071,31 @@ class Bridge12(Serial):
         print("*** *** *** *** ***")
         print(freq_axis)
         print("*** *** *** *** ***")
-        rx_dBm, tx = self.freq_sweep(freq_axis, fast_run=True)
-        return self.zoom(dBm_increment=2, n_freq_steps=n_freq_steps)
+        self._dip_sweep(freq_axis, adaptive)
+        return self.zoom(
+            dBm_increment=2, n_freq_steps=n_freq_steps, adaptive=adaptive
+        )
 
-    def zoom(self, dBm_increment=2, n_freq_steps=15):
+    def _dip_sweep(self, freq, adaptive):
+        """Sweep over `freq` with :func:`adaptive_freq_sweep` (if `adaptive`)
+        or :func:`freq_sweep`.
+
+        Returns
+        =======
+        freq: array
+            where the Rx was actually read
+        rx: array
+        tx: array
+            (nan if `adaptive`)
+        """
+        if adaptive:
+            return self.adaptive_freq_sweep(freq)
+        # with the new time constant added for freq_sweep, should we eliminate
+        # fast_run?
+        rx, tx = self.freq_sweep(freq, fast_run=True)
+        return freq, rx, tx
+
+    def zoom(self, dBm_increment=2, n_freq_steps=15, adaptive=True):
         """
         1.  Pull the last frequency sweep that was run, and fit it to a 2^nd^
             order polynomial:
@@ -672,6 +1115,8 @@ class Bridge12(Serial):
             profile corresponding to approximately `safe_rx`, falling to a
             minimum reflection at `min_f`, and rise back to approximately
             `safe_rx`**
+            This is an :func:`adaptive_freq_sweep`, with `n_freq_steps`
+            points in the coarse pass, unless `adaptive` is False.
 
         Return
         ======
@@ -680,7 +1125,7 @@ class Bridge12(Serial):
             power + dBm_increment
         tx: array
             the tx readings of the zoomed frequency sweep conducted at current
-            power + dBm_increment
+            power + dBm_increment (nan if `adaptive`)
         min_f: float
             the frequency at which the zoomed frequency sweep is minimized
         """
@@ -749,9 +1194,7 @@ class Bridge12(Serial):
         # {{{ run the frequency sweep with the new limits
         freq = np.linspace(start_f, stop_f, n_freq_steps)
         self.set_power(dBm_increment + self.cur_pwr_int / 10.0)
-        # with the new time constant added for freq_sweep, should we eliminate
-        # fast_run?
-        rx, tx = self.freq_sweep(freq, fast_run=True)
+        freq, rx, tx = self._dip_sweep(freq, adaptive)
         # }}}
         min_f = freq[rx.argmin()]
         if abs(center - min_f) > 0.2e6:
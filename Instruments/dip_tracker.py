@@ -0,0 +1,192 @@
+from collections import deque
+import logging
+import numpy as np
+from numpy import r_
+import time
+
+
+class dip_tracker(object):
+    """Follow the microwave resonance (the dip in the Rx of the Bridge12) as
+    it drifts (*e.g.* with temperature), rather than re-running full
+    frequency sweeps.
+
+    Each :func:`step` probes the Rx at the current center and `delta` to
+    either side, fits a parabola through the three points, and moves the
+    center to the vertex -- by no more than `max_step`, and no further than
+    `max_drift` from where it started (or outside ``b12.freq_bounds``).
+    Near the ends of ``b12.freq_bounds``, the three points are slid inward,
+    so that none of them lies outside.
+
+    Each step has the Bridge12 to itself, so it's meant to be run from the
+    idle loop of whatever is in charge of the Bridge12 (the instrument
+    control server, or the timer of the tuning GUI), through
+    :func:`step_if_due`.
+    Since probing moves the microwave frequency, tracking should be held
+    (:func:`hold`) while a scan is acquiring.
+    If a step fails, tracking stops (see `stopped`), rather than the error
+    taking down the idle loop.
+    """
+
+    def __init__(
+        self,
+        b12,
+        center=None,
+        interval=10.0,
+        delta=0.2e6,
+        max_step=0.1e6,
+        max_drift=2e6,
+        recenter=True,
+        history_len=10000,
+    ):
+        """
+        Parameters
+        ----------
+        b12 : Bridge12
+        center : float
+            Where the dip is now, in Hz.
+            By default, the current frequency of the Bridge12.
+        interval : float
+            Seconds between steps, for :func:`step_if_due`.
+        delta : float
+            How far (in Hz) to either side of the center to probe.
+            Keep this well inside the dip, since the Rx (and therefore
+            the reflected power) rises away from the center.
+        max_step : float
+            The largest move (in Hz) of the center in one step.
+        max_drift : float
+            The furthest (in Hz) that the center can move from where it
+            started.
+        recenter : bool
+            Leave the Bridge12 at the new center after each step.
+            If False, only track the dip, and return to the starting
+            frequency after each step.
+        """
+        self.b12 = b12
+        if center is None:
+            center = b12.get_freq()
+        self.center = center
+        self.start_center = center
+        self.interval = interval
+        self.delta = delta
+        self.max_step = max_step
+        self.max_drift = max_drift
+        self.recenter = recenter
+        self.history = deque(maxlen=history_len)  # (time, center, Rx)
+        self.last_step = -np.inf
+        self.held = False
+        self.stopped = False
+
+    def hold(self):
+        "stop probing (*e.g.* during an acquisition), until resumed"
+        self.held = True
+
+    def resume(self):
+        "start probing again, an `interval` from now"
+        self.held = False
+        self.last_step = time.monotonic()
+
+    @property
+    def bounds(self):
+        "the range (in Hz) that the center is allowed to move in"
+        lower = self.start_center - self.max_drift
+        upper = self.start_center + self.max_drift
+        if hasattr(self.b12, "freq_bounds"):
+            lower = max(lower, self.b12.freq_bounds[0])
+            upper = min(upper, self.b12.freq_bounds[1])
+        return lower, upper
+
+    @property
+    def drift(self):
+        "how far (in Hz) the center has moved since tracking started"
+        return self.center - self.start_center
+
+    @property
+    def history_array(self):
+        """the history as a structured array, with fields time, center (in
+        Hz), and Rx (in dBm, read at the center)"""
+        return np.array(
+            list(self.history),
+            dtype=[("time", "f8"), ("center", "f8"), ("Rx", "f8")],
+        )
+
+    def probe(self):
+        """Read the Rx at the center, and `delta` to either side.
+
+        Returns
+        -------
+        freq : ndarray
+        rx : ndarray
+            In dBm.
+        """
+        lowest = self.center - self.delta
+        if hasattr(self.b12, "freq_bounds"):
+            # slide the points inside the range of the Bridge12
+            lowest = min(lowest, self.b12.freq_bounds[1] - 2 * self.delta)
+            lowest = max(lowest, self.b12.freq_bounds[0])
+        freq = lowest + r_[0, 1, 2] * self.delta
+        rx = np.empty(len(freq))
+        for j, f in enumerate(freq):
+            self.b12.set_freq(f, verify=not self.b12.freq_step_is_small(f))
+            rx[j] = self.b12.rxpowerdbm_float()
+        return freq, rx
+
+    def step(self):
+        """probe the dip, move the center, and record it in the history
+
+        Returns
+        -------
+        center : float
+            The new center, in Hz.
+        """
+        freq, rx = self.probe()
+        # the parabola through the three points, about the center
+        curvature, slope, offset = np.polyfit(freq - self.center, rx, 2)
+        if curvature > 0:
+            shift = -slope / 2 / curvature  # its vertex
+        else:
+            # we're not inside the dip, so head downhill
+            logging.warning(
+                "the Rx around %0.6f GHz isn't a dip (%s dBm)"
+                % (self.center / 1e9, rx)
+            )
+            shift = self.max_step if rx[2] < rx[0] else -self.max_step
+        shift = np.clip(shift, -self.max_step, self.max_step)
+        lower, upper = self.bounds
+        new_center = self.center + shift
+        if not lower <= new_center <= upper:
+            logging.warning(
+                "the dip seems to be moving to %0.6f GHz, but I'm only"
+                " allowed to track it between %0.6f and %0.6f GHz"
+                % (new_center / 1e9, lower / 1e9, upper / 1e9)
+            )
+            new_center = np.clip(new_center, lower, upper)
+        self.center = int(new_center / 1e3 + 0.5) * 1e3
+        self.b12.set_freq(self.center if self.recenter else self.start_center)
+        self.history.append(
+            (time.time(), self.center, rx[np.argmin(abs(freq - self.center))])
+        )
+        self.last_step = time.monotonic()
+        return self.center
+
+    def step_if_due(self):
+        """run :func:`step` if `interval` has passed since the last one, and
+        tracking isn't held or stopped
+
+        If the step fails, the error is logged, and tracking stops.
+
+        Returns
+        -------
+        center : float or None
+            The new center, or None if no step was run.
+        """
+        if self.held or self.stopped:
+            return None
+        if time.monotonic() - self.last_step >= self.interval:
+            try:
+                return self.step()
+            except Exception:
+                logging.exception(
+                    "probing the dip failed, so I've stopped tracking it"
+                )
+                self.stopped = True
+        return None
@@ -0,0 +1,108 @@
+import h5py
+import numpy as np
+import os
+import time
+
+default_filename = os.path.join(
+    os.path.expanduser("~"), "field_calibration.h5"
+)
+
+
+class field_calibration(object):
+    """Keeps the magnet current and Z0 shim voltage that gave each field
+    that :func:`ramp_field` successfully settled at, in an HDF5 file, so
+    that the next ramp can start from an interpolated current rather than
+    from a single A/G ratio learned at some other field.
+
+    The file holds a single ``table`` with fields ``time``, ``field``
+    (in G), ``current`` (in A), and ``Z0`` (in V).
+    The file is only opened while it's being read or written.
+    """
+
+    table_dtype = np.dtype(
+        [("time", "f8"), ("field", "f8"), ("current", "f8"), ("Z0", "f8")]
+    )
+
+    def __init__(self, filename=default_filename, merge_G=0.5):
+        """
+        Parameters
+        ----------
+        merge_G : float
+            Points closer than this (in G) are treated as the same field,
+            and only the most recent one is used.
+        """
+        self.filename = filename
+        self.merge_G = merge_G
+
+    def add(self, field_G, current_A, Z0_V, timestamp=None):
+        "record a field that we settled at"
+        if timestamp is None:
+            timestamp = time.time()
+        with h5py.File(self.filename, "a") as f:
+            if "table" not in f:
+                f.create_dataset(
+                    "table",
+                    shape=(0,),
+                    maxshape=(None,),
+                    dtype=self.table_dtype,
+                )
+            table = f["table"]
+            table.resize((len(table) + 1,))
+            table[-1] = (timestamp, field_G, current_A, Z0_V)
+
+    @property
+    def table(self):
+        "every point that was recorded, as a structured array"
+        if not os.path.exists(self.filename):
+            return np.zeros(0, dtype=self.table_dtype)
+        with h5py.File(self.filename, "r") as f:
+            if "table" not in f:
+                return np.zeros(0, dtype=self.table_dtype)
+            return f["table"][:]
+
+    @property
+    def points(self):
+        """the most recent point for each field (see `merge_G`), sorted by
+        field"""
+        table = self.table
+        table = table[np.argsort(table["time"])[::-1]]
+        keep = []
+        for j, row in enumerate(table):
+            if all(
+                abs(row["field"] - table[k]["field"]) >= self.merge_G
+                for k in keep
+            ):
+                keep.append(j)
+        retval = table[keep]
+        return retval[np.argsort(retval["field"])]
+
+    def __len__(self):
+        return len(self.table)
+
+    def lookup(self, field_G):
+        """The current and Z0 voltage that should give `field_G`.
+
+        Between recorded fields, both are interpolated linearly.
+        Outside of them, the current is scaled from the nearest point, with
+        the same A/G ratio, and the Z0 voltage is that of the nearest point.
+
+        Returns
+        -------
+        current_A : float
+        Z0_V : float
+        """
+        points = self.points
+        if len(points) == 0:
+            raise ValueError(
+                f"There are no calibration points in {self.filename}"
+            )
+        if points["field"][0] <= field_G <= points["field"][-1]:
+            return (
+                np.interp(field_G, points["field"], points["current"]),
+                np.interp(field_G, points["field"], points["Z0"]),
+            )
+        nearest = points[np.argmin(abs(points["field"] - field_G))]
+        return (
+            nearest["current"] / nearest["field"] * field_G,
+            nearest["Z0"],
+        )
@@ -1,4 +1,6 @@
+from collections import deque
 from pyspecdata import strm
+from statistics import NormalDist
 import logging
 import numpy as np
 import time
@@ -19,7 +21,8 @@ def adjust_main_field(B0_des_G, config_dict, h, gen):
     config_dict : dict
         Configuration dictionary containing 'current_v_field_A_G' parameter.
     h : object
-        LakeShore Hall sensor instance.
+        LakeShore Hall sensor instance, or a field_sampler wrapped around
+        it.
     gen : object
         Genesys power supply instance with I_limit property.
     """
@@ -38,6 +41,283 @@ def adjust_main_field(B0_des_G, config_dict, h, gen):
     gen.I_limit = I_setting
 
 
+class settle_detector(object):
+    """Decide whether the field has settled from the statistics of the last
+    `n` readings, rather than by counting consecutive readings that fall
+    within tolerance.
+
+    A straight line is fit to the readings in the window, and, with
+    `confidence`:
+
+    - the drift of the line over the window must be within `tol_G`, and
+    - if there is a `target_G`, the mean must be within `tol_G` of it.
+
+    As long as there are at least `min_samples` readings, these tests are
+    applied to every new reading, so quiet readings settle quickly, while
+    a single noisy reading only widens the uncertainty, rather than
+    starting the count over.
+    """
+
+    def __init__(
+        self, tol_G, target_G=None, n=8, confidence=0.95, min_samples=4
+    ):
+        self.tol_G = tol_G
+        self.target_G = target_G
+        self.confidence = confidence
+        self.min_samples = min_samples
+        self.z = NormalDist().inv_cdf((1 + confidence) / 2)
+        self.samples = deque(maxlen=n)  # (time, field)
+
+    def reset(self):
+        "forget the readings -- *e.g.* after changing the field"
+        self.samples.clear()
+
+    def add(self, field_G, t=None):
+        if t is None:
+            t = time.monotonic()
+        self.samples.append((t, field_G))
+
+    @property
+    def stats(self):
+        """The statistics of the window, as a dict with keys:
+
+        n
+            The number of readings.
+        mean_G, std_G, sem_G
+            Their mean, standard deviation, and the standard error of the
+            mean.
+        slope_G_s, slope_err_G_s
+            The slope of the line fit to them, and its standard error.
+        span_s
+            The time that they span.
+        settled
+            See :attr:`settled`.
+        """
+        t, B = np.array(self.samples).reshape(-1, 2).T
+        retval = {"n": len(B), "confidence": self.confidence}
+        if len(B) < max(self.min_samples, 3):
+            retval.update(
+                mean_G=B.mean() if len(B) else np.nan,
+                std_G=np.nan,
+                sem_G=np.nan,
+                slope_G_s=np.nan,
+                slope_err_G_s=np.nan,
+                span_s=np.ptp(t) if len(t) else 0.0,
+                settled=False,
+            )
+            return retval
+        dt = t - t.mean()
+        slope = (dt * (B - B.mean())).sum() / (dt**2).sum()
+        residuals = B - B.mean() - slope * dt
+        retval.update(
+            mean_G=B.mean(),
+            std_G=B.std(ddof=1),
+            sem_G=B.std(ddof=1) / np.sqrt(len(B)),
+            slope_G_s=slope,
+            slope_err_G_s=np.sqrt(
+                (residuals**2).sum() / (len(B) - 2) / (dt**2).sum()
+            ),
+            span_s=np.ptp(t),
+        )
+        retval["settled"] = self._drift_ok(retval) and (
+            self.target_G is None
+            or abs(retval["mean_G"] - self.target_G) + self.z * retval["sem_G"]
+            <= self.tol_G
+        )
+        return retval
+
+    def _drift_ok(self, stats):
+        return (
+            abs(stats["slope_G_s"]) + self.z * stats["slope_err_G_s"]
+        ) * stats["span_s"] <= self.tol_G
+
+    @property
+    def settled(self):
+        """True if we're confident that the field has stopped moving (and
+        is within tolerance of the target, if there is one)"""
+        return self.stats["settled"]
+
+    @property
+    def off_target(self):
+        """True if we're confident that the field has stopped moving, but
+        is *not* within tolerance of the target -- *i.e.* it's time to
+        correct it"""
+        stats = self.stats
+        if np.isnan(stats["sem_G"]) or self.target_G is None:
+            return False
+        return (
+            self._drift_ok(stats)
+            and abs(stats["mean_G"] - self.target_G) - self.z * stats["sem_G"]
+            > self.tol_G
+        )
+
+
+def _return_path(I_set_A, I_target_A, max_step_A):
+    "the settings that step from `I_set_A` to `I_target_A`"
+    n = int(np.ceil(abs(I_target_A - I_set_A) / max_step_A))
+    return np.linspace(I_set_A, I_target_A, n + 1)[1:]
+
+
+def _landing(I_eff_A, I_set_A, I_target_A, decay, max_step_A):
+    """the modeled effective current after setting `I_set_A` and then
+    stepping back to `I_target_A`"""
+    for I in np.r_[I_set_A, _return_path(I_set_A, I_target_A, max_step_A)]:
+        I_eff_A = I + (I_eff_A - I) * decay
+    return I_eff_A
+
+
+def magnet_current_schedule(
+    I_start_A,
+    I_target_A,
+    tau_s,
+    dt_s,
+    max_step_A=0.5,
+    max_overshoot_A=2.0,
+    I_max_A=25.0,
+    tol_A=1e-3,
+    I_set_A=None,
+    I_eff_A=None,
+):
+    """The fastest series of current settings that takes the field from
+    where it is (at `I_start_A`) to where it is at `I_target_A`.
+
+    The field is modeled as following the current with a first-order lag of
+    time constant `tau_s` -- *i.e.* it follows an "effective" current.
+    Each setting must lie within `max_step_A` of the previous one, no more
+    than `max_overshoot_A` beyond the start and target, and between 0 and
+    `I_max_A`.
+    At each step, we choose the most aggressive setting for which stepping
+    straight back to the target would still not carry the effective current
+    past the target.
+    So, a large change first slews the current past the target, holds it
+    there while the field catches up, and then brings it back to the target
+    just as the field arrives.
+
+    Parameters
+    ----------
+    dt_s : float
+        The time between settings.
+    tol_A : float
+        The schedule ends (on `I_target_A`) once the effective current is
+        predicted to land this close to the target.
+    I_set_A, I_eff_A : float or None
+        To re-plan part way through a ramp from `I_start_A`: the current
+        that is set now, and where the field is now, as an effective
+        current.
+        By default, both are `I_start_A` (*i.e.* the field has settled
+        there).
+
+    Returns
+    -------
+    schedule : ndarray
+        The current settings, in A, one every `dt_s`.
+    """
+    if I_target_A > I_max_A:
+        raise ValueError("Current is too high.")
+    decay = np.exp(-dt_s / tau_s)
+    lower = max(min(I_start_A, I_target_A) - max_overshoot_A, 0)
+    upper = min(max(I_start_A, I_target_A) + max_overshoot_A, I_max_A)
+    I_set = I_start_A if I_set_A is None else I_set_A
+    I_eff = I_start_A if I_eff_A is None else I_eff_A
+    schedule = [I_target_A]
+    if abs(I_target_A - I_set) < tol_A and abs(I_target_A - I_eff) < tol_A:
+        return np.array(schedule)
+
+    def overshoot(I):
+        "how far past the target we land after setting I"
+        return direction * (
+            _landing(I_eff, I, I_target_A, decay, max_step_A) - I_target_A
+        )
+
+    schedule = []
+    while True:
+        direction = 1 if I_target_A >= I_eff else -1
+        bounds = [
+            max(I_set - max_step_A, lower),
+            min(I_set + max_step_A, upper),
+        ][::direction]
+        if overshoot(bounds[1]) <= 0:
+            I_set = bounds[1]
+        elif overshoot(bounds[0]) >= 0:
+            I_set = bounds[0]
+        else:
+            # the landing point moves with the setting, so bisect for the
+            # setting that lands on the target
+            for j in range(50):
+                mid = (bounds[0] + bounds[1]) / 2
+                if overshoot(mid) <= 0:
+                    bounds[0] = mid
+                else:
+                    bounds[1] = mid
+            I_set = bounds[0]
+        schedule.append(I_set)
+        if abs(overshoot(I_set)) < tol_A:
+            schedule.extend(_return_path(I_set, I_target_A, max_step_A))
+            break
+        I_eff = I_set + (I_eff - I_set) * decay
+    return np.array(schedule)
+
+
+def _follow_schedule(gen, I_start_A, I_target_A, tau_s, dt_s, **kwargs):
+    """Ramp the current along :func:`magnet_current_schedule`, one setting
+    every `dt_s`, and return the schedule as it was actually set.
+
+    No setting is ever skipped, so each one stays within `max_step_A` of
+    the last.
+    Instead, if setting the current runs late, the field (which has been
+    following the last setting for longer than planned) is modeled from
+    the times at which the settings were actually made, and the rest of
+    the ramp is re-planned from there, in steps as long as setting the
+    current actually takes.
+
+    Parameters
+    ----------
+    kwargs
+        Passed on to :func:`magnet_current_schedule`.
+    """
+    I_set = I_eff = I_start_A
+    schedule = magnet_current_schedule(
+        I_start_A, I_target_A, tau_s, dt_s, **kwargs
+    )
+    step_s = dt_s
+    last_set = due = time.monotonic()
+    retval = []
+    j = 0
+    while True:
+        write_start = time.monotonic()
+        gen.I_limit = schedule[j]
+        now = time.monotonic()
+        I_eff = I_set + (I_eff - I_set) * np.exp(-(now - last_set) / tau_s)
+        I_set, last_set = schedule[j], now
+        retval.append(I_set)
+        due += step_s
+        time.sleep(max(due - time.monotonic(), 0))
+        j += 1
+        if j == len(schedule):
+            return np.array(retval)
+        late_s = time.monotonic() - due
+        if late_s > step_s / 2:
+            # plan the rest in steps as long as setting the current takes
+            step_s = max(now - write_start, dt_s)
+            logging.debug(
+                f"setting the current ran {late_s:0.2f} s late, so"
+                f" re-planning the rest of the ramp in {step_s:0.2f} s steps"
+            )
+            schedule = magnet_current_schedule(
+                I_start_A,
+                I_target_A,
+                tau_s,
+                step_s,
+                I_set_A=I_set,
+                I_eff_A=I_set
+                + (I_eff - I_set)
+                * np.exp(-(time.monotonic() - last_set) / tau_s),
+                **kwargs,
+            )
+            j = 0
+            due = time.monotonic()
+
+
 def ramp_field(
     B0_des_G,
     config_dict,
@@ -48,9 +328,20 @@ def ramp_field(
     main_field_threshold_G=2.0,
     Z0_min_voltage_V=0.0,
     Z0_max_voltage_V=6,
+    return_stats=False,
+    calibration=None,
 ):
     """Ramp the field from where we are to where we want to be.
 
+    With ``magnet_ramp_mode`` set to "model", the current follows
+    :func:`magnet_current_schedule`, so that the field arrives at the
+    target by the end of the ramp; otherwise (the default, until
+    ``magnet_tau_s`` has been measured for the magnet), the current is
+    stepped linearly, and we wait ``magnet_settle_long`` for the field to
+    follow.
+    Ramps to 0 A or to the highest current always step linearly, since
+    the model can't overshoot past either end.
+
     **If we start at 0**: Calibrate the zero-point of the hall sensor
 
     **If we end at 0 G**: Turn off the current supply
@@ -63,10 +354,11 @@ def ramp_field(
         Configuration dictionary with magnet settling times and
         current_v_field_A_G.
     h : object
-        LakeShore Hall sensor instance.
+        LakeShore Hall sensor instance, or a field_sampler wrapped around
+        it.
     gen : object
-        Genesys power supply object with output, V_limit, I_limit, and I_meas
-        properties.
+        Genesys power supply object with output, I_limit, and I_meas
+        properties, and a set_VI method.
     shims : ShimDictMapping
         Shim mapping object used to access the Z0 shim by name.
     settling_attempts: int (default 60)
@@ -80,11 +372,32 @@ def ramp_field(
     Z0_max_voltage_V: float or None
         The maximum voltage we allow for the Z0 shim coil. If None, use the
         hardware maximum for the mapped Z0 channel.
+    return_stats: bool (default False)
+        Also return the statistics of the readings that showed that the
+        field had settled (see :attr:`settle_detector.stats`).
+        This is None if we ramped to 0 G.
+    calibration: field_calibration or None
+        If given (and not empty), start from the current and Z0 voltage
+        that it interpolates for `B0_des_G`, rather than from
+        current_v_field_A_G, and record where we settle.
+
+    Returns
+    -------
+    true_B0_G: float
+        The field that we end up at.
     """
     z0_inst = shims.instrument("Z0")
     z0_channel = shims.channel("Z0")
     if Z0_max_voltage_V is None:
         Z0_max_voltage_V = z0_inst.max_V[z0_channel]
+    Z0_setting_V = None
+    if calibration is not None and len(calibration) > 0 and B0_des_G != 0:
+        I_setting, Z0_setting_V = calibration.lookup(B0_des_G)
+        config_dict["current_v_field_A_G"] = I_setting / B0_des_G
+        logging.info(
+            f"From the calibration table, {B0_des_G} G needs {I_setting} A"
+            f" with {Z0_setting_V} V on Z0"
+        )
     I_setting = B0_des_G * config_dict["current_v_field_A_G"]
     # {{{ First, we ramp from whatever
     #     our current is (zero or not)
@@ -100,18 +413,38 @@ def ramp_field(
             logging.info("Zero calibration of hall probe for 40s")
             time.sleep(40)  # It takes 40s to calibrate
             logging.info("Calibration finished")
-            gen.V_limit = 25.0
+            gen.set_VI(25.0, 0)
             gen.output = True
-            gen.I_limit = 0
             logging.info("The power supply is on.")
     except Exception:
         raise TypeError("The power supply is not connected.")
     temp_I_meas = gen.I_meas
-    ramp_steps = int(abs(I_setting - temp_I_meas) * 2)
-    logging.info(f"Ramping the field from {gen.I_meas} to {I_setting}")
-    for thisI in np.linspace(temp_I_meas, I_setting, ramp_steps):
-        gen.I_limit = thisI
-        time.sleep(config_dict["magnet_settle_short"])
+    dt = config_dict["magnet_settle_short"]
+    ramp_steps = int(
+        abs(I_setting - temp_I_meas) / config_dict["magnet_max_step_A"]
+    )
+    logging.info(f"Ramping the field from {temp_I_meas} to {I_setting}")
+    model_ramp = config_dict["magnet_ramp_mode"] == "model" and (
+        0 < I_setting < 25
+    )
+    if model_ramp:
+        schedule = _follow_schedule(
+            gen,
+            temp_I_meas,
+            I_setting,
+            config_dict["magnet_tau_s"],
+            dt,
+            max_step_A=config_dict["magnet_max_step_A"],
+            max_overshoot_A=config_dict["magnet_max_overshoot_A"],
+        )
+        logging.info(
+            f"Model-based ramp took {len(schedule)} steps, and peaked at"
+            f" {schedule.max():0.3f} A"
+        )
+    else:
+        for thisI in np.linspace(temp_I_meas, I_setting, ramp_steps):
+            gen.I_limit = thisI
+            time.sleep(dt)
     if B0_des_G == 0:
         shims.V_limit["Z0"] = 0
         shims.output["Z0"] = 0
@@ -119,35 +452,38 @@ def ramp_field(
         gen.I_limit = 0
         gen.output = False
         logging.info("The PS is off.")
+        if return_stats:
+            return h.field_in_G, None
         return h.field_in_G
-    if ramp_steps > 4:
+    if Z0_setting_V is not None:
+        shims.V_limit["Z0"] = shims.round_to_allowed(
+            "V",
+            "Z0",
+            min(max(Z0_setting_V, Z0_min_voltage_V), Z0_max_voltage_V),
+        )
+    if ramp_steps > 4 and not model_ramp:
         time.sleep(config_dict["magnet_settle_long"])
     # }}}
     # {{{ now, adjust current_v_field_A_G
     #     to get the field we want,
     #     just once at the beginning
     # {{{ try to stabilize the field
-    #     within 0.8 G of our desired
+    #     within tolerance of our desired
     #     value
-    num_field_matches = 0
+    tol_G = config_dict["tolerance_Hz"] * 1e-6 / config_dict["gamma_eff_mhz_g"]
+    detector = settle_detector(
+        tol_G,
+        target_G=B0_des_G,
+        n=config_dict["field_settle_window"],
+        confidence=config_dict["field_settle_confidence"],
+    )
     for j in range(settling_attempts):
         time.sleep(config_dict["magnet_settle_short"])
-        field_discrepancy = abs(h.field_in_G - B0_des_G)
+        B0_now_G = h.field_in_G
+        field_discrepancy = abs(B0_now_G - B0_des_G)
         if field_discrepancy > 2.0:
             time.sleep(config_dict["magnet_settle_medium"])
         if (
-            field_discrepancy
-            < config_dict["tolerance_Hz"]
-            * 1e-6
-            / config_dict["gamma_eff_mhz_g"]
-        ):
-            logging.info(
-                "your match to the desired field is within tolerance!"
-            )
-            num_field_matches += 1
-            if num_field_matches > 2:
-                break
-        elif (
             # as we approach lower fields, we encounter a no-current
             # discrepancy that can't be calibrated out.
             field_discrepancy > main_field_threshold_G
@@ -158,72 +494,67 @@ def ramp_field(
                 h,
                 gen,
             )
-            num_field_matches = 0
-        else:
-            # {{{ if it's not within tolerance, and it's not asking for a big
-            #     step, then it's asking for an intermediate step
-            #     so we need to adjust the Z0 field.
-            # {{{ the desired voltage is the combination of the change we want
-            #     to make and the voltage that's running through Z0 before the
-            #     change (and we want to save the latter)
-            desired_Z0_voltage_V = (B0_des_G - h.field_in_G) / config_dict[
-                "z0_field_v_voltage_G_V"
-            ]
-            Z0_initial_voltage_V = shims.V_read["Z0"]
-            desired_Z0_voltage_V += Z0_initial_voltage_V
-            # }}}
-            # {{{ we can only use Z0 to increase the voltage, and we don't want
-            #     to ask for an unreasonable voltage
-            if desired_Z0_voltage_V < Z0_min_voltage_V:
-                adjust_main_field(B0_des_G - 1.0, config_dict, h, gen)
-            elif desired_Z0_voltage_V > Z0_max_voltage_V:
-                adjust_main_field(B0_des_G, config_dict, h, gen)
-            # }}}
-            shims.V_limit["Z0"] = shims.round_to_allowed(
-                "V",
-                "Z0",
-                desired_Z0_voltage_V,
+            detector.reset()
+            continue
+        detector.add(B0_now_G)
+        if detector.settled:
+            logging.info(
+                "your match to the desired field is within tolerance!"
             )
-            if (shims.V_read["Z0"] - Z0_initial_voltage_V) != 0:
-                # {{{ Check if the field is stabilizing
-                num_field_matches = 0
-                B0_last_G = 0
-                for j in range(settling_attempts):
-                    time.sleep(config_dict["magnet_settle_short"])
-                    B0_now_G = h.field_in_G
-                    field_discrepancy = abs(B0_now_G - B0_last_G)
-                    if (
-                        field_discrepancy
-                        < config_dict["tolerance_Hz"]
-                        * 1e-6
-                        / config_dict["gamma_eff_mhz_g"]
-                    ):
-                        num_field_matches += 1
-                    else:
-                        B0_last_G = B0_now_G
-                        num_field_matches = 0
-                    if num_field_matches > 2:
-                        break
-                if not (num_field_matches > 2):
-                    print(
-                        " ".join(
-                            ["WARNING! "] * 3 + ["field is not stabilizing!"]
-                        )
-                    )
-                # }}}
-            # }}}
-            num_field_matches = 0
-
-    if num_field_matches < 3:
-        temp = (
-            config_dict["tolerance_Hz"] * 1e-6 / config_dict["gamma_eff_mhz_g"]
+            break
+        if not detector.off_target:
+            continue  # either still moving, or too few readings to tell
+        # {{{ the field has settled, but not within tolerance, and it's not
+        #     asking for a big step, so it's asking for an intermediate step
+        #     so we need to adjust the Z0 field.
+        # {{{ the desired voltage is the combination of the change we want
+        #     to make and the voltage that's running through Z0 before the
+        #     change (and we want to save the latter)
+        desired_Z0_voltage_V = (
+            B0_des_G - detector.stats["mean_G"]
+        ) / config_dict["z0_field_v_voltage_G_V"]
+        Z0_initial_voltage_V = shims.V_read["Z0"]
+        desired_Z0_voltage_V += Z0_initial_voltage_V
+        # }}}
+        # {{{ we can only use Z0 to increase the voltage, and we don't want
+        #     to ask for an unreasonable voltage
+        if desired_Z0_voltage_V < Z0_min_voltage_V:
+            adjust_main_field(B0_des_G - 1.0, config_dict, h, gen)
+        elif desired_Z0_voltage_V > Z0_max_voltage_V:
+            adjust_main_field(B0_des_G, config_dict, h, gen)
+        # }}}
+        shims.V_limit["Z0"] = shims.round_to_allowed(
+            "V",
+            "Z0",
+            desired_Z0_voltage_V,
         )
-
+        if (shims.V_read["Z0"] - Z0_initial_voltage_V) != 0:
+            # {{{ Check if the field is stabilizing
+            stabilizing = settle_detector(
+                tol_G,
+                n=config_dict["field_settle_window"],
+                confidence=config_dict["field_settle_confidence"],
+            )
+            for k in range(settling_attempts):
+                time.sleep(config_dict["magnet_settle_short"])
+                stabilizing.add(h.field_in_G)
+                if stabilizing.settled:
+                    break
+            else:
+                print(
+                    " ".join(["WARNING! "] * 3 + ["field is not stabilizing!"])
+                )
+            # }}}
+        # }}}
+        detector.reset()
+    else:
         raise RuntimeError(
             f"I tried {settling_attempts} times to get my"
-            f" field to match within {temp} G"
-            f" or {config_dict['tolerance_Hz']} Hz three times"
-            "in a row, and it didn't work!"
+            f" field to settle within {tol_G} G"
+            f" or {config_dict['tolerance_Hz']} Hz"
+            f" (with {detector.confidence} confidence)"
+            " of the target, and it didn't work!"
+            f"  The last statistics were {detector.stats}"
         )
     # }}}
     true_B0_G = h.field_in_G
@@ -236,4 +567,10 @@ def ramp_field(
         " other words, the discrepancy"
         f" is{true_B0_G - B0_des_G} G"
     )
+    if calibration is not None:
+        calibration.add(
+            detector.stats["mean_G"], gen.I_meas, shims.V_read["Z0"]
+        )
+    if return_stats:
+        return true_B0_G, detector.stats
     return true_B0_G
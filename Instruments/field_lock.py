@@ -0,0 +1,174 @@
+from collections import deque
+import logging
+import numpy as np
+import time
+
+
+class field_lock(object):
+    """Hold the field on `target_G` by feeding back on the Z0 shim voltage,
+    so that slow drifts (*e.g.* as the magnet warms) are corrected without
+    re-running :func:`ramp_field`.
+
+    The correction is a PID controller in "velocity" form -- each step
+    changes the voltage by ``(Kp*de + Ki*e*dt + Kd*d2e/dt)/G_per_V``, where
+    ``e`` is the field error (in G), and ``de`` and ``d2e`` are its first
+    and second differences -- so there is no integral to wind up while the
+    voltage is pinned at a limit, and the lock can be held and resumed
+    without a kick.
+    Each change is limited to `max_step_V`.
+
+    The field comes from a :class:`field_sampler` (the mean of the readings
+    since the last step), and, like the sampler, the lock is driven from the
+    idle loop of the instrument control server, through :func:`step_if_due`.
+    """
+
+    def __init__(
+        self,
+        fs,
+        shims,
+        target_G,
+        G_per_V,
+        Kp=0.5,
+        Ki=0.1,
+        Kd=0.0,
+        interval=2.0,
+        max_step_V=0.05,
+        deadband_G=0.0,
+        min_V=0.0,
+        max_V=6.0,
+        history_len=10000,
+    ):
+        """
+        Parameters
+        ----------
+        fs : field_sampler
+        shims : ShimDictMapping
+            Must have a "Z0" shim.
+        target_G : float
+        G_per_V : float
+            The change in field for each V on Z0 (the
+            ``z0_field_v_voltage_G_V`` configuration parameter).
+        Kp, Ki, Kd : float
+            The proportional (dimensionless), integral (in 1/s) and
+            derivative (in s) gains.
+        interval : float
+            Seconds between steps, for :func:`step_if_due`.
+        max_step_V : float
+            The largest change in the Z0 voltage for one step.
+        deadband_G : float
+            Errors smaller than this are treated as zero.
+        min_V, max_V : float
+            The range of Z0 voltages we may use -- by default, the same
+            range that :func:`ramp_field` keeps Z0 within.
+            If `max_V` is None, it's the hardware maximum of the Z0
+            channel.
+        """
+        self.fs = fs
+        self.shims = shims
+        self.target_G = target_G
+        self.G_per_V = G_per_V
+        self.Kp = Kp
+        self.Ki = Ki
+        self.Kd = Kd
+        self.interval = interval
+        self.max_step_V = max_step_V
+        self.deadband_G = deadband_G
+        self.min_V = min_V
+        if max_V is None:
+            max_V = shims.instrument("Z0").max_V[shims.channel("Z0")]
+        self.max_V = max_V
+        self.V = shims.V_limit["Z0"]
+        self.V_unrounded = self.V  # so that small steps accumulate
+        self.held = False
+        self.errors = deque([0.0, 0.0], maxlen=2)  # the last two errors
+        self.history = deque(maxlen=history_len)  # (time, field, Z0 V)
+        self.last_step = time.monotonic()
+
+    def hold(self):
+        "stop changing Z0 (*e.g.* during an acquisition), until resumed"
+        self.held = True
+
+    def resume(self):
+        """start correcting again -- the errors from before the hold are
+        replaced by the present error, so that a drift during the hold
+        doesn't give a proportional or derivative kick"""
+        self.held = False
+        error_G = self._error(self.fs.latest(max_age=self.fs.interval))
+        self.errors.extend([error_G, error_G])
+        self.last_step = time.monotonic()
+
+    def _error(self, field_G):
+        "the error (in G) for `field_G`, with the deadband applied"
+        error_G = self.target_G - field_G
+        if abs(error_G) < self.deadband_G:
+            return 0.0
+        return error_G
+
+    @property
+    def saturated(self):
+        "True if Z0 is pinned at one end of its range"
+        return self.V <= self.min_V or self.V >= self.max_V
+
+    @property
+    def history_array(self):
+        """the history as a structured array, with fields time, field (in G,
+        the mean that each step corrected), and Z0 (in V, after the step)"""
+        return np.array(
+            list(self.history),
+            dtype=[("time", "f8"), ("field", "f8"), ("Z0", "f8")],
+        )
+
+    def step(self):
+        """correct Z0 for the mean field since the last step
+
+        Returns
+        -------
+        V : float
+            The new Z0 voltage.
+        """
+        now = time.monotonic()
+        dt = now - self.last_step
+        if dt <= 0:
+            return self.V
+        self.last_step = now
+        field_G = self.fs.mean(max(dt, self.fs.interval))
+        if np.isnan(field_G):
+            field_G = self.fs.latest()
+        error_G = self._error(field_G)
+        previous, before_that = self.errors[-1], self.errors[-2]
+        dV = (
+            self.Kp * (error_G - previous)
+            + self.Ki * error_G * dt
+            + self.Kd * (error_G - 2 * previous + before_that) / dt
+        ) / self.G_per_V
+        self.errors.append(error_G)
+        dV = np.clip(dV, -self.max_step_V, self.max_step_V)
+        self.V_unrounded = np.clip(
+            self.V_unrounded + dV, self.min_V, self.max_V
+        )
+        V = self.shims.round_to_allowed("V", "Z0", self.V_unrounded)
+        if V != self.V:
+            self.shims.V_limit["Z0"] = V
+            self.V = V
+        if self.saturated:
+            logging.warning(
+                "the field lock has run Z0 to %0.3f V, the end of its range"
+                " -- the main field needs to be adjusted" % self.V
+            )
+        self.history.append((time.time(), field_G, self.V))
+        return self.V
+
+    def step_if_due(self):
+        """run :func:`step` if `interval` has passed since the last one, and
+        the lock isn't held
+
+        Returns
+        -------
+        V : float or None
+            The new Z0 voltage, or None if no step was run.
+        """
+        if self.held:
+            return None
+        if time.monotonic() - self.last_step >= self.interval:
+            return self.step()
+        return None
@@ -0,0 +1,130 @@
+import numpy as np
+import time
+
+
+class field_sampler(object):
+    """Read the Hall probe at a fixed rate into a timestamped ring buffer,
+    so that everything that needs the field (logging, feedback, clients)
+    can share the same readings, rather than each querying the probe.
+
+    Like :class:`dip_tracker`, this doesn't run its own thread, since the
+    Hall probe shares the prologix with other instruments -- instead,
+    :func:`sample_if_due` is called from the idle loop of the instrument
+    control server.
+
+    It can stand in for the Hall probe in :func:`ramp_field` (it has
+    ``field_in_G`` and ``zero_probe``), so that readings taken during a ramp
+    also land in the buffer.
+    """
+
+    def __init__(self, h, interval=0.25, maxlen=14400):
+        """
+        Parameters
+        ----------
+        h : LakeShore475
+        interval : float
+            Seconds between samples, for :func:`sample_if_due`.
+        maxlen : int
+            The number of samples that the buffer holds (by default, an
+            hour at the default interval).
+        """
+        self.h = h
+        self.interval = interval
+        self.times = np.zeros(maxlen)
+        self.fields = np.zeros(maxlen)
+        self.n_samples = 0  # the number ever taken
+        self.last_sample = -np.inf
+
+    def __len__(self):
+        return min(self.n_samples, len(self.times))
+
+    def sample(self):
+        """read the field (in G) and add it to the buffer"""
+        field_G = self.h.field_in_G
+        j = self.n_samples % len(self.times)
+        self.times[j] = time.time()
+        self.fields[j] = field_G
+        self.n_samples += 1
+        self.last_sample = time.monotonic()
+        return field_G
+
+    def sample_if_due(self):
+        """run :func:`sample` if `interval` has passed since the last one
+
+        Returns
+        -------
+        field_G : float or None
+            The new reading, or None if no sample was taken.
+        """
+        if time.monotonic() - self.last_sample >= self.interval:
+            return self.sample()
+        return None
+
+    @property
+    def field_in_G(self):
+        "a fresh reading, which is also added to the buffer"
+        return self.sample()
+
+    def zero_probe(self):
+        "zero the Hall probe, and forget the readings from before"
+        self.h.zero_probe()
+        self.n_samples = 0
+
+    def latest(self, max_age=None):
+        """The most recent reading (in G).
+
+        Parameters
+        ----------
+        max_age : float or None
+            If the most recent reading is older than this (in s), or there
+            are no readings, take a new one.
+        """
+        if len(self) == 0 or (
+            max_age is not None
+            and time.monotonic() - self.last_sample > max_age
+        ):
+            return self.sample()
+        return self.fields[(self.n_samples - 1) % len(self.times)]
+
+    def window(self, seconds=None):
+        """The readings from the last `seconds` (or all of them), in the
+        order they were taken.
+
+        Returns
+        -------
+        times : ndarray
+            Unix timestamps.
+        fields : ndarray
+            In G.
+        """
+        order = np.arange(self.n_samples - len(self), self.n_samples) % len(
+            self.times
+        )
+        times, fields = self.times[order], self.fields[order]
+        if seconds is not None:
+            mask = times >= time.time() - seconds
+            times, fields = times[mask], fields[mask]
+        return times, fields
+
+    def history(self, seconds=None):
+        """the readings from the last `seconds` (or all of them), as a
+        structured array with fields time and field (in G)"""
+        times, fields = self.window(seconds)
+        retval = np.zeros(len(times), dtype=[("time", "f8"), ("field", "f8")])
+        retval["time"] = times
+        retval["field"] = fields
+        return retval
+
+    def mean(self, seconds):
+        """the mean field (in G) over the last `seconds`, or NaN if there
+        are no readings in that window"""
+        _, fields = self.window(seconds)
+        if len(fields) == 0:
+            return np.nan
+        return fields.mean()
+
+    def is_stable(self, tol_G, seconds, min_samples=3):
+        """True if at least `min_samples` readings were taken over the last
+        `seconds`, and they all lie within `tol_G` of each other."""
+        _, fields = self.window(seconds)
+        return len(fields) >= min_samples and np.ptp(fields) <= tol_G
@@ -185,30 +185,8 @@ class GDS_scope(SerialInstrument):
     def autoset(self):
         self.write(":AUTOS")
 
-    def waveform(self, ch=1):
-        """Retrieve waveform and associated parameters form the scope.
-
-        Comprises the following steps:
-
-        * opens the port to the scope
-        * acquires what is saved in memory as string
-        * Divides this string at hashtag which separates settings from waveform
-
-        Parameters
-        ==========
-
-        ch : int
-
-            Which channel do you want?
-
-        Returns
-        =======
-
-        data : nddata
-
-            The scope data, as a pyspecdata nddata, with the
-            extra information stored as nddata properties
-        """
+    def _wait_ready(self, ch):
+        "wait until the scope says that the data for channel `ch` is ready"
         ready = self.respond(":ACQ%d:STAT?" % ch)
         j = 0
         while int(ready) == 0 and j < 100:
@@ -218,64 +196,95 @@ class GDS_scope(SerialInstrument):
             j += 1
         if j == 100:
             raise RuntimeError("never became ready!!!")
-
         logger.debug(strm("ready:", ready))
-        self.write(":ACQ%d:MEM?" % ch)
-
-        def upto_hashtag():
-            this_char = self.read(1)
-            this_line = ""
-            while this_char != "#":
-                this_line += this_char
-                this_char = self.read(1)
-            return this_line
-
-        # Further divides settings
-        preamble = upto_hashtag().split(";")
-
-        # Retrieves 'memory' of 25000 from settings
-        # Waveform data is 50,000 bytes of binary data (2*mem)
-        mem = int(preamble[0].split(",")[1])
-        logger.debug("memory is %d" % mem)
-
-        # Generates list of parameters in the preamble
-        param = dict(
-            [tuple(x.split(",")) for x in preamble if len(x.split(",")) == 2]
-        )
+        return
 
-        # Reads waveform data of 50,000 bytes
-        self.read_binary(6)  # length of 550000
-        data = self.read_binary(50001)
-        assert data[-1] == 10, (
-            "data is not followed by newline!, rather it's %d" % data[-1],
-            f"... length of data {len(data)}"
+    def _read_memory(self, ch):
+        """Read the settings and the raw (2-byte integer) waveform that the
+        scope holds in memory for channel `ch`.
+
+        Returns
+        =======
+
+        param : dict
+
+            The settings from the preamble, as strings.
+
+        samples : ndarray of int16
+        """
+        with self.io_lock:
+            self.write(":ACQ%d:MEM?" % ch)
+            # {{{ the settings are separated from the waveform by a hashtag,
+            #     and are themselves a series of name,value pairs separated
+            #     by ";"
+            preamble = self.read_until(b"#")[:-1].split(";")
+            param = dict(
+                [
+                    tuple(x.split(","))
+                    for x in preamble
+                    if len(x.split(",")) == 2
+                ]
+            )
+            # }}}
+            # {{{ the waveform itself is an IEEE 488.2 block of 2-byte
+            #     integers -- its header gives the length, so we can read it
+            #     in one go, whatever the memory depth of the scope
+            data = self.read_block(leading_hash=False)
+            if "Memory Length" in param:
+                mem = int(param["Memory Length"])
+                logger.debug("memory is %d" % mem)
+                if 2 * mem != len(data):
+                    logger.warning(
+                        strm(
+                            "preamble gives a memory length of",
+                            mem,
+                            "but the block holds",
+                            len(data) // 2,
+                            "points",
+                        )
+                    )
+            terminator = self.read_binary(1)
+            assert terminator == b"\n", (
+                "data is not followed by newline!, rather it's %s"
+                % repr(terminator),
+                f"... length of data {len(data)}",
+            )
+            # }}}
+        return param, np.frombuffer(data, dtype="i2")
+
+    @staticmethod
+    def _volts_per_count(param):
+        "use the V/div scale to give the size of one step of the 2-byte data"
+        return (
+            float(param["Vertical Scale"])
+            / np.double(2 ** (2 * 8 - 1))
+            * 5
+            * 1.032  # this is empirical
         )
-        print("length of data", len(data))
-        data = data[:-1]
 
-        # convert the binary string
-        data_array = np.frombuffer(data, dtype="i2")
-        data_array = np.double(data_array) / np.double(2 ** (2 * 8 - 1))
+    @staticmethod
+    def _as_nddata(data_array, param, dimlabels=("t",)):
+        """Build an nddata from the (already scaled) `data_array`, whose
+        last dimension is time, and store the remaining settings in `param`
+        as properties."""
+        param = dict(param)
         # I could do the following
         # x_axis = r_[0:len(data_array)] * float(param['Sampling Period'])
         # but since I'm "using up" the sampling period, do this:
-        x_axis = r_[0 : len(data_array)] * float(param.pop("Sampling Period"))
+        x_axis = r_[0 : data_array.shape[-1]] * float(
+            param.pop("Sampling Period")
+        )
         # r_[... is used by numpy to construct arrays on the fly
-
-        # Similarly, use V/div scale to scale the y values of the data
         logger.debug(strm("acquisition parameters", param))
-        data_array *= float(param.pop("Vertical Scale"))
-        data_array *= 5 * 1.032  # this is empirical
+        param.pop("Vertical Scale")
         if not all(np.isfinite(x_axis)):
             raise ValueError(
-                "your x axis is not finite!! len(data_array) is %s and"
-                " 'Sampling Period' is %s"
-                % (str(len(data_array)), str(param.pop("Sampling Period")))
+                "your x axis is not finite!! len(data_array) is %s"
+                % str(data_array.shape[-1])
             )
-        data = nddata(data_array, ["t"]).setaxis("t", x_axis)
+        data = nddata(data_array, list(dimlabels)).setaxis("t", x_axis)
         data.set_units("t", param.pop("Horizontal Units").replace("S", "s"))
         data.set_units(param.pop("Vertical Units"))
-        name = param.pop("Source")
 
         # the last part is not actually related to the nddata object -- for
         # convenience,
@@ -299,5 +308,297 @@ class GDS_scope(SerialInstrument):
         for j in list(param.keys()):
             param[j] = autoconvert_number(param[j])
         data.other_info.update(param)
+        return data
+
+    def waveform(self, ch=1, raw=False):
+        """Retrieve waveform and associated parameters form the scope.
+
+        Comprises the following steps:
+
+        * waits for the acquisition on this channel to be ready
+        * reads the settings, up to the hashtag that separates them from the
+          waveform
+        * reads the waveform, which is an IEEE 488.2 block whose header
+          gives its length (so any memory depth works)
+
+        Parameters
+        ==========
+
+        ch : int
+
+            Which channel do you want?
+
+        raw : bool or GDS_raw_series
+
+            If True, don't convert to volts, but return a
+            :class:`GDS_raw_series` that holds this record as 2-byte
+            integers.
+            If you pass an existing :class:`GDS_raw_series`, the record is
+            appended to it (and it's returned), which is how to keep a long
+            series of captures.
+
+        Returns
+        =======
+
+        data : nddata or GDS_raw_series
+
+            The scope data, as a pyspecdata nddata, with the
+            extra information stored as nddata properties
+            (or the raw series, if `raw` is given).
+        """
+        self._wait_ready(ch)
+        param, samples = self._read_memory(ch)
+        if raw is not False:
+            if raw is True:
+                raw = GDS_raw_series()
+            raw.append(param, samples)
+            return raw
+        data_array = samples * self._volts_per_count(param)
+        name = param.pop("Source")
+        data = self._as_nddata(data_array, param)
         data.name(name)
         return data
+
+    def capture(self, channels=(1,), n_avg=1, timeout=10):
+        """Capture several channels from the same trigger, and (optionally)
+        average repeated captures on the computer.
+
+        For each of the `n_avg` captures, the scope is armed for a single
+        acquisition (``:SING``), and once it has stopped, all of the
+        `channels` are read from its memory.
+        The captures are folded into a running mean and variance
+        (Welford's method), so only one record per channel is ever kept.
+        The scope is set back to running (``:RUN``) at the end, even if a
+        capture fails.
+
+        Parameters
+        ==========
+
+        channels : sequence of int
+
+            The channels to grab.
+
+        n_avg : int
+
+            How many captures to average.
+
+        timeout : float
+
+            How long (in s) to wait for each capture to trigger.
+
+        Returns
+        =======
+
+        data : nddata
+
+            The mean, with dimensions ``ch`` (whose axis gives the channel
+            numbers) and ``t``.
+            If `n_avg` > 1, the error gives the standard error of the mean.
+        """
+        channels = list(channels)
+        try:
+            for j in range(n_avg):
+                with self.io_lock:
+                    self.write(":SING")
+                    deadline = time.monotonic() + timeout
+                    wait = 0.01
+                    while self.respond(":TRIG:STAT?").strip() != "STOP":
+                        if time.monotonic() > deadline:
+                            raise RuntimeError(
+                                "the scope didn't trigger within %g s"
+                                % timeout
+                            )
+                        time.sleep(wait)
+                        wait = min(2 * wait, 0.2)
+                    # all the channels come from the same acquisition
+                    self._wait_ready(channels[0])
+                    records = [self._read_memory(ch) for ch in channels]
+                this_capture = np.array(
+                    [
+                        samples * self._volts_per_count(param)
+                        for param, samples in records
+                    ]
+                )
+                if j == 0:
+                    param = records[0][0]
+                    mean = np.zeros_like(this_capture)
+                    M2 = np.zeros_like(this_capture)
+                # {{{ Welford's running mean and sum of squared deviations
+                delta = this_capture - mean
+                mean += delta / (j + 1)
+                M2 += delta * (this_capture - mean)
+                # }}}
+        finally:
+            self.write(":RUN")
+        param = dict(param)
+        param.pop("Source")
+        data = self._as_nddata(mean, param, dimlabels=("ch", "t"))
+        data.setaxis("ch", np.array(channels))
+        data.other_info["n_avg"] = n_avg
+        if n_avg > 1:
+            data.set_error(np.sqrt(M2 / (n_avg - 1) / n_avg))
+        return data
+
+
+class GDS_raw_series(object):
+    """A series of scope records on one channel, kept as the 2-byte integers
+    that the scope sends -- a quarter of the memory of the same records in
+    volts.
+    Alongside the samples, each record keeps its own scale (V per count)
+    and offset (V), and the series keeps the sampling period, so that volts
+    and the time axis are only computed when you ask for them.
+
+    Indexing (``series[3]``, ``series[10:20]``) gives the records in volts,
+    :meth:`nddata` gives them as an nddata (like
+    :meth:`GDS_scope.waveform`), and :meth:`to_group`/:meth:`from_group`
+    store and load the series in an HDF5 group with the samples left as
+    int16.
+    """
+
+    def __init__(self, array_len=100):
+        """`array_len` is just the number of records to allocate room for at
+        first -- the buffer grows as needed."""
+        self.array_len = array_len
+        self.n_records = 0
+        self.samples = None
+        self.scale = np.empty(array_len)
+        self.offset = np.empty(array_len)
+        self.name = None
+        self.param = None
+        return
+
+    def __len__(self):
+        return self.n_records
+
+    def _grow(self):
+        "double the room for records"
+        new_len = 2 * len(self.scale)
+        samples = np.empty((new_len, self.samples.shape[1]), dtype="i2")
+        samples[: self.n_records] = self.samples[: self.n_records]
+        self.samples = samples
+        self.scale = np.resize(self.scale, new_len)
+        self.offset = np.resize(self.offset, new_len)
+
+    def append(self, param, samples, offset=0.0):
+        """Add a record.
+
+        Parameters
+        ==========
+
+        param : dict
+
+            The settings that came with the record (as returned by
+            ``GDS_scope._read_memory``).
+
+        samples : ndarray of int16
+
+            The record, as it came off of the scope.
+
+        offset : float
+
+            Added (in V) after scaling -- the conversion used by
+            :meth:`GDS_scope.waveform` has none, so it's normally 0.
+        """
+        param = dict(param)
+        name = param.pop("Source")
+        if self.samples is None:
+            self.samples = np.empty(
+                (len(self.scale), len(samples)), dtype="i2"
+            )
+            self.name = name
+            self.param = param
+        else:
+            if len(samples) != self.samples.shape[1]:
+                raise ValueError(
+                    "this record has %d points, but the series has %d"
+                    % (len(samples), self.samples.shape[1])
+                )
+            if float(param["Sampling Period"]) != self.sampling_period:
+                raise ValueError(
+                    "this record has a sampling period of %s, but the"
+                    " series has %g"
+                    % (param["Sampling Period"], self.sampling_period)
+                )
+            if self.n_records == len(self.scale):
+                self._grow()
+        self.samples[self.n_records] = samples
+        self.scale[self.n_records] = GDS_scope._volts_per_count(param)
+        self.offset[self.n_records] = offset
+        self.n_records += 1
+        return self
+
+    @property
+    def sampling_period(self):
+        return float(self.param["Sampling Period"])
+
+    @property
+    def t(self):
+        "the time axis, in s"
+        return r_[0 : self.samples.shape[1]] * self.sampling_period
+
+    def __getitem__(self, idx):
+        """the record(s) `idx`, in volts"""
+        samples = self.samples[: self.n_records][idx]
+        scale = self.scale[: self.n_records][idx]
+        offset = self.offset[: self.n_records][idx]
+        if samples.ndim == 2:
+            scale = scale[:, np.newaxis]
+            offset = offset[:, np.newaxis]
+        return samples * scale + offset
+
+    def nddata(self, idx=slice(None)):
+        """Return the record(s) `idx` in volts, as an nddata whose
+        dimensions are ``capture`` (if `idx` is a slice) and ``t``."""
+        data_array = self[idx]
+        if data_array.ndim == 2:
+            data = GDS_scope._as_nddata(
+                data_array, self.param, dimlabels=("capture", "t")
+            )
+            data.setaxis("capture", r_[0 : self.n_records][idx])
+        else:
+            data = GDS_scope._as_nddata(data_array, self.param)
+        data.name(self.name)
+        return data
+
+    def to_group(self, h5group):
+        """Store the series in the h5py group `h5group`.
+        The samples are written as int16 datasets, while the per-record
+        scale and offset, and the settings, sit alongside them.
+
+        An empty series can't be stored, since it doesn't know its record
+        length or settings yet."""
+        if self.n_records == 0:
+            raise ValueError(
+                "this series holds no records yet, so there's nothing to"
+                " store"
+            )
+        h5group.create_dataset(
+            "samples", data=self.samples[: self.n_records], dtype="i2"
+        )
+        h5group.create_dataset("scale", data=self.scale[: self.n_records])
+        h5group.create_dataset("offset", data=self.offset[: self.n_records])
+        h5group.attrs["Source"] = self.name
+        for k, v in self.param.items():
+            h5group.attrs[k] = v
+        return
+
+    @classmethod
+    def from_group(cls, h5group):
+        """initialize a new series with data loaded from the h5py group
+        h5group (factory method)"""
+        samples = h5group["samples"][:]
+        retval = cls(array_len=max(len(samples), 1))
+        retval.n_records = len(samples)
+        retval.samples = np.empty(
+            (len(retval.scale), samples.shape[1]), dtype="i2"
+        )
+        retval.samples[: len(samples)] = samples
+        retval.scale[: len(samples)] = h5group["scale"][:]
+        retval.offset[: len(samples)] = h5group["offset"][:]
+        param = {
+            k: v.decode("utf-8") if isinstance(v, bytes) else str(v)
+            for k, v in h5group.attrs.items()
+        }
+        retval.name = param.pop("Source")
+        retval.param = param
+        return retval
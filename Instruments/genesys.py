@@ -1,5 +1,6 @@
 import vxi11
 import logging
+import time
 
 
 class genesys(vxi11.Instrument):
@@ -56,8 +57,14 @@ class genesys(vxi11.Instrument):
         "Power On": 7,
     }
 
+    # seconds between the status checks that precede writes -- a failed
+    # command always triggers a check before the next write
+    status_check_interval = 0.5
+
     def __init__(self, host: str):
         self.checking_on = True
+        self._last_status_check = -float("inf")
+        self._status_suspect = False
         super().__init__(host)
         retval = self.ask("*IDN?")
         assert retval.startswith("LAMBDA,GEN"), f"{host} responded {retval}"
@@ -71,10 +78,32 @@ class genesys(vxi11.Instrument):
         self.write("OUTP:STAT OFF")
         self.close()
 
+    @property
+    def status_check_due(self):
+        """True if the next write should be preceded by :func:`check_status`
+        -- *i.e.* if the last command failed, or if `status_check_interval`
+        has passed since the last check."""
+        return (
+            self._status_suspect
+            or time.monotonic() - self._last_status_check
+            >= self.status_check_interval
+        )
+
     def write(self, message, encoding="ascii"):
-        if self.checking_on:
+        if self.checking_on and self.status_check_due:
             self.check_status()
-        return super().write(message, encoding)
+        try:
+            return super().write(message, encoding)
+        except Exception:
+            self._status_suspect = True
+            raise
+
+    def read(self, num=-1, encoding="utf-8"):
+        try:
+            return super().read(num, encoding)
+        except Exception:
+            self._status_suspect = True
+            raise
 
     def respond(self, cmd):
         """
@@ -264,6 +293,25 @@ class genesys(vxi11.Instrument):
     def I_limit(self, A):
         self.write(f":CURR {A:.3f}")
 
+    def set_VI(self, V, I):
+        """
+        Set the voltage and current limits together.
+
+        Parameters
+        ----------
+        V : float
+            Voltage limit in volts.
+        I : float
+            Current limit in amperes.
+
+        Notes
+        -----
+        - **Call**: Sends both settings as a single compound
+          SCPI message, so this costs one round trip rather
+          than two.
+        """
+        self.write(f":VOLT {V:.3f};:CURR {I:.3f}")
+
     # Output enable
     @property
     def output(self):
@@ -633,35 +681,46 @@ class genesys(vxi11.Instrument):
           raises RuntimeError if any summary bits indicate
           error or warning states.
           See §6.3.1.1, p. 92 and §6.3.8.1–2, pp. 111–112.
+        - **Writes**: Every write runs this first, as
+          long as :attr:`status_check_due`.
         - **Assignment**: Not supported.
         - **Deletion**: Not supported.
         """
+        self._last_status_check = time.monotonic()
+        self._status_suspect = True  # until the check passes
         self.checking_on = False  # avoid recursion!
-        val = int(self.respond("*STB?"))
-        self.checking_on = True
-        flags = {
-            k: bool(val & (1 << b)) for k, b in self._status_byte_flags.items()
-        }
-        if flags.get("QUES_summary") and any(
-            self.status.get(k) for k in ["V_fault", "I_fault", "fan", "sense"]
-        ):
-            raise RuntimeError(
-                "Questionable condition"
-                + "|".join(k for k in self.status.keys() if self.status.get(k))
-                + "detected"
-            )
-        elif flags.get("QUES_summary"):
-            raise RuntimeError("unknown questionalbe status!")
-        if flags.get("ESB") and any(self.event_status.values()):
-            raise RuntimeError(
-                "Event status flag"
-                + "|".join(
-                    k
-                    for k in self.event_status.keys()
-                    if self.event_status.get(k)
+        try:
+            val = int(self.respond("*STB?"))
+            flags = {
+                k: bool(val & (1 << b))
+                for k, b in self._status_byte_flags.items()
+            }
+            if flags.get("QUES_summary") and any(
+                self.status.get(k)
+                for k in ["V_fault", "I_fault", "fan", "sense"]
+            ):
+                raise RuntimeError(
+                    "Questionable condition"
+                    + "|".join(
+                        k for k in self.status.keys() if self.status.get(k)
+                    )
+                    + "detected"
+                )
+            elif flags.get("QUES_summary"):
+                raise RuntimeError("unknown questionalbe status!")
+            if flags.get("ESB") and any(self.event_status.values()):
+                raise RuntimeError(
+                    "Event status flag"
+                    + "|".join(
+                        k
+                        for k in self.event_status.keys()
+                        if self.event_status.get(k)
+                    )
+                    + "active"
                 )
-                + "active"
-            )
+        finally:
+            self.checking_on = True
+        self._status_suspect = False
         return flags
 
     @property
@@ -1,6 +1,7 @@
 from .gpib_eth import gpib_eth
 from .log_inst import logger
 from pint import UnitRegistry, Quantity
+import numpy as np
 import warnings
 
 ureg = UnitRegistry()
@@ -41,6 +42,10 @@ class LakeShore475(gpib_eth):
         "power_on": 7,
     }
 
+    # Gauss per unit for each code of UNIT? -- Oe and A/m measure H, which
+    # (in the air gap of the magnet) we take as B/mu0
+    _G_per_unit = {1: 1.0, 2: 1e4, 3: 1.0, 4: 4e-3 * np.pi}
+
     def __init__(self, prologix_instance=None, address=12, eos=0):
         """Initialize instance of connection to hall probe
 
@@ -73,16 +78,43 @@ class LakeShore475(gpib_eth):
         """Return the *IDN? string (manufacturer, model, serial, date)."""
         return self.respond("*IDN?")
 
+    def write(self, gpibstr):
+        if (
+            gpibstr.startswith("UNIT") and not gpibstr.endswith("?")
+        ) or gpibstr.startswith("*RST"):
+            self._unit_code = None  # the units have (or may have) changed
+        super().write(gpibstr)
+
+    @property
+    def unit_code(self):
+        """
+        The code for the field units (1 -- G, 2 -- T, 3 -- Oe, 4 -- A/m).
+
+        Notes
+        -----
+        - **Reading**: Queries UNIT? the first time, and then
+          remembers the answer until UNIT (or `*RST`) is written again.
+        - **Assignment**: Writes UNIT.
+        - **Deletion**: Not supported.
+        """
+        if getattr(self, "_unit_code", None) is None:
+            self._unit_code = int(self.respond("UNIT?"))
+        return self._unit_code
+
+    @unit_code.setter
+    def unit_code(self, code: int):
+        self.write(f"UNIT {code}")
+
     def _get_field_units(self):
         """
-        Query the instrument for the current magnetic field units.
+        The magnetic field units that the instrument is set to.
 
         Returns
         -------
         pint.Unit
             The unit corresponding to the instrument's current setting.
         """
-        unit_code = int(self.respond("UNIT?"))
+        unit_code = self.unit_code
         unit_map = {
             1: ureg.gauss,
             2: ureg.tesla,
@@ -113,6 +145,26 @@ class LakeShore475(gpib_eth):
         - **Assignment**: Not supported.
         - **Deletion**: Not supported.
         """
+        return self._read_field() * self._get_field_units()
+
+    @property
+    def field_G_fast(self):
+        """
+        The magnetic field in Gauss, as a plain float.
+
+        Unlike :attr:`field`, this doesn't build a pint quantity, and
+        the units come from the cached :attr:`unit_code`, so each reading
+        costs a single RDGFIELD? round trip.
+        """
+        unit_code = self.unit_code
+        if unit_code not in self._G_per_unit:
+            raise ValueError(
+                f"the gaussmeter reports an unknown unit code, {unit_code}"
+            )
+        return self._read_field() * self._G_per_unit[unit_code]
+
+    def _read_field(self):
+        "RDGFIELD?, as a float in the current units"
         if not self._has_been_zeroed:
             warnings.warn(
                 "The field has not been zeroed! You should call the"
@@ -131,9 +183,7 @@ class LakeShore475(gpib_eth):
                 )
             else:
                 raise ValueError("Other type of error: %s" % resp)
-
-        units = self._get_field_units()
-        return value * units
+        return value
 
     @property
     def range(self) -> int:
@@ -454,7 +504,7 @@ class LakeShore475(gpib_eth):
     @property
     def field_in_G(self):
         "helper function to give the field in Gauss as a simple float"
-        return self.field.to("T").magnitude * 1e4
+        return self.field_G_fast
 
     @property
     def relay_state(self):
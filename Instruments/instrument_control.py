@@ -13,6 +13,7 @@ and it provides the capability to start and stop the log.
 import socket
 import time
 import pickle
+from contextlib import contextmanager
 from collections.abc import Iterable
 from collections import OrderedDict
 from .inst_dict_property import inst_dict_property
@@ -189,10 +190,25 @@ class instrument_control(object):
         return pickle.loads(retval[: -len("ENDTCPIPBLOCK")])
 
     def set_power(self, dBm):
-        "Sets the power of the Bridge12"
+        """Sets the power of the Bridge12 (use :func:`wait_settled` to wait
+        until it has settled)"""
         self.send("SET_POWER %0.2f" % dBm)
         return
 
+    def wait_settled(self):
+        """Wait until the power set by :func:`set_power` has settled -- the
+        server reads the Rx until it converges.
+
+        Returns
+        =======
+        power : float
+            The power setting, in dBm.
+        """
+        self.send("WAIT_SETTLED")
+        retval = self.get()
+        retval = float(retval)
+        return retval
+
     def dip_lock(self, start_f, stop_f):
         """Runs dip lock using start_f and stop_f as freq range, leaves
         Bridge12 at resonance frequency"""
@@ -206,12 +222,107 @@ class instrument_control(object):
         retval = float(retval)
         return retval
 
+    def dip_track(self, interval=10.0):
+        """Have the server follow the microwave dip as it drifts, starting
+        from the current frequency (which should be at the dip -- *e.g.*
+        from the tuning GUI).
+        Every `interval` seconds that the server is idle, it probes the dip
+        and re-centers the frequency (see :class:`dip_tracker`).
+        An `interval` of 0 stops tracking.
+
+        Returns
+        =======
+        center : float
+            The frequency (in Hz) that tracking starts from.
+        """
+        self.send("DIP_TRACK %0.3f" % interval)
+        if interval <= 0:
+            return None
+        retval = self.get()
+        return float(retval)
+
+    def hold_dip_track(self):
+        """stop the dip tracker from probing (and so moving the microwave
+        frequency), until :func:`resume_dip_track`"""
+        self.send("DIP_TRACK_HOLD")
+
+    def resume_dip_track(self):
+        self.send("DIP_TRACK_RESUME")
+
+    @contextmanager
+    def dip_track_held(self):
+        """Hold the dip tracker for the duration of a with block -- *e.g.*
+        around an acquisition, which mustn't see the frequency move."""
+        self.hold_dip_track()
+        try:
+            yield
+        finally:
+            self.resume_dip_track()
+
+    def get_dip_history(self):
+        """Return the history of the dip tracker, as a structured array
+        with fields time, center (in Hz), and Rx (in dBm), or None if the
+        dip isn't being tracked."""
+        self.send("GET_DIP_HISTORY")
+        retval = self.get_bytes(b"ENDTCPIPBLOCK")
+        return pickle.loads(retval[: -len("ENDTCPIPBLOCK")])
+
+    def field_lock(self, interval=2.0):
+        """Have the server hold the field at the value it was last set to,
+        by adjusting the Z0 shim every `interval` seconds that it's idle
+        (see :class:`field_lock`).
+        An `interval` of 0 stops the lock.
+
+        Returns
+        =======
+        Z0_V : float
+            The Z0 voltage that the lock starts from.
+        """
+        self.send("FIELD_LOCK %0.3f" % interval)
+        if interval <= 0:
+            return None
+        retval = self.get()
+        return float(retval)
+
+    def hold_field_lock(self):
+        "stop the field lock from changing Z0, until :func:`resume_field_lock`"
+        self.send("FIELD_LOCK_HOLD")
+
+    def resume_field_lock(self):
+        self.send("FIELD_LOCK_RESUME")
+
+    @contextmanager
+    def field_lock_held(self):
+        """Hold the field lock for the duration of a with block -- *e.g.*
+        around an acquisition that must not see the shims change."""
+        self.hold_field_lock()
+        try:
+            yield
+        finally:
+            self.resume_field_lock()
+
+    def get_field_lock_history(self):
+        """Return the history of the field lock, as a structured array with
+        fields time, field (in G), and Z0 (in V), or None if the field
+        isn't locked."""
+        self.send("GET_FIELD_LOCK_HISTORY")
+        retval = self.get_bytes(b"ENDTCPIPBLOCK")
+        return pickle.loads(retval[: -len("ENDTCPIPBLOCK")])
+
     def get_field(self):
         self.send("GET_FIELD")
         retval = self.get()
         retval = float(retval)
         return retval
 
+    def get_field_history(self, seconds):
+        """Return the field readings that the server took over the last
+        `seconds`, as a structured array with fields time and field (in
+        G)."""
+        self.send(f"GET_FIELD_HISTORY {seconds}")
+        retval = self.get_bytes(b"ENDTCPIPBLOCK")
+        return pickle.loads(retval[: -len("ENDTCPIPBLOCK")])
+
     def get_shims(self):
         """Return shim readbacks from the server and refresh local caches."""
         self.send("GET_SHIM")
@@ -10,6 +10,14 @@ from Instruments import (
     ShimDictMapping,
 )
 from Instruments.field_feedback import ramp_field
+from Instruments.dip_tracker import dip_tracker
+from Instruments.field_calibration import field_calibration
+from Instruments.field_lock import field_lock
+from Instruments.field_sampler import field_sampler
+from Instruments.power_ramp import ramp_power, settle_model, wait_settled
+from Instruments.tuning_curve_store import (
+    default_filename as tuning_curve_file,
+)
 import SpinCore_pp
 
 IP = "0.0.0.0"
@@ -60,7 +68,7 @@ def main():
         gigatronics(
             prologix_instance=p, address=config_dict["gigatronics_address"]
         ) as g,
-        Bridge12() as b,
+        Bridge12(tuning_curve_file=tuning_curve_file) as b,
         LakeShore475(p) as h,
         ShimDictMapping(
             config_dict["shim_address"],
@@ -74,11 +82,30 @@ def main():
         sock.bind((IP, PORT))
         this_logobj = logobj()
         desired_field_G = None
+        tracker = None  # set to a dip_tracker by DIP_TRACK
+        power_model = settle_model()  # learns how long power steps take
+        fs = field_sampler(h)  # all field readings go through this
+        calibration = field_calibration()  # where past ramps settled
+        lock = None  # set to a field_lock by FIELD_LOCK
+
+        def start_lock(interval):
+            return field_lock(
+                fs,
+                sh_map,
+                desired_field_G,
+                config_dict["z0_field_v_voltage_G_V"],
+                interval=interval,
+            )
 
         def get_field_for_logging():
-            current_field_G = h.field_in_G
+            nonlocal lock
+            current_field_G = fs.latest(max_age=1.0)
             if desired_field_G is None:
                 return current_field_G
+            if lock is not None and (lock.held or not lock.saturated):
+                # the lock takes care of the field, or it's being held so
+                # that the shims don't change
+                return current_field_G
             field_error_G = abs(current_field_G - desired_field_G)
             if 0.2 <= field_error_G:
                 logging.info(
@@ -91,14 +118,17 @@ def main():
                 current_field_G = ramp_field(
                     desired_field_G,
                     config_dict,
-                    h,
+                    fs,
                     gen,
                     sh_map,
+                    calibration=calibration,
                 )
+                if lock is not None:
+                    lock = start_lock(lock.interval)
             return current_field_G
 
         def process_cmd(cmd, this_logobj):
-            nonlocal desired_field_G
+            nonlocal desired_field_G, tracker, lock
             leave_open = True
             cmd = cmd.strip()
             print("I am processing", cmd)
@@ -176,53 +206,10 @@ def main():
                             # }}}
                             this_logobj.wg_has_been_flipped = True
                         dBm_setting = float(args[1])
-                        last_power = b.power_float()
-                        if dBm_setting > last_power + 3:
-                            last_power += 3
-                            nsecs = -1 * time.time()
-                            logging.info(f"SETTING TO... {last_power}")
-                            b.set_power(last_power)
-                            logging.debug("returned from set power")
-                            for j in range(30):
-                                if b.power_float() < last_power:
-                                    time.sleep(0.1)
-                                else:
-                                    break
-                            nsecs += time.time()
-                            logging.debug(
-                                f"took, {j}, tries and,{nsecs}, seconds"
-                            )
-                            while dBm_setting > last_power + 3:
-                                last_power += 3
-                                nsecs = -1 * time.time()
-                                logging.info(f"SETTING TO... {last_power}")
-                                b.set_power(last_power)
-                                logging.debug("returned from set power")
-                                for j in range(30):
-                                    if b.power_float() < last_power:
-                                        time.sleep(0.1)
-                                    else:
-                                        break
-                                nsecs += time.time()
-                                logging.debug(
-                                    f"took, {j}, tries and, {nsecs}, seconds"
-                                )
-                        logging.info(
-                            "FINALLY - SETTING TO DESIRED"
-                            "POWER of {dBm_setting}"
-                        )
                         nsecs = -1 * time.time()
-                        b.set_power(dBm_setting)
-                        logging.debug("returned from set power")
-                        for j in range(30):
-                            if b.power_float() < last_power:
-                                time.sleep(0.1)
-                            else:
-                                break
+                        ramp_power(b, dBm_setting, power_model)
                         nsecs += time.time()
-                        logging.debug(
-                            f"took, {j}, tries and, {nsecs}, seconds"
-                        )
+                        logging.debug(f"took {nsecs} seconds to ramp")
                     case b"SET_FREQ":
                         logging.debug(f"SET_FREQ to {args[1]}")
                         if not this_logobj.wg_has_been_flipped:
@@ -243,17 +230,55 @@ def main():
                                 " at the amp!!"
                             )
                         b.set_freq(float(args[1]))
+                        if tracker is not None:
+                            # track from the new frequency
+                            tracker = dip_tracker(b, interval=tracker.interval)
+                    case b"DIP_TRACK":
+                        interval = float(args[1])
+                        if interval <= 0:
+                            tracker = None
+                        else:
+                            if not this_logobj.wg_has_been_flipped:
+                                raise ValueError(
+                                    "Turn on the power, and set the"
+                                    " frequency to the dip, before"
+                                    " tracking it"
+                                )
+                            tracker = dip_tracker(b, interval=interval)
+                            conn.send(
+                                ("%0.6f" % tracker.center).encode("ASCII")
+                            )
+                    case b"GET_FIELD_HISTORY":
+                        retval = fs.history(float(args[1]))
+                        conn.send(pickle.dumps(retval) + b"ENDTCPIPBLOCK")
                     case b"SET_FIELD":
                         B0_des_G = float(args[1])  # B in G
                         desired_field_G = B0_des_G
-                        true_B0_G = ramp_field(
+                        true_B0_G, stats = ramp_field(
                             B0_des_G,
                             config_dict,
-                            h,
+                            fs,
                             gen,
                             sh_map,
+                            return_stats=True,
+                            calibration=calibration,
                         )
+                        logging.info(f"field settled with {stats}")
+                        if lock is not None:
+                            # lock on to the new field
+                            lock = start_lock(lock.interval)
                         conn.send(("%0.2f" % true_B0_G).encode("ASCII"))
+                    case b"FIELD_LOCK":
+                        interval = float(args[1])
+                        if interval <= 0:
+                            lock = None
+                        else:
+                            if desired_field_G is None:
+                                raise ValueError(
+                                    "Set the field before locking it"
+                                )
+                            lock = start_lock(interval)
+                            conn.send(("%0.4f" % lock.V).encode("ASCII"))
                     case _:
                         raise ValueError(
                             "I don't understand this 2"
@@ -265,11 +290,20 @@ def main():
                     case b"CLOSE":
                         print("closing connection")
                         leave_open = False
+                        tracker = None
                         b.soft_shutdown()
                         conn.close()
                     case b"GET_POWER":
                         result = b.power_float()
                         conn.send(("%0.1f" % result).encode("ASCII"))
+                    case b"WAIT_SETTLED":
+                        settled, values = wait_settled(b.rxpowerdbm_float)
+                        if not settled:
+                            logging.warning(
+                                f"Rx still hasn't settled: {values}"
+                            )
+                        result = b.power_float()
+                        conn.send(("%0.1f" % result).encode("ASCII"))
                     case b"QUIT":
                         print("closing connection")
                         conn.close()
@@ -283,9 +317,34 @@ def main():
                         conn.send(retval)
                         this_logobj.reset()
                     case b"MW_OFF":
+                        tracker = None
                         b.soft_shutdown()
+                    case b"GET_DIP_HISTORY":
+                        if tracker is None:
+                            retval = None
+                        else:
+                            retval = tracker.history_array
+                        conn.send(pickle.dumps(retval) + b"ENDTCPIPBLOCK")
+                    case b"DIP_TRACK_HOLD":
+                        if tracker is not None:
+                            tracker.hold()
+                    case b"DIP_TRACK_RESUME":
+                        if tracker is not None:
+                            tracker.resume()
+                    case b"FIELD_LOCK_HOLD":
+                        if lock is not None:
+                            lock.hold()
+                    case b"FIELD_LOCK_RESUME":
+                        if lock is not None:
+                            lock.resume()
+                    case b"GET_FIELD_LOCK_HISTORY":
+                        if lock is None:
+                            retval = None
+                        else:
+                            retval = lock.history_array
+                        conn.send(pickle.dumps(retval) + b"ENDTCPIPBLOCK")
                     case b"GET_FIELD":
-                        result = h.field_in_G
+                        result = fs.latest(max_age=fs.interval)
                         conn.send(("%0.2f" % result).encode("ASCII"))
                     case b"GET_SHIM":
                         retval = (
@@ -364,3 +423,8 @@ def main():
                             power=g.read_power(),
                             field=get_field_for_logging(),
                         )
+                    if tracker is not None:
+                        tracker.step_if_due()
+                    fs.sample_if_due()
+                    if lock is not None:
+                        lock.step_if_due()
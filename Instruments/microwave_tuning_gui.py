@@ -10,7 +10,10 @@ which is a good layout reference
 AG updated code to refactor to qt6 wity ChatGPT
 """
 
-from Instruments import Bridge12
+from Instruments import Bridge12, dip_tracker
+from Instruments.tuning_curve_store import (
+    default_filename as tuning_curve_file,
+)
 from scipy.interpolate import interp1d
 import time
 import sys
@@ -54,7 +57,9 @@ class TuningWindow(qt6w.QMainWindow):
         # if I'm in frequency mode, then update and redraw
         # if not, don't do anything
         if self.fmode:
-            self.dip_frq_GHz = self.B12.get_freq() / 1e9
+            # follow the dip as it drifts
+            self.tracker.step_if_due()
+            self.dip_frq_GHz = self.tracker.center / 1e9
             self.regen_plots()
 
     def save_plot(self):
@@ -218,6 +223,9 @@ class TuningWindow(qt6w.QMainWindow):
         if self.fmode:
             if not self._already_fmode:
                 self.B12.set_freq(self.dip_frq_GHz * 1e9)
+                self.tracker = dip_tracker(
+                    self.B12, center=self.dip_frq_GHz * 1e9, interval=5.0
+                )
                 self._already_fmode = True
             #    if hasattr(self, 'frq_log'):
             #        del self.frq_log
@@ -234,7 +242,8 @@ class TuningWindow(qt6w.QMainWindow):
             self.axes.text(
                 0.1,
                 0.5,
-                f"entered frequency mode with {self.dip_frq_GHz:0.6f} GHz",
+                f"entered frequency mode with {self.dip_frq_GHz:0.6f} GHz"
+                f" (drifted by {self.tracker.drift / 1e3:+0.0f} kHz)",
                 transform=self.axes.transAxes,
             )
             self.canvas.draw()
@@ -477,7 +486,7 @@ class TuningWindow(qt6w.QMainWindow):
 def main():
     myconfig = SpinCore_pp.configuration("active.ini")
     app = qt6w.QApplication(sys.argv)
-    with Bridge12() as b:
+    with Bridge12(tuning_curve_file=tuning_curve_file) as b:
         b.set_wg(True)
         b.set_rf(True)
         b.set_amp(True)
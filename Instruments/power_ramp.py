@@ -0,0 +1,159 @@
+import logging
+import numpy as np
+import time
+
+
+class settle_model(object):
+    """Learns how long the Bridge12 output takes to settle after a power
+    step, as a function of the size of the step (in 0.5 dB bins).
+
+    Each settle time that's observed is folded into an exponentially
+    weighted average for its bin.
+    """
+
+    def __init__(self, default=0.5, alpha=0.3):
+        """
+        Parameters
+        ----------
+        default : float
+            The settle time (in s) to assume before anything is learned.
+        alpha : float
+            The weight given to each new observation.
+        """
+        self.default = default
+        self.alpha = alpha
+        self.times = {}
+
+    @staticmethod
+    def _bin(step_dBm):
+        return round(abs(step_dBm) * 2) / 2
+
+    def predict(self, step_dBm):
+        """the expected settle time (in s) for a step of `step_dBm`, from the
+        nearest bin that has been learned"""
+        if len(self.times) == 0:
+            return self.default
+        thisbin = self._bin(step_dBm)
+        nearest = min(self.times, key=lambda x: abs(x - thisbin))
+        return self.times[nearest]
+
+    def update(self, step_dBm, settle_time):
+        thisbin = self._bin(step_dBm)
+        if thisbin in self.times:
+            self.times[thisbin] += self.alpha * (
+                settle_time - self.times[thisbin]
+            )
+        else:
+            self.times[thisbin] = settle_time
+
+
+def wait_settled(
+    readback, tol=0.2, n=3, first_wait=0.0, timeout=10.0, return_times=False
+):
+    """Wait until `n` successive readbacks agree within `tol`.
+
+    Parameters
+    ----------
+    readback : function
+        Returns a float, or a tuple of floats (*e.g.* Rx and the power
+        meter reading), all in dB(m).
+    first_wait : float
+        How long (in s) to wait before the first readback -- *e.g.* from
+        :func:`settle_model.predict`.
+        Readbacks then follow one another at an interval of a fifth of this
+        (but at least 20 ms).
+    timeout : float
+        How long (in s) to keep trying.
+    return_times : bool
+        Also return the (:func:`time.monotonic`) times of the readbacks.
+
+    Returns
+    -------
+    settled : bool
+        False if we timed out.
+    values : ndarray
+        The last `n` readbacks.
+    times : ndarray
+        Only if `return_times` is set -- when each of `values` was read.
+    """
+    deadline = time.monotonic() + timeout
+    poll = max(first_wait / 5, 20e-3)
+    time.sleep(first_wait)
+    values = []
+    times = []
+    while True:
+        values.append(np.atleast_1d(readback()))
+        times.append(time.monotonic())
+        values = values[-n:]
+        times = times[-n:]
+        settled = False
+        if len(values) == n:
+            spread = np.ptp(np.array(values), axis=0)
+            settled = np.all(spread <= tol)
+        if settled or time.monotonic() > deadline:
+            if return_times:
+                return bool(settled), np.array(values), np.array(times)
+            return bool(settled), np.array(values)
+        time.sleep(poll)
+
+
+def ramp_power(b, dBm, model, readback=None, max_step=3.0, timeout=10.0):
+    """Ramp the Bridge12 to `dBm` in steps of at most `max_step` dB, and
+    return as soon as the output has settled at each step.
+
+    After each step, :func:`wait_settled` first waits for half as long as
+    `model` predicts, then reads `readback` until it converges.
+    The time from the step to the first readback that agrees with the ones
+    after it is used to update `model` -- since the readbacks start before
+    the predicted time, this can come out shorter than the prediction, and
+    the model learns when the output settles faster than it expected.
+
+    Parameters
+    ----------
+    b : Bridge12
+    dBm : float
+    model : settle_model
+    readback : function
+        See :func:`wait_settled`.
+        Defaults to the Rx of the Bridge12.
+    timeout : float
+        How long (in s) to wait for each step to settle.
+
+    Returns
+    -------
+    settled : bool
+        False if the last step didn't settle before `timeout`.
+    """
+    if readback is None:
+        readback = b.rxpowerdbm_float
+    last_power = b.power_float()
+    settled = True
+    while True:
+        if dBm > last_power + max_step:
+            this_power = last_power + max_step
+        else:
+            this_power = dBm
+        step = this_power - last_power
+        logging.info(f"SETTING TO... {this_power}")
+        start = time.monotonic()
+        b.set_power(this_power)  # this also checks the power readback
+        settled, values, times = wait_settled(
+            readback,
+            first_wait=model.predict(step) / 2,
+            timeout=timeout,
+            return_times=True,
+        )
+        # the output had settled by the first readback of the converged
+        # window
+        settle_time = times[0] - start
+        if settled:
+            model.update(step, settle_time)
+        else:
+            logging.warning(
+                f"power didn't settle within {timeout} s of stepping to"
+                f" {this_power} dBm (last readbacks {values})"
+            )
+        logging.debug(f"step of {step} dB took {settle_time} s to settle")
+        last_power = this_power
+        if this_power == dBm:
+            return settled
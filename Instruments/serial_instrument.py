@@ -3,6 +3,9 @@ from serial.tools.list_ports import comports
 from serial import SerialException
 from pyspecdata import strm
 import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import logging
 
@@ -16,6 +19,18 @@ class SerialInstrument(object):
     Provides initialization (:func:`__init__`) to start the connection,
     as well as :func:`write` :func:`read` and :func:`respond` functions.
     Can be used inside a with block.
+
+    Every instrument owns a lock (:attr:`io_lock`) that is held for each
+    exchange with the port, and, on demand, a single worker thread that
+    runs queued calls (:func:`submit`, :func:`write_async`,
+    :func:`respond_async`) one at a time.
+    Because each port has its own worker, several instruments can be
+    driven in parallel from one script, *e.g.*::
+
+        >>> with GDS_scope() as g, AFG() as a:
+        >>>     scope_data = g.submit(g.waveform, ch=2)
+        >>>     a.write_async("SOUR1:FREQ +1.0E+06")
+        >>>     d = scope_data.result()
     """
 
     def __init__(self, textidn, **kwargs):
@@ -34,6 +49,7 @@ class SerialInstrument(object):
         """
         self._textidn = textidn
         self._id_attempts_left = 12
+        self.io_lock = threading.RLock()
         if textidn is None:
             self.show_instruments()
         else:
@@ -52,9 +68,54 @@ class SerialInstrument(object):
         return self
 
     def __exit__(self, exception_type, exception_value, traceback):
+        if hasattr(self, "_io_worker"):
+            self._io_worker.shutdown(wait=True)
+            del self._io_worker
         self.connection.close()
         return
 
+    # {{{ queued I/O
+    def submit(self, fn, *args, **kwargs):
+        """Queue ``fn(*args, **kwargs)`` on this port's worker thread, and
+        return a :class:`concurrent.futures.Future` for the result.
+
+        Calls queued on the same instrument run in order, one at a time,
+        and hold :attr:`io_lock` for their whole duration, so a
+        multi-step exchange (*e.g.* :func:`GDS_scope.waveform`) is never
+        interleaved with another thread's commands.
+        """
+        if not hasattr(self, "_io_worker"):
+            self._io_worker = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=str(self._textidn)
+            )
+
+        def locked_call():
+            with self.io_lock:
+                return fn(*args, **kwargs)
+
+        return self._io_worker.submit(locked_call)
+
+    def write_async(self, *args):
+        """Same as :func:`write`, but queued on the worker thread.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+        """
+        return self.submit(self.write, *args)
+
+    def respond_async(self, *args, **kwargs):
+        """Same as :func:`respond`, but queued on the worker thread.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Its ``result()`` is the response string.
+        """
+        return self.submit(self.respond, *args, **kwargs)
+
+    # }}}
+
     def write(self, *args):
         """Send info to the instrument.  Take a comma-separated list of
         arguments, which are converted to strings and separated by a space,
@@ -69,33 +130,115 @@ class SerialInstrument(object):
                 "when trying to write, port looks like this:", self.connection
             )
         )
-        self.connection.write(text + b"\n")
+        with self.io_lock:
+            self.connection.write(text + b"\n")
         return
 
     def read(self, *args, **kwargs):
-        retval = self.connection.read(*args, **kwargs)
+        with self.io_lock:
+            retval = self.connection.read(*args, **kwargs)
         return retval.decode("utf-8")
 
     def read_binary(self, *args, **kwargs):
-        retval = self.connection.read(*args, **kwargs)
-        j = 0
-        while j < 10 and len(args) == 1 and len(retval) < args[0]:
-            retval += self.connection.read(*args, **kwargs)
-            j += 1
+        with self.io_lock:
+            retval = self.connection.read(*args, **kwargs)
+            j = 0
+            while j < 10 and len(args) == 1 and len(retval) < args[0]:
+                retval += self.connection.read(args[0] - len(retval), **kwargs)
+                j += 1
         return retval
 
-    def flush(self, timeout=1):
+    def read_until(self, terminator=b"\n"):
+        """Read everything up to and including `terminator` in a single
+        call, and return it as a string (`terminator` included)."""
+        with self.io_lock:
+            retval = self.connection.read_until(terminator)
+        if not retval.endswith(terminator):
+            raise RuntimeError(
+                "timed out before I found %s -- I got %s"
+                % (repr(terminator), repr(retval[-100:]))
+            )
+        return retval.decode("utf-8")
+
+    def read_block(self, out=None, leading_hash=True):
+        """Read an IEEE 488.2 definite length block
+        (``#<n><length><data>``, where ``<n>`` is the number of digits
+        in ``<length>``), and return the data as a memoryview.
+
+        Parameters
+        ----------
+        out : writable buffer (*e.g.* bytearray or numpy array)
+            If given, the data is read directly into this buffer, which
+            must be at least as long as the block.
+            Otherwise, a buffer of the right size is allocated.
+        leading_hash : bool
+            Set to False if the ``#`` has already been consumed
+            (*e.g.* by :func:`read_until`).
+        """
+        with self.io_lock:
+            if leading_hash:
+                hashtag = self.connection.read(1)
+                if hashtag != b"#":
+                    raise ValueError(
+                        "expected a block starting with #, but got %s"
+                        % repr(hashtag)
+                    )
+            n_digits = self.connection.read(1)
+            if not n_digits.isdigit() or n_digits == b"0":
+                raise ValueError(
+                    "only definite length blocks are supported, but the"
+                    " block header gives %s for the number of digits"
+                    % repr(n_digits)
+                )
+            length = self.connection.read(int(n_digits))
+            if len(length) < int(n_digits) or not length.isdigit():
+                raise ValueError(
+                    "couldn't read the block length -- got %s" % repr(length)
+                )
+            length = int(length)
+            if out is None:
+                out = bytearray(length)
+            view = memoryview(out).cast("B")
+            if len(view) < length:
+                raise ValueError(
+                    "the block is %d bytes, but the buffer you gave is only"
+                    " %d bytes" % (length, len(view))
+                )
+            view = view[:length]
+            pos = 0
+            while pos < length:
+                n_read = self.connection.readinto(view[pos:])
+                if n_read == 0:
+                    raise RuntimeError(
+                        "timed out after reading %d of %d bytes"
+                        % (pos, length)
+                    )
+                pos += n_read
+        return view
+
+    def flush(self, timeout=1, quiet=0.02):
         """Flush the input (say we didn't read all of it, *etc.*)
 
+        Only reads the bytes that ``in_waiting`` reports, so this never
+        blocks on an empty port.  After each drain, wait `quiet` seconds
+        to catch bytes that are still in flight, and return as soon as
+        a quiet period passes with nothing new (or after `timeout`
+        seconds in total).
+
         Note that there are routines called "flush" in serial, but these
         seem to not be useful.
         """
-        old_timeout = self.connection.timeout
-        self.connection.timeout = timeout
-        result = "blah"
-        while len(result) > 0:
-            result = self.connection.read(2000).decode("utf-8")
-        self.connection.timeout = old_timeout
+        deadline = time.monotonic() + timeout
+        with self.io_lock:
+            while True:
+                n_waiting = self.connection.in_waiting
+                if n_waiting > 0:
+                    self.connection.read(n_waiting)
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(quiet)
+                if self.connection.in_waiting == 0:
+                    break
         return
 
     def respond(self, *args, **kwargs):
@@ -113,14 +256,15 @@ class SerialInstrument(object):
         message_len = None
         if "message_len" in kwargs:
             message_len = kwargs.pop("message_len")
-        self.write(*args)
-        old_timeout = self.connection.timeout
-        if message_len is None:
-            self.connection.timeout = 5
-            retval = self.connection.readline().decode("utf-8")
-        else:
-            retval = self.connection.read(message_len).decode("utf-8")
-        self.connection.timeout = old_timeout
+        with self.io_lock:
+            self.write(*args)
+            old_timeout = self.connection.timeout
+            if message_len is None:
+                self.connection.timeout = 5
+                retval = self.connection.readline().decode("utf-8")
+            else:
+                retval = self.connection.read(message_len).decode("utf-8")
+            self.connection.timeout = old_timeout
         return retval
 
     def show_instruments(self):
@@ -143,12 +287,73 @@ class SerialInstrument(object):
                 pass
 
     # {{{ common commands
+    def _respond_with_backoff(
+        self, cmd, tries=200, first_timeout=0.02, max_timeout=1.0
+    ):
+        """Send `cmd` and wait for a line in response, doubling the read
+        timeout (up to `max_timeout`) each time nothing comes back.
+
+        The command is only resent after a wait that came back empty, so
+        a busy instrument is not flooded with queries.
+        If we did have to resend, the instrument owes us one more (late)
+        reply for each resend, so we read one line per resend before
+        returning -- otherwise, these would be read as the replies to
+        the next commands.
+
+        Returns
+        -------
+        response : str
+            The response, or an empty string if we gave up after `tries`
+            attempts.
+        """
+        with self.io_lock:
+            old_timeout = self.connection.timeout
+            this_timeout = first_timeout
+            response = ""
+            try:
+                for j in range(tries):
+                    self.connection.timeout = this_timeout
+                    self.write(cmd)
+                    response = self.connection.readline().decode("utf-8")
+                    if len(response) > 0:
+                        if not response.endswith("\n"):
+                            # we timed out in the middle of the line
+                            self.connection.timeout = max_timeout
+                            response += self.connection.readline().decode(
+                                "utf-8"
+                            )
+                        break
+                    this_timeout = min(2 * this_timeout, max_timeout)
+                if j > 0 and len(response) > 0:
+                    self.connection.timeout = max_timeout
+                    for k in range(j):
+                        if len(self.connection.readline()) == 0:
+                            break  # it didn't answer the rest
+            finally:
+                self.connection.timeout = old_timeout
+        return response
+
+    def wait_complete(self, tries=200):
+        """Wait until the instrument reports that all pending operations
+        are finished (``*OPC?`` returns 1).
+
+        Call this at the end of any commands that take a while to
+        execute.
+        The query is polled with exponential backoff, so an instrument
+        that is already idle costs a single round trip.
+        """
+        response = self._respond_with_backoff("*OPC?", tries=tries)
+        if response.strip() != "1":
+            raise RuntimeError(
+                "I asked the %s if it was done %d times, and the last"
+                " response was %s" % (self._textidn, tries, repr(response))
+            )
+        return
+
     def demand(self, cmd, value, tries=200, error=1e-2):
         """Demand that the result of cmd contains `value`.
-        Keep trying until the instrument is ready to respond, and then flush
-        the buffer.
-        (Set to a relatively short timeout, and keep sending the command over
-        and over.)
+        Wait until the instrument is ready to respond (see
+        :func:`_respond_with_backoff`), and then check the response.
 
         Parameters
         ----------
@@ -161,14 +366,11 @@ class SerialInstrument(object):
                 When I convert the response to a number, the number matches to
                 within `error` (relative error).
         """
-        old_timeout = self.connection.timeout
-        self.connection.timeout = 0.1
-        response = None
-        j = 0
-        while response is None or len(response) == 0 and j < tries:
-            j += 1
-            self.write(cmd)  # to make sure it's done resetting
-            response = self.connection.readline().decode("utf-8")
+        response = self._respond_with_backoff(cmd, tries=tries)
+        if len(response) == 0:
+            raise RuntimeError(
+                strm("I sent", cmd, tries, "times and never got a response")
+            )
         if type(value) is str:
             m = re.match(value, response)
             if not m:
@@ -183,9 +385,6 @@ class SerialInstrument(object):
                         + "'",
                     )
                 )
-            self.flush(timeout=0.1)
-            self.connection.timeout = old_timeout
-            self.flush()
             return response
         else:
             try:
@@ -198,7 +397,6 @@ class SerialInstrument(object):
             if response == 0 and value == 0:
                 return response
             if abs((value - response) * 2 / (response + value)) < error:
-                self.flush()
                 return response
             else:
                 raise RuntimeError(
@@ -213,20 +411,14 @@ class SerialInstrument(object):
                 )
 
     def check_idn(self, tries=200):
-        """Check IDN and wait a while for a reponse.  This is a bit of a hack,
-        used to make sure the instrument is ready, and can be called at the end
-        of any commands that take a while to execute.  It also executes a flush
-        at the end, to make sure that there's nothing stuck in the buffer."""
-        old_timeout = self.connection.timeout
-        self.connection.timeout = 5
-        response = None
-        j = 0
-        while response is None or len(response) == 0 and j < tries:
-            j += 1
-            response = self.respond(
-                "*IDN?"
-            )  # to make sure it's done resetting
-        if response is None or len(response) == 0:
+        """Check IDN and wait a while for a reponse.  This is used to make
+        sure the instrument is ready (*e.g.* after a reset) *and* that it
+        is the instrument we think it is.  To simply wait for a command to
+        finish, :func:`wait_complete` is cheaper."""
+        response = self._respond_with_backoff(
+            "*IDN?", tries=tries, max_timeout=5
+        )
+        if len(response) == 0:
             raise ValueError(
                 "I tried %d times to contact the %s, to no avail!!!"
                 % (tries, self._textidn)
@@ -234,8 +426,6 @@ class SerialInstrument(object):
         assert self._textidn in response, (
             repr(response) + " does not match " + repr(self._textidn)
         )
-        self.flush(timeout=0.1)
-        self.connection.timeout = old_timeout
         return response
 
     def reset(self):
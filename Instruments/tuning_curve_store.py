@@ -0,0 +1,127 @@
+import h5py
+import numpy as np
+import os
+import time
+
+default_filename = os.path.join(
+    os.path.expanduser("~"), "bridge12_tuning_curves.h5"
+)
+
+
+class tuning_curve_store(object):
+    """Keeps every tuning curve (Rx and Tx *vs.* frequency) that the
+    Bridge12 runs in an HDF5 file, so that they outlive the session.
+
+    The file holds an ``index`` table with one row per curve, giving its
+    ``time``, ``power`` (in dBm), and the ``fmin`` and ``fmax`` (in Hz) of
+    its frequencies, and the curves themselves, as ``curves/<row>/freq``,
+    ``rx`` and ``tx``.
+    The file is only opened while it's being read or written.
+    """
+
+    index_dtype = np.dtype(
+        [("time", "f8"), ("power", "f8"), ("fmin", "f8"), ("fmax", "f8")]
+    )
+
+    def __init__(self, filename=default_filename):
+        self.filename = filename
+
+    def add(self, freq, rx, tx, power, timestamp=None):
+        """store a tuning curve that was run at `power` dBm
+
+        Returns
+        -------
+        row : int
+            The row of the index that refers to this curve.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        freq = np.asarray(freq)
+        with h5py.File(self.filename, "a") as f:
+            if "index" not in f:
+                f.create_dataset(
+                    "index",
+                    shape=(0,),
+                    maxshape=(None,),
+                    dtype=self.index_dtype,
+                )
+            index = f["index"]
+            row = len(index)
+            index.resize((row + 1,))
+            index[row] = (timestamp, power, freq.min(), freq.max())
+            g = f.require_group("curves").create_group(str(row))
+            g.create_dataset("freq", data=freq)
+            g.create_dataset("rx", data=rx)
+            g.create_dataset("tx", data=tx)
+        return row
+
+    @property
+    def index(self):
+        "the index table (see the class docstring) as a structured array"
+        if not os.path.exists(self.filename):
+            return np.zeros(0, dtype=self.index_dtype)
+        with h5py.File(self.filename, "r") as f:
+            if "index" not in f:
+                return np.zeros(0, dtype=self.index_dtype)
+            return f["index"][:]
+
+    def __getitem__(self, row):
+        "the tuning curve in `row`, as a dictionary"
+        with h5py.File(self.filename, "r") as f:
+            retval = {k: v[:] for k, v in f["curves"][str(row)].items()}
+            for k in self.index_dtype.names:
+                retval[k] = f["index"][row][k]
+        return retval
+
+    def latest(self, power=None, freq_range=None, max_age=None):
+        """Find the most recent compatible tuning curve.
+
+        Parameters
+        ----------
+        power : float or None
+            Only curves run at this power (in dBm).
+        freq_range : tuple or None
+            Only curves that cover this range of frequencies (in Hz).
+        max_age : float or None
+            Only curves run within this many seconds.
+
+        Returns
+        -------
+        retval : dict or None
+            The curve (see :func:`__getitem__`), or None if there is no
+            compatible curve.
+        """
+        index = self.index
+        mask = np.ones(len(index), dtype=bool)
+        if power is not None:
+            mask &= abs(index["power"] - power) < 0.25
+        if freq_range is not None:
+            mask &= (index["fmin"] <= min(freq_range)) & (
+                index["fmax"] >= max(freq_range)
+            )
+        if max_age is not None:
+            mask &= index["time"] > time.time() - max_age
+        if not mask.any():
+            return None
+        rows = np.arange(len(index))[mask]
+        return self[rows[index["time"][mask].argmax()]]
+
+    def dip_history(self, power=None):
+        """The frequency with the lowest Rx in each stored curve (run at
+        `power` dBm, if given), as a structured array with fields time,
+        power, and dip (in Hz)."""
+        index = self.index
+        rows = np.arange(len(index))
+        if power is not None:
+            rows = rows[abs(index["power"] - power) < 0.25]
+        retval = np.zeros(
+            len(rows), dtype=[("time", "f8"), ("power", "f8"), ("dip", "f8")]
+        )
+        for j, row in enumerate(rows):
+            curve = self[row]
+            retval[j] = (
+                curve["time"],
+                curve["power"],
+                curve["freq"][curve["rx"].argmin()],
+            )
+        return retval
@@ -24,9 +24,7 @@ def collect(date,id_string,captures,wait):
             print("entering capture",x)
             print("AWAITING USER")
             input()
-            ch1_waveform = g.waveform(ch=1)
-            ch2_waveform = g.waveform(ch=2)
-            data = concat([ch1_waveform,ch2_waveform],'ch').reorder('t')
+            data = g.capture(channels=[1,2]).reorder('t')
             if x == 1:
                 channels = ((ndshape(data)) + ('capture',cap_len)).alloc()
                 channels.setaxis('t',data.getaxis('t')).set_units('t','s')
@@ -2,6 +2,9 @@
 #include <stdio.h>
 #include <math.h>
 #include <time.h>
+#ifdef _WIN32
+#include <windows.h>
+#endif
 
 #include "mrispinapi.h"
 
@@ -18,6 +21,12 @@ static int adc_offset_configureBoard(int adc_offset);
 static int adc_offset_programBoard(void);
 static int adc_offset_readData(int adc_offset, double* peak);
 
+/* nonzero while the pulse program that was last finished by stop_ppg is
+ * still on the board -- anything that re-initializes or reprograms the board
+ * sets it back to 0 */
+static int resident_program = 0;
+static int program_count = 0;
+
 char *get_time()
 {
     time_t ltime;
@@ -47,6 +56,7 @@ int configureTX(int adcOffset, double carrierFreq_MHz, double* tx_phases, int nP
     int j;
     double freqs[1] = {carrierFreq_MHz};
     double amp[1] = {amplitude};
+    resident_program = 0;
     ERROR_CATCH( spmri_init() );
     ERROR_CATCH( spmri_set_defaults() );
     ERROR_CATCH( spmri_set_adc_offset(adcOffset));
@@ -96,6 +106,7 @@ int init_ppg(){
 	// printf("imw_amp_bits: %d\n",cur_board->imw_amp_bits);
 	// printf("imw_sin_phase_bits: %d\n",cur_board->imw_sin_phase_bits);
 	// printf("imw_cos_phase_bits: %d\n",cur_board->imw_cos_phase_bits);
+    resident_program = 0;
     ERROR_CATCH(spmri_start_programming());
     return 0;
 }
@@ -109,9 +120,17 @@ int stop_ppg(){
                 // PB: flags = TTL low (off), data, opcode -- listed in radioprocessor g manual, delay
                 0x00,0,STOP,1.0*us
                 ));
+    program_count++;
+    resident_program = program_count;
     return 0;
 }
 
+/* identifies the pulse program that is on the board (a different number
+ * each time one is programmed), or 0 if there isn't one */
+int resident_ppg(){
+    return resident_program;
+}
+
 char *error_message = "";
 
 /* provide function that interprets series of tuples
@@ -120,11 +139,36 @@ char *error_message = "";
 /* DELAY: 'delay', time_len */
 /* MARKER: 'marker', string */
 /* JUMPTO: 'jumpto', string, no. times */
-DWORD jump_addresses[10];
-
-int ppg_element(char *str_label, double firstarg, int secondarg){ /*takes 3 vars*/
+#define N_JUMP_ADDRESSES 10
+DWORD jump_addresses[N_JUMP_ADDRESSES];
+
+/* the ppg elements, by number -- these must match ppg_opcodes in
+ * SpinCore_pp.i */
+enum ppg_opcode {
+    PPG_PULSE,
+    PPG_PULSE_TTL,
+    PPG_PHASE_RESET,
+    PPG_ACQUIRE,
+    PPG_DELAY,
+    PPG_DELAY_TTL,
+    PPG_MARKER,
+    PPG_JUMPTO,
+    PPG_N_OPCODES
+};
+static const char *ppg_opcode_names[PPG_N_OPCODES] = {
+    "pulse",
+    "pulse_TTL",
+    "phase_reset",
+    "acquire",
+    "delay",
+    "delay_TTL",
+    "marker",
+    "jumpto"
+};
+
+static int ppg_instruction(int opcode, double firstarg, int secondarg){
     int error_status;
-    if (strcmp(str_label,"pulse")==0){
+    if (opcode == PPG_PULSE){
         error_status = 0;
         /* COMMAND FOR PROGRAMMING RF PULSE */
         ERROR_CATCH(spmri_mri_inst(
@@ -135,7 +179,7 @@ int ppg_element(char *str_label, double firstarg, int secondarg){ /*takes 3 vars
                     // PB: flags = TTL low (off), data, opcode -- listed in radioprocessor g manual, delay
                     0x00,0,CONTINUE,firstarg*us
                     ));
-    }else if (strcmp(str_label,"pulse_TTL")==0){
+    }else if (opcode == PPG_PULSE_TTL){
         error_status = 0;
         /* COMMAND FOR PROGRAMMING RF PULSE */
         ERROR_CATCH(spmri_mri_inst(
@@ -146,7 +190,7 @@ int ppg_element(char *str_label, double firstarg, int secondarg){ /*takes 3 vars
                     // PB: flags = TTL high BNC1, data, opcode -- listed in radioprocessor g manual, delay
                     0x01,0,CONTINUE,firstarg*us
                     ));
-    }else if (strcmp(str_label,"phase_reset")==0){
+    }else if (opcode == PPG_PHASE_RESET){
         error_status = 0;
         if(secondarg != 0){
             error_status = 1;
@@ -170,7 +214,7 @@ int ppg_element(char *str_label, double firstarg, int secondarg){ /*takes 3 vars
                     // PB: flags = TTL low (off), data, opcode -- listed in radioprocessor g manual, delay
                     0x00,0,CONTINUE,1.0*us
                     ));
-    }else if (strcmp(str_label,"acquire")==0){
+    }else if (opcode == PPG_ACQUIRE){
         error_status = 0;
         if(secondarg != 0){
             error_status = 1;
@@ -186,7 +230,7 @@ int ppg_element(char *str_label, double firstarg, int secondarg){ /*takes 3 vars
                     // PB: flags = TTL low (off), data, opcode -- listed in radioprocessor g manual, delay
                     0x00,0,CONTINUE,firstarg*ms
                     ));
-    }else if (strcmp(str_label,"delay")==0){
+    }else if (opcode == PPG_DELAY){
         error_status = 0;
         if(secondarg != 0){
             error_status = 1;
@@ -201,7 +245,7 @@ int ppg_element(char *str_label, double firstarg, int secondarg){ /*takes 3 vars
                     // PB: flags = TTL low (off), data, opcode -- listed in radioprocessor g manual, delay
                     0x00,0,CONTINUE,firstarg*us
                     ));
-    }else if (strcmp(str_label,"delay_TTL")==0){
+    }else if (opcode == PPG_DELAY_TTL){
         error_status = 0;
         if(secondarg != 0){
             error_status = 1;
@@ -216,7 +260,7 @@ int ppg_element(char *str_label, double firstarg, int secondarg){ /*takes 3 vars
                     // PB: flags = TTL high BNC1, data, opcode -- listed in radioprocessor g manual, delay
                     0x01,0,CONTINUE,firstarg*us
                     ));
-    }else if (strcmp(str_label,"marker")==0){
+    }else if (opcode == PPG_MARKER){
         error_status = 0;
         int label = (int) firstarg;
         unsigned int nTimes = (int) secondarg;
@@ -229,7 +273,7 @@ int ppg_element(char *str_label, double firstarg, int secondarg){ /*takes 3 vars
                     // PB: flags = TTL low (off), data, opcode -- listed in radioprocessor g manual, delay
                     0x00,nTimes,LOOP,1.0*us
                     ));
-    }else if (strcmp(str_label,"jumpto")==0){
+    }else if (opcode == PPG_JUMPTO){
         error_status = 0;
         if(secondarg != 0){
             error_status = 1;
@@ -251,46 +295,195 @@ int ppg_element(char *str_label, double firstarg, int secondarg){ /*takes 3 vars
     return(error_status);
 }
 
+int ppg_element(char *str_label, double firstarg, int secondarg){ /*takes 3 vars*/
+    int opcode;
+    for (opcode = 0; opcode < PPG_N_OPCODES; opcode++){
+        if (strcmp(str_label,ppg_opcode_names[opcode])==0){
+            return ppg_instruction(opcode, firstarg, secondarg);
+        }
+    }
+    error_message = "unknown ppg element";
+    return 1;
+}
+
+/* return NULL if the instruction is OK, or else a description of what is
+ * wrong with it -- marker_defined keeps track of the markers that the
+ * program has defined so far */
+static char *ppg_check(int opcode, double firstarg, int secondarg, int *marker_defined){
+    int label = (int) firstarg;
+    switch (opcode){
+        case PPG_PULSE:
+        case PPG_PULSE_TTL:
+            if (firstarg < 0) return "pulse lengths can't be negative";
+            return NULL;
+        case PPG_PHASE_RESET:
+        case PPG_ACQUIRE:
+        case PPG_DELAY:
+        case PPG_DELAY_TTL:
+            if (secondarg != 0) return "phase_reset, acquire, delay and delay_TTL only take one argument";
+            if (firstarg < 0) return "times can't be negative";
+            return NULL;
+        case PPG_MARKER:
+            if (label < 0 || label >= N_JUMP_ADDRESSES) return "there are too many markers";
+            marker_defined[label] = 1;
+            return NULL;
+        case PPG_JUMPTO:
+            if (secondarg != 0) return "jumpto only takes the label to which you wish to jump";
+            if (label < 0 || label >= N_JUMP_ADDRESSES || !marker_defined[label]) return "jumpto refers to a marker that comes later, or doesn't exist";
+            return NULL;
+        default:
+            return "unknown ppg element";
+    }
+}
+
+/* program a whole pulse program, which is given as parallel arrays of
+ * opcodes (see enum ppg_opcode) and the two arguments of each element.
+ * The whole program is checked before anything is sent to the board.  If
+ * there is a problem, 1 is returned, and the error message gives the
+ * index of the instruction. */
+int ppg_program(int* opcodes, int nOpcodes, double* firstargs, int nFirstargs, int* secondargs, int nSecondargs){
+    static char indexed_error_message[256];
+    int marker_defined[N_JUMP_ADDRESSES] = {0};
+    char *problem;
+    int j;
+    if (nFirstargs != nOpcodes || nSecondargs != nOpcodes){
+        error_message = "the opcodes and arguments must all have the same length";
+        return 1;
+    }
+    for (j = 0; j < nOpcodes; j++){
+        problem = ppg_check(opcodes[j], firstargs[j], secondargs[j], marker_defined);
+        if (problem != NULL){
+            snprintf(indexed_error_message, sizeof(indexed_error_message), "instruction %d: %s", j, problem);
+            error_message = indexed_error_message;
+            return 1;
+        }
+    }
+    for (j = 0; j < nOpcodes; j++){
+        if (ppg_instruction(opcodes[j], firstargs[j], secondargs[j])){
+            snprintf(indexed_error_message, sizeof(indexed_error_message), "instruction %d: %s", j, error_message);
+            error_message = indexed_error_message;
+            return 1;
+        }
+    }
+    return 0;
+}
+
 char *exception_info() {
     return error_message;
 }
 
-int runBoard()
+/* seconds on a monotonic clock */
+static double monotonic_s(void)
+{
+#ifdef _WIN32
+    LARGE_INTEGER count, freq;
+    QueryPerformanceCounter(&count);
+    QueryPerformanceFrequency(&freq);
+    return (double) count.QuadPart / (double) freq.QuadPart;
+#else
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec * 1e-9;
+#endif
+}
+
+static void sleep_s(double seconds)
+{
+    if (seconds <= 0) return;
+#ifdef _WIN32
+    Sleep((DWORD) (seconds * 1e3));
+#else
+    /* nanosleep (from <time.h>) rather than usleep, so that we don't
+       include <unistd.h>, which declares a pause() that clashes with ours */
+    struct timespec req;
+    req.tv_sec = (time_t) seconds;
+    req.tv_nsec = (long) ((seconds - req.tv_sec) * 1e9);
+    nanosleep(&req, NULL);
+#endif
+}
+
+/* start the pulse program and wait for it to finish.  This sleeps for
+ * expected_s, and then checks the status every poll_s.  If timeout_s is
+ * positive and the program hasn't finished after that long, the board is
+ * stopped and 1 is returned.  The GIL is released while we wait, so that
+ * other Python threads can run during the acquisition. */
+int runBoard(double expected_s, double poll_s, double timeout_s)
 {
-    ERROR_CATCH(spmri_start());
     int done = 0;
-    int last_scan = 0;
+    int timed_out = 0;
     int status;
-    unsigned int current_scan;
+    double start;
+    Py_BEGIN_ALLOW_THREADS
+    ERROR_CATCH(spmri_start());
+    start = monotonic_s();
+    sleep_s(expected_s);
     while( done == 0)
     {
         ERROR_CATCH(spmri_get_status(&status));
-        ERROR_CATCH(spmri_get_scan_count(&current_scan));
         if( status == 0x01 ) {
             done = 1; }
-        else if(current_scan != last_scan) {
-        last_scan = current_scan;
+        else if(timeout_s > 0 && monotonic_s() - start > timeout_s) {
+            ERROR_CATCH(spmri_stop());
+            timed_out = 1;
+            done = 1; }
+        else {
+            sleep_s(poll_s); }
         }
+    Py_END_ALLOW_THREADS
+    return timed_out;
+}
+
+/* the real and imaginary parts read from the board -- these are only
+ * reallocated when a larger readout is requested, so reading the data
+ * doesn't allocate anything on each scan */
+static int* readout_real = NULL;
+static int* readout_imag = NULL;
+static unsigned int readout_size = 0;
+
+static void read_board_memory(unsigned int nTotal){
+    if (nTotal > readout_size){
+        free(readout_real);
+        free(readout_imag);
+        readout_real = malloc(nTotal * sizeof(int));
+        readout_imag = malloc(nTotal * sizeof(int));
+        if (readout_real == NULL || readout_imag == NULL){
+            printf("Error: couldn't allocate memory for %u points\n",nTotal);
+            readout_size = 0;
+            ERROR_CATCH(998);
         }
-    return 0;
+        readout_size = nTotal;
+    }
+    ERROR_CATCH(spmri_read_memory(readout_real, readout_imag, nTotal));
 }
 
 void getData(int* output_array, int length, unsigned int nPoints, unsigned int nEchoes, unsigned int nPhaseSteps){
-    int* real = malloc(nPoints * nEchoes * nPhaseSteps * sizeof(int));
-    int* imag = malloc(nPoints * nEchoes * nPhaseSteps * sizeof(int));
-    int j;
-    int index=0;
-    ERROR_CATCH(spmri_read_memory(real, imag, nPoints*nEchoes*nPhaseSteps));
-    for( j = 0 ; j < nPoints*nEchoes*nPhaseSteps ; j++){
-        output_array[index] = real[j];
-        output_array[index+1] = imag[j];
-        index = index+2;
+    unsigned int j;
+    unsigned int nTotal = nPoints*nEchoes*nPhaseSteps;
+    read_board_memory(nTotal);
+    for( j = 0 ; j < nTotal ; j++){
+        output_array[2*j] = readout_real[j];
+        output_array[2*j+1] = readout_imag[j];
     }
-    free(real);
-    free(imag);
     return;
 }
 
+/* like getData, but write the data straight into the (real, imaginary)
+ * pairs of a complex128 array that is supplied by the caller */
+int getData_complex(double* output_array, int length, unsigned int nPoints, unsigned int nEchoes, unsigned int nPhaseSteps){
+    unsigned int j;
+    unsigned int nTotal = nPoints*nEchoes*nPhaseSteps;
+    if (length != 2*nTotal){
+        error_message = "the output array must hold exactly nPoints*nEchoes*nPhaseSteps complex values";
+        return 1;
+    }
+    read_board_memory(nTotal);
+    for( j = 0 ; j < nTotal ; j++){
+        output_array[2*j] = (double) readout_real[j];
+        output_array[2*j+1] = (double) readout_imag[j];
+    }
+    return 0;
+}
+
 void stopBoard(){
     ERROR_CATCH(spmri_stop());
     return;
@@ -300,6 +493,7 @@ void tune(double carrier_freq)
 {
     // ** Configure Board ** 
     // Initialize MRI SpinAPI
+    resident_program = 0;
     ERROR_CATCH( spmri_init() );
 
     // Set all values on board to default values
@@ -412,7 +606,7 @@ double adc_offset_get_dc_value(int adc_offset)
 	double peak;
 	ERROR_CATCH( adc_offset_configureBoard( adc_offset ) );
 	ERROR_CATCH( adc_offset_programBoard( ) );
-	ERROR_CATCH( runBoard( ) );
+	ERROR_CATCH( runBoard( 0.0, 1e-3, 0.0 ) );
 	ERROR_CATCH( adc_offset_readData( adc_offset, &peak ) );
 	return peak;
 }
@@ -470,6 +664,7 @@ int adc_offset_configureBoard(int adc_offset)
 {
 	int dec_amount;
 	
+	resident_program = 0;
 	ERROR_CATCH( spmri_init() );
 	ERROR_CATCH( spmri_set_defaults() );
 	ERROR_CATCH( spmri_stop() );
@@ -7,13 +7,16 @@ extern int configureTX(int adcOffset, double carrierFreq_MHz, double* tx_phases,
 extern double configureRX(double SW_kHz, unsigned int nPoints, unsigned int nScans, unsigned int nEchoes, unsigned int nPhaseSteps);
 extern int init_ppg();
 extern int stop_ppg();
+extern int resident_ppg();
 extern int ppg_element(char *str_label, double firstarg, int secondarg);
+extern int ppg_program(int* opcodes, int nOpcodes, double* firstargs, int nFirstargs, int* secondargs, int nSecondargs);
 extern char *exception_info();
-extern int runBoard();
+extern int runBoard(double expected_s, double poll_s, double timeout_s);
 extern void tune(double carrier_freq);
 extern void stopBoard();
 extern int adc_offset();
 extern void getData(int* output_array, int length, unsigned int nPoints, unsigned int nEchoes, unsigned int nPhaseSteps);
+extern int getData_complex(double* output_array, int length, unsigned int nPoints, unsigned int nEchoes, unsigned int nPhaseSteps);
 %}
 %include "numpy.i"
 extern char *get_time();
@@ -26,6 +29,7 @@ extern int configureTX(int adcOffset, double carrierFreq_MHz, double* tx_phases,
 extern double configureRX(double SW_kHz, unsigned int nPoints, unsigned int nScans, unsigned int nEchoes, unsigned int nPhaseSteps);
 extern int init_ppg();
 extern int stop_ppg();
+extern int resident_ppg();
 %exception ppg_element{
     $action
     if (result){
@@ -35,72 +39,20 @@ extern int stop_ppg();
 }
 %varargs(int secondarg=0) ppg_element;
 extern int ppg_element(char *str_label, double firstarg, ...);
+%exception ppg_program{
+    $action
+    if (result){
+        PyErr_SetString(PyExc_ValueError,exception_info());
+        return NULL;
+    }
+}
+%apply (int* IN_ARRAY1, int DIM1) {(int* opcodes, int nOpcodes), (int* secondargs, int nSecondargs)};
+%apply (double* IN_ARRAY1, int DIM1) {(double* firstargs, int nFirstargs)};
+extern int ppg_program(int* opcodes, int nOpcodes, double* firstargs, int nFirstargs, int* secondargs, int nSecondargs);
 %pythoncode %{
-import logging
-def strm(*args):
-    return ' '.join([j for j in args])
 marker_names = {}
 from numpy import *
-def apply_cycles(ppg_in,list_of_cycles_found):
-    #{{{ documentation for apply cycles
-    """Recursively apply the phase cycles indicated by elements with tuple form
-    ``('pulse',length,cyclename,cycle)``
-    where ``cyclename`` is a string and ``cycle`` is a numpy array.
-
-    Assume a list like 0, 90, 180, 270 has been loaded into the phase registers.
-
-    All pulses with the same ``cyclename`` are cycled together.
-
-    Though it's not a useful pulse sequence, this should demonstrate the functionality:
-
-    >>> ppg_list = [('pulse',10,'ph1',r_[0,1,2,3]),
-    >>>             ('delay',20),
-    >>>             ('pulse',10,'ph1',r_[0,1]),
-    >>>             ('delay',10),
-    >>>             ('pulse',10,'ph2',r_[0,2]),
-    >>>             ('acq',0.5e6)]
-
-    Returns
-    -------
-    ppg_out: list of tuples
-        New pulse program with the phase cycle applied.
-    list_of_cycles_found: list of tuples
-        List of cycles found that could be used to reshape the data.
-        The list is given outside in, so that it's in the right order.
-    """
-    #}}}
-    pulse_cycles = []
-    found_cycle = False
-    for cycled_idx, ppg_element in enumerate(ppg_in):
-        if (len(ppg_element)>3) and (ppg_element[0] == 'pulse' or ppg_element[0] == 'pulse_TTL') and (type(ppg_element[2]) is str):
-            cycle_name = ppg_element[2]
-            found_cycle = True
-            break
-    if found_cycle:
-        logging.debug(strm("found phase cycle named",cycle_name))
-        all_cycles = [ppg_element[3] for ppg_element in ppg_in if (((ppg_element[0] == 'pulse' or ppg_element[0] == 'pulse_TTL') and ppg_element[2] == cycle_name) if len(ppg_element)>3 else False )]
-        maxlen = max([len(j) for j in all_cycles])
-        list_of_cycles_found = [(cycle_name,maxlen)] + list(list_of_cycles_found)
-        logging.debug("LIST OF CYCLES FOUND NOW")
-        ppg_out = []
-        for j in range(maxlen):
-            for k,ppg_elem in enumerate(ppg_in):
-                if len(ppg_elem) > 3 and ppg_elem[2] == cycle_name:
-                    elem_copy = list(ppg_elem)
-                    spec_len = len(elem_copy[3])
-                    c_idx = j % spec_len
-                    ppg_out.append(tuple(elem_copy[:2]+[elem_copy[3][c_idx].item()]))
-                else:
-                    ppg_out.append(ppg_elem)
-        del ppg_in
-        logging.debug("***")
-        logging.debug(strm("AFTER CYCLING:\n",
-            "\n".join(list(map(str,ppg_out)))))
-        return apply_cycles(ppg_out,list_of_cycles_found)
-    else:
-        logging.debug("***")
-        logging.debug("FOUND NO CYCLING ELEMENTS")
-        return ppg_in,list_of_cycles_found
+from .ppg_compiler import apply_cycles, compile_ppg, ppg_opcodes, ppg_dtype
 def load(args):
     ppg_list = []
     for a_tuple in args:
@@ -119,10 +71,44 @@ def load(args):
     ppg_list,list_of_cycles_found = apply_cycles(ppg_list,[])
     for a_tuple in ppg_list:
         ppg_element(*a_tuple)
+def load_compiled(program):
+    """program the board with the output of :func:`compile_ppg` -- any
+    problem with the program raises a ValueError that gives the number of
+    the instruction"""
+    ppg_program(program['opcode'], program['arg1'], program['arg2'])
 %}
-extern int runBoard();
+%exception runBoard{
+    $action
+    if (result){
+        PyErr_SetString(PyExc_TimeoutError,"the pulse program didn't finish before the timeout, so the board was stopped");
+        return NULL;
+    }
+}
+extern int runBoard(double expected_s=0.0, double poll_s=1e-3, double timeout_s=0.0);
 %apply (int* ARGOUT_ARRAY1, int DIM1) {(int* output_array, int length)};
 extern void getData(int* output_array, int length, unsigned int nPoints, unsigned int nEchoes, unsigned int nPhaseSteps);
+%exception getData_complex{
+    $action
+    if (result){
+        PyErr_SetString(PyExc_ValueError,exception_info());
+        return NULL;
+    }
+}
+%apply (double* INPLACE_ARRAY1, int DIM1) {(double* output_array, int length)};
+extern int getData_complex(double* output_array, int length, unsigned int nPoints, unsigned int nEchoes, unsigned int nPhaseSteps);
+%pythoncode %{
+def getData_into(output_array, nPoints, nEchoes, nPhaseSteps):
+    """Read the data from the board straight into `output_array`, without
+    any intermediate copies.
+
+    `output_array` must be a contiguous complex128 array (*e.g.* the row
+    of a preallocated nddata that this scan is stored in) that holds
+    exactly nPoints*nEchoes*nPhaseSteps points.
+    """
+    if output_array.dtype != complex128 or not output_array.flags.c_contiguous:
+        raise ValueError("output_array must be a contiguous complex128 array")
+    getData_complex(output_array.view(float64), nPoints, nEchoes, nPhaseSteps)
+%}
 extern void stopBoard();
 extern int adc_offset();
 extern void tune(double carrier_freq);
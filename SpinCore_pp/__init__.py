@@ -4,14 +4,18 @@ from .SpinCore_pp import (
     configureTX,
     init_ppg,
     stop_ppg,
+    resident_ppg,
     ppg_element,
     runBoard,
     load,
+    load_compiled,
     getData,
+    getData_into,
     stopBoard,
     tune,
     adc_offset,
 )
+from .ppg_compiler import compile_ppg, ppg_duration
 from .pulse_length_conv import prog_plen
 from .config_parser_fn import configuration
 from .calc_vdlist import vdlist_from_relaxivities, return_vdlist
@@ -23,17 +27,22 @@ from .save_data import save_data
 __all__ = [
     "SpinCore_pp",
     "adc_offset",
+    "compile_ppg",
     "configuration",
     "configureRX",
     "configureTX",
     "getData",
+    "getData_into",
     "get_integer_sampling_intervals",
     "init_ppg",
     "load",
+    "load_compiled",
     "pause",
+    "ppg_duration",
     "ppg_element",
     "process_args",
     "prog_plen",
+    "resident_ppg",
     "return_vdlist",
     "runBoard",
     "save_data",
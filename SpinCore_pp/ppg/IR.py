@@ -3,11 +3,12 @@ from .. import (
     configureRX,
     init_ppg,
     stop_ppg,
+    resident_ppg,
     runBoard,
-    getData,
+    getData_into,
     stopBoard,
 )
-from .. import load as spincore_load
+from .. import compile_ppg, load_compiled, ppg_duration
 import pyspecdata as psp
 import numpy as np
 from .. import prog_plen
@@ -39,6 +40,8 @@ def run_IR(
     deblank_us=1.0,
     amplitude=1.0,
     plen_as_beta=True,
+    program_once=False,
+    scan_timeout_s=10.0,
 ):
     """
     Run a single (signal averaged) scan out of an inversion recovery and
@@ -94,6 +97,16 @@ def run_IR(
     plen_as_beta : boolean
         Determines if plen is supplied as a β value [s√W] or directly as
         programmed length [μs].
+    program_once : boolean default False
+        Program the board only before the first scan, and, for the
+        remaining scans, just run it and read the data.
+        If the program is no longer on the board (*e.g.* something else
+        re-initialized it), the board is reprogrammed.
+    scan_timeout_s : float default 10.0
+        If a scan runs this much longer than the pulse program says it
+        should (see :func:`ppg_duration`), the board is stopped, and you
+        get a TimeoutError.
+        (Typically, pass ``config_dict["scan_timeout_s"]``.)
     """
     assert nEchoes == 1, "you must only choose nEchoes=1"
     # take the desired p90 and p180
@@ -109,52 +122,62 @@ def run_IR(
         prog_p180_us = 2 * plen
     tx_phases = r_[0.0, 90.0, 180.0, 270.0]
     nPhaseSteps = len(ph1_cyc) * len(ph2_cyc)
-    data_length = 2 * nPoints * nEchoes * nPhaseSteps
+    dataPoints = nPoints * nEchoes * nPhaseSteps
     RX_nScans = 1
+    program = 0  # the resident_ppg of our program, once it's loaded
+    compiled_ppg = None  # compiled the first time that we program
     for nScans_idx in range(nScans):
         run_scans_time_list = [time.time()]
-        run_scans_names = ["configure"]
-        configureTX(adcOffset, carrierFreq_MHz, tx_phases, amplitude, nPoints)
-        run_scans_time_list.append(time.time())
-        run_scans_names.append("configure Rx")
-        acq_time_ms = configureRX(
-            SW_kHz, nPoints, RX_nScans, nEchoes, nPhaseSteps
-        )
-        run_scans_time_list.append(time.time())
-        run_scans_names.append("init")
-        init_ppg()
-        run_scans_time_list.append(time.time())
-        run_scans_names.append("prog")
-        spincore_load(
-            [
-                ("phase_reset", 1),
-                ("delay_TTL", deblank_us),
-                ("pulse_TTL", prog_p180_us, "ph1", ph1_cyc),
-                ("delay", vd),
-                ("delay_TTL", 1.0),
-                ("pulse_TTL", prog_p90_us, "ph2", ph2_cyc),
-                ("delay", tau_us),
-                ("delay_TTL", deblank_us),
-                ("pulse_TTL", prog_p180_us, 0),
-                ("delay", deadtime_us),
-                ("acquire", acq_time_ms),
-                ("delay", repetition_us),
-            ]
-        )
-        run_scans_time_list.append(time.time())
-        run_scans_names.append("stop ppg")
-        stop_ppg()
-        run_scans_time_list.append(time.time())
+        run_scans_names = []
+        if program_once and program != 0 and resident_ppg() != program:
+            logging.warning(
+                "the pulse program is no longer on the board, so I'm"
+                " reprogramming it"
+            )
+            program = 0
+        if not program_once or program == 0:
+            run_scans_names.append("configure")
+            configureTX(
+                adcOffset, carrierFreq_MHz, tx_phases, amplitude, nPoints
+            )
+            run_scans_time_list.append(time.time())
+            run_scans_names.append("configure Rx")
+            acq_time_ms = configureRX(
+                SW_kHz, nPoints, RX_nScans, nEchoes, nPhaseSteps
+            )
+            run_scans_time_list.append(time.time())
+            run_scans_names.append("init")
+            init_ppg()
+            run_scans_time_list.append(time.time())
+            run_scans_names.append("prog")
+            if compiled_ppg is None:
+                compiled_ppg = compile_ppg(
+                    [
+                        ("phase_reset", 1),
+                        ("delay_TTL", deblank_us),
+                        ("pulse_TTL", prog_p180_us, "ph1", ph1_cyc),
+                        ("delay", vd),
+                        ("delay_TTL", 1.0),
+                        ("pulse_TTL", prog_p90_us, "ph2", ph2_cyc),
+                        ("delay", tau_us),
+                        ("delay_TTL", deblank_us),
+                        ("pulse_TTL", prog_p180_us, 0),
+                        ("delay", deadtime_us),
+                        ("acquire", acq_time_ms),
+                        ("delay", repetition_us),
+                    ]
+                )
+                expected_s = ppg_duration(compiled_ppg)
+            load_compiled(compiled_ppg)
+            run_scans_time_list.append(time.time())
+            run_scans_names.append("stop ppg")
+            stop_ppg()
+            program = resident_ppg()
+            run_scans_time_list.append(time.time())
         run_scans_names.append("run")
-        runBoard()
+        runBoard(expected_s, 1e-3, expected_s + scan_timeout_s)
         run_scans_time_list.append(time.time())
         run_scans_names.append("get data")
-        raw_data = getData(data_length, nPoints, nEchoes, nPhaseSteps)
-        run_scans_time_list.append(time.time())
-        run_scans_names.append("shape data")
-        data_array = []
-        data_array[::] = np.complex128(raw_data[0::2] + 1j * raw_data[1::2])
-        dataPoints = float(np.shape(data_array)[0])
         if ret_data is None:
             if indirect_fields is None:
                 times_dtype = np.double
@@ -182,7 +205,21 @@ def run_IR(
                 + str(ret_data)
                 + " and we're not currently running ppgs where this makes sense"
             )
-        ret_data["indirect", indirect_idx]["nScans", nScans_idx] = data_array
+        # the scan is read straight into its row of ret_data, which is
+        # indexed by position
+        if ret_data.dimlabels != ["indirect", "nScans", "t"]:
+            raise ValueError(
+                "ret_data must have the dimensions indirect, nScans and t, in"
+                f" that order, but it has {ret_data.dimlabels}"
+            )
+        getData_into(
+            ret_data.data[indirect_idx, nScans_idx, :],
+            nPoints,
+            nEchoes,
+            nPhaseSteps,
+        )
+        run_scans_time_list.append(time.time())
+        run_scans_names.append("stop board")
         stopBoard()
         run_scans_time_list.append(time.time())
         this_array = np.array(run_scans_time_list)
@@ -3,11 +3,12 @@ from .. import (
     configureRX,
     init_ppg,
     stop_ppg,
+    resident_ppg,
     runBoard,
-    getData,
+    getData_into,
     stopBoard,
 )
-from .. import load as spincore_load
+from .. import compile_ppg, load_compiled, ppg_duration
 import pyspecdata as psp
 import numpy as np
 from numpy import r_
@@ -32,6 +33,8 @@ def generic(
     ret_data=None,
     amplitude=1.0,
     manual_echoes=0,
+    program_once=False,
+    scan_timeout_s=10.0,
 ):
     """
     run nScans and slot them into the indirect_idx index of ret_data -- assume
@@ -107,6 +110,16 @@ def generic(
         you might want to do this if they are phase cycled separately,
         *etc.*, but they need to be included in the total number of
         echoes).
+    program_once: boolean default False
+        Program the board only before the first scan, and, for the
+        remaining scans, just run it and read the data.
+        If the program is no longer on the board (*e.g.* something else
+        re-initialized it), the board is reprogrammed.
+    scan_timeout_s: float default 10.0
+        If a scan runs this much longer than the pulse program says it
+        should (see :func:`ppg_duration`), the board is stopped, and you
+        get a TimeoutError.
+        (Typically, pass ``config_dict["scan_timeout_s"]``.)
     """
     tx_phases = r_[0.0, 90.0, 180.0, 270.0]
     # {{{ pull info about phase cycling and echos from the ppg_list
@@ -133,41 +146,52 @@ def generic(
         )
     )
     # }}}
-    data_length = 2 * nPoints * nEchoes * nPhaseSteps
+    dataPoints = nPoints * nEchoes * nPhaseSteps
     RX_nScans = 1
+    program = 0  # the resident_ppg of our program, once it's loaded
+    compiled_ppg = compile_ppg(ppg_list)
+    expected_s = ppg_duration(compiled_ppg)
     for nScans_idx in range(nScans):
         run_scans_time_list = [time.time()]
-        run_scans_names = ["configure"]
-        configureTX(adcOffset, carrierFreq_MHz, tx_phases, amplitude, nPoints)
-        run_scans_time_list.append(time.time())
-        run_scans_names.append("configure Rx")
-        # in the following, nScans is set to 1, because we never average
-        # on the board -- doing this only messes up the amplitude
-        check = configureRX(SW_kHz, nPoints, RX_nScans, nEchoes, nPhaseSteps)
-        assert np.isclose(
-            check, time_per_segment_ms
-        ), f"you are trying to set the acquisition time to {time_per_segment_ms}, but configureRX returns {check}"
-        run_scans_time_list.append(time.time())
-        run_scans_names.append("init")
-        init_ppg()
-        run_scans_time_list.append(time.time())
-        run_scans_names.append("prog")
-        spincore_load(ppg_list)
-        run_scans_time_list.append(time.time())
-        run_scans_names.append("stop ppg")
-        stop_ppg()
-        run_scans_time_list.append(time.time())
+        run_scans_names = []
+        if program_once and program != 0 and resident_ppg() != program:
+            logging.warning(
+                "the pulse program is no longer on the board, so I'm"
+                " reprogramming it"
+            )
+            program = 0
+        if not program_once or program == 0:
+            run_scans_names.append("configure")
+            configureTX(
+                adcOffset, carrierFreq_MHz, tx_phases, amplitude, nPoints
+            )
+            run_scans_time_list.append(time.time())
+            run_scans_names.append("configure Rx")
+            # in the following, nScans is set to 1, because we never average
+            # on the board -- doing this only messes up the amplitude
+            check = configureRX(
+                SW_kHz, nPoints, RX_nScans, nEchoes, nPhaseSteps
+            )
+            assert np.isclose(check, time_per_segment_ms), (
+                "you are trying to set the acquisition time to"
+                f" {time_per_segment_ms}, but configureRX returns {check}"
+            )
+            run_scans_time_list.append(time.time())
+            run_scans_names.append("init")
+            init_ppg()
+            run_scans_time_list.append(time.time())
+            run_scans_names.append("prog")
+            load_compiled(compiled_ppg)
+            run_scans_time_list.append(time.time())
+            run_scans_names.append("stop ppg")
+            stop_ppg()
+            program = resident_ppg()
+            run_scans_time_list.append(time.time())
         run_scans_names.append("run")
-        runBoard()
+        runBoard(expected_s, 1e-3, expected_s + scan_timeout_s)
         run_scans_time_list.append(time.time())
         run_scans_names.append("get data")
-        raw_data = getData(data_length, nPoints, nEchoes, nPhaseSteps)
-        run_scans_time_list.append(time.time())
-        run_scans_names.append("shape data")
         # {{{ create returned data
-        data_array = []
-        data_array[::] = np.complex128(raw_data[0::2] + 1j * raw_data[1::2])
-        dataPoints = float(np.shape(data_array)[0])
         if ret_data is None:
             if indirect_fields is None:
                 times_dtype = np.double
@@ -184,7 +208,7 @@ def generic(
             time_axis = r_[0:dataPoints] / (SW_kHz * 1e3)
             ret_data = psp.ndshape(
                 [indirect_len, nScans, len(time_axis)],
-                ["indirect", "nScans", "t"]
+                ["indirect", "nScans", "t"],
                 # note that "t" is a dimension that ends up getting split into phase cycle steps and possibly echoes as well
             ).alloc(dtype=np.complex128)
             ret_data.setaxis("indirect", mytimes)
@@ -196,7 +220,21 @@ def generic(
                 + str(ret_data)
                 + " and we're not currently running ppgs where this makes sense"
             )
-        ret_data["indirect", indirect_idx]["nScans", nScans_idx] = data_array
+        # the scan is read straight into its row of ret_data, which is
+        # indexed by position
+        if ret_data.dimlabels != ["indirect", "nScans", "t"]:
+            raise ValueError(
+                "ret_data must have the dimensions indirect, nScans and t, in"
+                f" that order, but it has {ret_data.dimlabels}"
+            )
+        getData_into(
+            ret_data.data[indirect_idx, nScans_idx, :],
+            nPoints,
+            nEchoes,
+            nPhaseSteps,
+        )
+        run_scans_time_list.append(time.time())
+        run_scans_names.append("stop board")
         stopBoard()
         run_scans_time_list.append(time.time())
         this_array = np.array(run_scans_time_list)
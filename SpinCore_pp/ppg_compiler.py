@@ -0,0 +1,177 @@
+"""Turn pulse programs, given as lists of ppg tuples, into the instructions
+that the SpinCore board is programmed with, and work out how long they take.
+
+None of this needs the board (or the compiled module), so it lives here,
+rather than in SpinCore_pp.i.
+"""
+
+from numpy import dtype, zeros
+from pyspecdata import strm
+import logging
+
+# these must match enum ppg_opcode in SpinCore_pp.c
+ppg_opcodes = {
+    "pulse": 0,
+    "pulse_TTL": 1,
+    "phase_reset": 2,
+    "acquire": 3,
+    "delay": 4,
+    "delay_TTL": 5,
+    "marker": 6,
+    "jumpto": 7,
+}
+ppg_dtype = dtype([("opcode", "i4"), ("arg1", "f8"), ("arg2", "i4")])
+
+
+def apply_cycles(ppg_in, list_of_cycles_found):
+    # {{{ documentation for apply cycles
+    """Recursively apply the phase cycles indicated by elements with tuple
+    form ``('pulse',length,cyclename,cycle)``
+    where ``cyclename`` is a string and ``cycle`` is a numpy array.
+
+    Assume a list like 0, 90, 180, 270 has been loaded into the phase
+    registers.
+
+    All pulses with the same ``cyclename`` are cycled together.
+
+    Though it's not a useful pulse sequence, this should demonstrate the
+    functionality:
+
+    >>> ppg_list = [('pulse',10,'ph1',r_[0,1,2,3]),
+    >>>             ('delay',20),
+    >>>             ('pulse',10,'ph1',r_[0,1]),
+    >>>             ('delay',10),
+    >>>             ('pulse',10,'ph2',r_[0,2]),
+    >>>             ('acq',0.5e6)]
+
+    Returns
+    -------
+    ppg_out: list of tuples
+        New pulse program with the phase cycle applied.
+    list_of_cycles_found: list of tuples
+        List of cycles found that could be used to reshape the data.
+        The list is given outside in, so that it's in the right order.
+    """
+    # }}}
+    found_cycle = False
+    for cycled_idx, ppg_element in enumerate(ppg_in):
+        if (
+            (len(ppg_element) > 3)
+            and (ppg_element[0] == "pulse" or ppg_element[0] == "pulse_TTL")
+            and (type(ppg_element[2]) is str)
+        ):
+            cycle_name = ppg_element[2]
+            found_cycle = True
+            break
+    if found_cycle:
+        logging.debug(strm("found phase cycle named", cycle_name))
+        all_cycles = [
+            ppg_element[3]
+            for ppg_element in ppg_in
+            if (
+                (
+                    (
+                        ppg_element[0] == "pulse"
+                        or ppg_element[0] == "pulse_TTL"
+                    )
+                    and ppg_element[2] == cycle_name
+                )
+                if len(ppg_element) > 3
+                else False
+            )
+        ]
+        maxlen = max([len(j) for j in all_cycles])
+        list_of_cycles_found = [(cycle_name, maxlen)] + list(
+            list_of_cycles_found
+        )
+        logging.debug("LIST OF CYCLES FOUND NOW")
+        ppg_out = []
+        for j in range(maxlen):
+            for k, ppg_elem in enumerate(ppg_in):
+                if len(ppg_elem) > 3 and ppg_elem[2] == cycle_name:
+                    elem_copy = list(ppg_elem)
+                    spec_len = len(elem_copy[3])
+                    c_idx = j % spec_len
+                    ppg_out.append(
+                        tuple(elem_copy[:2] + [elem_copy[3][c_idx].item()])
+                    )
+                else:
+                    ppg_out.append(ppg_elem)
+        del ppg_in
+        logging.debug("***")
+        logging.debug(
+            strm("AFTER CYCLING:\n", "\n".join(list(map(str, ppg_out))))
+        )
+        return apply_cycles(ppg_out, list_of_cycles_found)
+    else:
+        logging.debug("***")
+        logging.debug("FOUND NO CYCLING ELEMENTS")
+        return ppg_in, list_of_cycles_found
+
+
+def compile_ppg(args):
+    """Turn a list of ppg tuples (the same as :func:`load` takes) into a
+    record array with fields ``opcode``, ``arg1`` and ``arg2``, that
+    :func:`load_compiled` can program in a single call.
+
+    Phase cycles are expanded, so that the instruction numbers given by
+    :func:`load_compiled` refer to the rows of the returned array.
+    """
+    ppg_list = []
+    these_markers = {}
+    for j, a_tuple in enumerate(args):
+        if a_tuple[0] == "marker":
+            a_tuple = list(a_tuple)
+            these_markers[a_tuple[1]] = len(these_markers)
+            a_tuple[1] = these_markers[a_tuple[1]]
+            a_tuple = tuple(a_tuple)
+        elif a_tuple[0] == "jumpto":
+            if a_tuple[1] not in these_markers:
+                raise ValueError(
+                    f"element {j} ({a_tuple}) jumps to a marker that hasn't"
+                    " been defined"
+                )
+            a_tuple = list(a_tuple)
+            a_tuple[1] = these_markers[a_tuple[1]]
+            a_tuple = tuple(a_tuple)
+        elif a_tuple[0] not in ppg_opcodes:
+            raise ValueError(
+                f"element {j} ({a_tuple}) is not a known ppg element"
+            )
+        ppg_list.append(a_tuple)
+    ppg_list, list_of_cycles_found = apply_cycles(ppg_list, [])
+    program = zeros(len(ppg_list), dtype=ppg_dtype)
+    for j, a_tuple in enumerate(ppg_list):
+        program[j] = (
+            ppg_opcodes[a_tuple[0]],
+            a_tuple[1],
+            a_tuple[2] if len(a_tuple) > 2 else 0,
+        )
+    return program
+
+
+def ppg_duration(program):
+    """How long (in s) the output of :func:`compile_ppg` takes to run once
+    on the board, counting every pass through each loop (``marker`` to
+    ``jumpto``).
+
+    Pulses and delays are given in μs, and acquisitions in ms, as in
+    SpinCore_pp.c, where the phase reset, marker and jumpto instructions
+    each add another μs.
+    """
+    loop_times = [0.0]  # the time so far, in each loop we're inside of
+    n_repeats = []
+    for opcode, arg1, arg2 in program:
+        if opcode == ppg_opcodes["marker"]:
+            loop_times.append(1e-6)
+            n_repeats.append(arg2)
+        elif opcode == ppg_opcodes["jumpto"]:
+            this_loop = loop_times.pop() + 1e-6
+            loop_times[-1] += this_loop * n_repeats.pop()
+        elif opcode == ppg_opcodes["acquire"]:
+            loop_times[-1] += arg1 * 1e-3
+        elif opcode == ppg_opcodes["phase_reset"]:
+            loop_times[-1] += arg1 * 1e-6 + 1e-6
+        else:
+            loop_times[-1] += arg1 * 1e-6
+    return loop_times[0]
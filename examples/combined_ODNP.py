@@ -63,6 +63,7 @@ def IR_measurement(
             repetition_us=FIR_rep_us,
             SW_kHz=config_dict["SW_kHz"],
             ret_data=vd_data,
+            scan_timeout_s=config_dict["scan_timeout_s"],
         )
     done_time = time.time()
     vd_data.set_prop("start_time", ini_time)
@@ -249,6 +250,7 @@ with instrument_control() as ic:
             SW_kHz=config_dict["SW_kHz"],
             indirect_fields=("start_times", "stop_times"),
             ret_data=DNP_data,
+            scan_timeout_s=config_dict["scan_timeout_s"],
         )
         DNP_thermal_done = time.time()
         if j == 0:
@@ -292,18 +294,13 @@ with instrument_control() as ic:
             ic.set_power(10)  # set to 10 dBm
             ic.set_freq(config_dict["uw_dip_center_GHz"] * 1e9)
         ic.set_power(this_dB)
-        for k in range(10):
-            time.sleep(0.5)
-            if abs(ic.get_power_setting() - this_dB) < 1:
-                break
-        if abs(ic.get_power_setting() - this_dB) > 1:
+        power_settings_dBm[j] = ic.wait_settled()
+        if abs(power_settings_dBm[j] - this_dB) > 1:
             raise ValueError(
-                "After 10 tries, B12 is still not reporting "
+                "B12 is still not reporting "
                 "that the correct power has been set"
-                f"I want {ic.get_power_setting()} and am getting {this_dB}"
+                f"I want {this_dB} and am getting {power_settings_dBm[j]}"
             )
-        time.sleep(5)
-        power_settings_dBm[j] = ic.get_power_setting()
         time_axis_coords[j + n_thermal_scans]["start_times"] = time.time()
         # call D to run spin echo
         # Now that the thermal is collected we increment our powers and collect
@@ -325,6 +322,7 @@ with instrument_control() as ic:
             SW_kHz=config_dict["SW_kHz"],
             indirect_fields=("start_times", "stop_times"),
             ret_data=DNP_data,
+            scan_timeout_s=config_dict["scan_timeout_s"],
         )
         time_axis_coords[j + n_thermal_scans]["stop_times"] = time.time()
     DNP_data.set_prop("stop_time", time.time())
@@ -373,20 +371,9 @@ with instrument_control() as ic:
             )
         )
         ic.set_power(this_dB)
-        for k in range(10):
-            time.sleep(0.5)
-            # JF notes that the following works for powers going up, but not
-            # for powers going down -- I don't think this has been a problem to
-            # date, and would rather not potentially break a working
-            # implementation, but we should PR and fix this in the future.
-            # (Just say whether we're closer to the newer setting or the older
-            # setting.)
-            if ic.get_power_setting() >= this_dB:
-                break
-        if ic.get_power_setting() < this_dB:
-            raise ValueError("After 10 tries, the power has still not settled")
-        time.sleep(5)
-        meter_power = ic.get_power_setting()
+        meter_power = ic.wait_settled()
+        if abs(meter_power - this_dB) > 1:
+            raise ValueError("the power has still not settled")
         IR_measurement(
             vd_list_us=vd_list_us,
             nPoints=nPoints,
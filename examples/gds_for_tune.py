@@ -15,7 +15,7 @@ Takes one or two command line arguments:
 """
 
 from Instruments import GDS_scope, SerialInstrument
-from pyspecdata import ndshape, concat, figlist_var
+from pyspecdata import ndshape, figlist_var
 import SpinCore_pp
 import numpy as np
 from numpy import r_
@@ -43,20 +43,14 @@ print("done printing available instruments")
 def grab_waveforms(g):
     # {{{ capture a "successful" waveform
     # CH1 of the scope is busted so we are now using CH2 and CH3 instead
-    # to maintain the master/original copy I don't change the variable names
-    ch1 = g.waveform(ch=2)
-    ch2 = g.waveform(ch=3)
-    success = False
+    # -- both channels come from the same trigger
     for j in range(10):
-        if ch1.data.max() < 50e-3:
-            ch1 = g.waveform(ch=2)
-            ch2 = g.waveform(ch=3)
-        else:
-            success = True
-    if not success:
+        d = g.capture(channels=[2, 3])
+        if d["ch", 0].data.max() >= 50e-3:
+            break
+    else:
         raise ValueError("can't seem to get a waveform that's large enough!")
     # }}}
-    d = concat([ch1, ch2], "ch")
     d.reorder("ch")
     return d
 
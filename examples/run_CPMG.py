@@ -151,6 +151,7 @@ data = generic(
     time_per_segment_ms=config_dict["echo_acq_ms"],
     SW_kHz=config_dict["SW_kHz"],
     ret_data=None,
+    scan_timeout_s=config_dict["scan_timeout_s"],
 )
 # }}}
 # {{{ chunk and save data
@@ -83,6 +83,7 @@ with xepr() as x_server:
         SW_kHz=config_dict["SW_kHz"],
         indirect_fields=("Field", "carrierFreq"),
         ret_data=None,
+        scan_timeout_s=config_dict["scan_timeout_s"],
     )
     myfreqs_fields = sweep_data.getaxis("indirect")
     myfreqs_fields[0]["Field"] = first_B0
@@ -108,6 +109,7 @@ with xepr() as x_server:
             tau_us=config_dict["tau_us"],
             SW_kHz=config_dict["SW_kHz"],
             ret_data=sweep_data,
+            scan_timeout_s=config_dict["scan_timeout_s"],
         )
 # }}}
 # {{{chunk and save data
@@ -83,6 +83,7 @@ data = run_spin_echo(
     tau_us=config_dict["tau_us"],
     SW_kHz=config_dict["SW_kHz"],
     ret_data=None,
+    scan_timeout_s=config_dict["scan_timeout_s"],
 )
 # }}}
 # {{{ chunk and save data
@@ -92,6 +92,7 @@ with instrument_control() as p:
         tau_us=config_dict["tau_us"],
         SW_kHz=config_dict["SW_kHz"],
         ret_data=None,
+        scan_timeout_s=config_dict["scan_timeout_s"],
     )  # assume that the power axis is 1 longer than the
     #                         "powers" array, so that we can also store the
     #                         thermally polarized signal in this array (note
@@ -139,6 +140,7 @@ with instrument_control() as p:
             tau_us=config_dict["tau_us"],
             SW_kHz=config_dict["SW_kHz"],
             ret_data=echo_data,
+            scan_timeout_s=config_dict["scan_timeout_s"],
         )
 # {{{ chunk and save data
 if phase_cycling:
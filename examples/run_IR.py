@@ -72,6 +72,7 @@ for vd_idx, vd in enumerate(vd_list_us):
         tau_us=config_dict["tau_us"],
         SW_kHz=config_dict["SW_kHz"],
         ret_data=vd_data,
+        scan_timeout_s=config_dict["scan_timeout_s"],
     )
 # }}}
 # {{{ chunk and save data
@@ -112,6 +112,7 @@ with instrument_control() as p:
             amplitude=config_dict["amplitude"],
             indirect_fields=("Field", "carrierFreq"),
             ret_data=None,
+            scan_timeout_s=config_dict["scan_timeout_s"],
         )
         myfreqs_fields = sweep_data.getaxis("indirect")
         myfreqs_fields[0]["Field"] = first_B0
@@ -140,6 +141,7 @@ with instrument_control() as p:
                 SW_kHz=config_dict["SW_kHz"],
                 amplitude=config_dict["amplitude"],
                 ret_data=sweep_data,
+                scan_timeout_s=config_dict["scan_timeout_s"],
             )
 sweep_data.set_prop("acq_params", config_dict.asdict())
 # }}}
@@ -101,6 +101,7 @@ with instrument_control() as ic:
             amplitude=config_dict["amplitude"],
             ret_data=data,
             indirect_fields=("start_times", "stop_times"),
+            scan_timeout_s=config_dict["scan_timeout_s"],
         )
         DNP_done = time.time()
         if idx == 0:
@@ -182,6 +182,7 @@ data = generic(
     SW_kHz=config_dict["SW_kHz"],
     ret_data=None,
     manual_echoes=1,
+    scan_timeout_s=config_dict["scan_timeout_s"],
 )
 # }}}
 # {{{ chunk and save data
@@ -91,6 +91,7 @@ for idx, beta in enumerate(beta_range_s_sqrtW):
         tau_us=config_dict["tau_us"],
         SW_kHz=config_dict["SW_kHz"],
         ret_data=data,
+        scan_timeout_s=config_dict["scan_timeout_s"],
     )
 data.rename("indirect", "beta")
 data.setaxis("beta", beta_range_s_sqrtW).set_units("beta", "s√W")
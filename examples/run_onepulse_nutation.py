@@ -77,6 +77,7 @@ for idx, p90_us in enumerate(p90_us_array):
         SW_kHz=config_dict["SW_kHz"],
         amplitude=config_dict["amplitude"],
         ret_data=data,
+        scan_timeout_s=config_dict["scan_timeout_s"],
     )
 # }}}
 data.rename("indirect", "beta")
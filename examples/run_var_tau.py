@@ -75,6 +75,7 @@ var_tau_data = run_spin_echo(
     SW_kHz=config_dict["SW_kHz"],
     indirect_fields=("tau_adjust", "tau"),
     ret_data=None,
+    scan_timeout_s=config_dict["scan_timeout_s"],
 )
 mytau_axis = var_tau_data.getaxis("indirect")
 mytau_axis[0]["tau_adjust"] = tau_adjust_range[0]
@@ -104,6 +105,7 @@ for tau_idx, val in enumerate(tau_adjust_range[1:]):
         SW_kHz=config_dict["SW_kHz"],
         indirect_fields=("tau_adjust", "tau"),
         ret_data=var_tau_data,
+        scan_timeout_s=config_dict["scan_timeout_s"],
     )
     mytau_axis = var_tau_data.getaxis("indirect")
     mytau_axis[tau_idx + 1]["tau_adjust"] = tau_adjust
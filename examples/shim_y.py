@@ -109,6 +109,7 @@ with instrument_control() as ic:
             tau_us=config_dict["tau_us"],
             SW_kHz=config_dict["SW_kHz"],
             ret_data=data,
+            scan_timeout_s=config_dict["scan_timeout_s"],
         )
     ic.shim["Y"] = 0.0
     print("Y shim is turned off")
@@ -87,6 +87,7 @@ with instrument_control() as ic:
             tau_us=config_dict["tau_us"],
             SW_kHz=config_dict["SW_kHz"],
             ret_data=data,
+            scan_timeout_s=config_dict["scan_timeout_s"],
         )
     # set back to the original voltage at the end
     ic.shim["Z0"] = orig_voltage_V
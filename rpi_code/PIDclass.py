@@ -1,3 +1,5 @@
+import time
+
 
 class PID:
     """PID controller."""
@@ -0,0 +1,41 @@
+"""Fakes that are shared by the tests.
+
+None of these import the instrument drivers, so that each test module
+imports only what it tests.
+"""
+
+import threading
+
+
+class FakeClock:
+    """Stands in for the ``time`` module of the code under test, so that
+    time only passes when a test sets (or advances) `now`."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def bare_instance(cls, **attributes):
+    """An instance of `cls` that skips ``__init__`` (and so never touches
+    the hardware), with the given attributes set."""
+    retval = cls.__new__(cls)
+    for k, v in attributes.items():
+        setattr(retval, k, v)
+    return retval
+
+
+def fake_serial_instrument(cls, port, textidn):
+    """Build a :class:`SerialInstrument` subclass around `port` without
+    touching comports."""
+    return bare_instance(
+        cls, _textidn=textidn, io_lock=threading.RLock(), connection=port
+    )
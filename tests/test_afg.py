@@ -0,0 +1,166 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from conftest import fake_serial_instrument
+from Instruments.afg import AFG
+
+
+class FakeAFGPort:
+    """Stand-in for the pyserial port of an AFG, which remembers what was
+    written and answers the queries that the channel properties make."""
+
+    def __init__(self):
+        self.timeout = 3
+        self.writes = []
+        self.pending = b""
+        self.freq = {}
+        self.volatile = {}  # waveform memory of each channel
+        self.setups = {}  # the setup memories
+
+    @property
+    def in_waiting(self):
+        return len(self.pending)
+
+    def write(self, text):
+        self.writes.append(text)
+        cmd = text.strip()
+        if cmd == b"*OPC?":
+            self.pending += b"1\n"
+        elif cmd.endswith(b":FREQ?"):
+            self.pending += b"%+0.7E\n" % self.freq[cmd[4]]
+        elif b":FREQ " in cmd:
+            self.freq[cmd[4]] = float(cmd.split(b" ")[1])
+        elif b":DATA:DAC VOLATILE," in cmd:
+            block = text[text.index(b"#") :]
+            n_digits = int(block[1:2])
+            length = int(block[2 : 2 + n_digits])
+            self.volatile[cmd[4]] = block[2 + n_digits : 2 + n_digits + length]
+        elif b":DATA:DAC? VOLATILE," in cmd:
+            n = 2 * int(cmd.split(b",")[-1])
+            data = self.volatile.get(cmd[4], b"")[:n]
+            self.pending += b"#%d%d" % (len(str(len(data))), len(data))
+            self.pending += data + b"\n"
+        elif cmd.startswith(b"*SAV"):
+            self.setups[int(cmd[5:])] = dict(self.volatile)
+        elif cmd.startswith(b"*RCL"):
+            self.volatile = dict(self.setups.get(int(cmd[5:]), {}))
+
+    def readline(self):
+        line, sep, self.pending = self.pending.partition(b"\n")
+        return line + sep
+
+    def read(self, n=1):
+        retval, self.pending = self.pending[:n], self.pending[n:]
+        return retval
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[: len(data)] = data
+        return len(data)
+
+    def uploads(self):
+        return [j for j in self.writes if b":DATA:DAC" in j]
+
+
+def fake_afg(port, waveform_file=None):
+    a = fake_serial_instrument(AFG, port, "AFG-2225")
+    a.waveform_file = waveform_file
+    return a
+
+
+class TestAFGWaveformCache(unittest.TestCase):
+    def test_block_encoding(self):
+        a = fake_afg(FakeAFGPort())
+        block = a.binary_block(np.r_[0, 1, -1.0])
+        self.assertEqual(block[:3], b"#16")
+        np.testing.assert_array_equal(
+            np.frombuffer(block[3:], dtype="i2"), [0, 511, -511]
+        )
+
+    def test_repeated_waveform_is_uploaded_once(self):
+        """Only a change in the (quantized) data means a new upload, while
+        the rate is applied every time, with a single completion check."""
+        port = FakeAFGPort()
+        a = fake_afg(port)
+        y = np.sin(np.r_[0 : 2 * np.pi : 100j])
+        a.CH1.digital_ndarray(y, rate=50e6)
+        self.assertEqual(len(port.uploads()), 1)
+        self.assertEqual(port.writes.count(b"*OPC?\n"), 1)
+        self.assertNotIn(b"*IDN?\n", port.writes)
+        a.CH1.digital_ndarray(y + 1e-5, rate=100e6)
+        self.assertEqual(len(port.uploads()), 1)
+        self.assertAlmostEqual(a.CH1.freq, 1e6)
+        a.CH2.digital_ndarray(y, rate=50e6)
+        a.CH1.digital_ndarray(-y, rate=50e6)
+        self.assertEqual(len(port.uploads()), 3)
+        self.assertEqual(port.in_waiting, 0)
+
+    def test_reset_and_recall_forget_the_waveform(self):
+        """After ``*RST`` or ``*RCL``, however it's sent, the waveform
+        memory can't be assumed to hold the last upload."""
+        port = FakeAFGPort()
+        a = fake_afg(port)
+        y = np.sin(np.r_[0 : 2 * np.pi : 100j])
+        for clear in [lambda: a.recall(3), lambda: a.write(b"*rst")]:
+            a.CH1.digital_ndarray(y)
+            a.CH2.digital_ndarray(y)
+            clear()
+            self.assertIsNone(a.CH1.loaded_hash)
+            self.assertIsNone(a.CH2.loaded_hash)
+        a.CH1.digital_ndarray(y)
+        self.assertEqual(len(port.uploads()), 5)
+
+
+class TestAFGWaveformLibrary(unittest.TestCase):
+    def test_switching_is_a_single_recall(self):
+        port = FakeAFGPort()
+        a = fake_afg(port)
+        x = np.r_[0 : 2 * np.pi : 100j]
+        self.assertEqual(a.store_waveform("sin", np.sin(x)), 0)
+        self.assertEqual(a.store_waveform("cos", np.cos(x), rate=1e8), 1)
+        self.assertEqual(port.writes.count(b"*SAV 1\n"), 1)
+        self.assertEqual(a.store_waveform("sin", np.sin(x)), 0)
+        self.assertEqual(len(port.uploads()), 2)
+        del port.writes[:]
+        a.use_waveform("sin")
+        self.assertEqual(port.writes, [b"*RCL 0\n", b"*OPC?\n"])
+        self.assertEqual(a.CH1.loaded_hash, a.waveform_slots[0]["hash"])
+        a.CH1.digital_ndarray(np.sin(x))
+        self.assertEqual(len(port.uploads()), 0)
+        with self.assertRaises(KeyError):
+            a.use_waveform("square")
+
+    def test_library_survives_reconnecting(self):
+        """With a waveform_file, a new AFG object knows what's in the setup
+        memories, and reads each one back once to check it."""
+        port = FakeAFGPort()
+        x = np.r_[0 : 2 * np.pi : 100j]
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "waveforms.json")
+            a = fake_afg(port, filename)
+            a.store_waveform("sin", np.sin(x))
+            a.store_waveform("cos", np.cos(x), ch=2)
+            a = fake_afg(port, filename)
+            self.assertEqual(a.waveform_slots[1]["name"], "cos")
+            del port.writes[:]
+            a.use_waveform("cos")
+            self.assertEqual(a.CH2.loaded_hash, a.waveform_slots[1]["hash"])
+            a.use_waveform("cos")
+            self.assertEqual(
+                len([j for j in port.writes if b":DATA:DAC?" in j]), 1
+            )
+            # {{{ setup memory 0 is overwritten from the front panel
+            port.volatile = {ord("1"): a.quantize(-np.sin(x)).tobytes()}
+            a.save(0)
+            # }}}
+            a = fake_afg(port, filename)
+            with self.assertRaises(ValueError):
+                a.use_waveform("sin")
+            self.assertNotIn(0, fake_afg(port, filename).waveform_slots)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,248 @@
+import queue
+import threading
+import time
+import unittest
+from collections import defaultdict, deque
+
+import numpy as np
+
+from conftest import bare_instance
+import Instruments.bridge12 as bridge12_module
+from Instruments.bridge12 import Bridge12, consensus_estimate, reply_stream
+
+
+class FakeB12:
+    """Stand-in for the Bridge12 microcontroller.  `replies` maps each
+    query to a list of the successive replies it gives (the last one is
+    repeated), and `garbage` is spewed before the next reply, as happens
+    when the front panel is used."""
+
+    def __init__(self, replies):
+        self.replies = {k: list(v) for k, v in replies.items()}
+        self.outgoing = queue.Queue()
+        self.writes = []
+        self.garbage = []
+
+    def write(self, cmd):
+        self.writes.append(cmd)
+        for j in self.garbage:
+            self.outgoing.put(j)
+        self.garbage = []
+        these = self.replies[cmd]
+        reply = these.pop(0) if len(these) > 1 else these[0]
+        self.outgoing.put(b"%d\r\n" % reply)
+
+    def readline(self):
+        try:
+            return self.outgoing.get(timeout=0.05)
+        except queue.Empty:
+            return b""
+
+
+class DipB12(FakeB12):
+    """A Bridge12 feeding a cavity with a Lorentzian dip at `f0` (in Hz)"""
+
+    def __init__(self, f0=9.8195e9):
+        super().__init__({})
+        self.f0 = f0
+        self.freq = 9.81e9
+
+    def write(self, cmd):
+        self.writes.append(cmd)
+        if cmd == b"freq?\r":
+            self.outgoing.put(b"%d\r\n" % int(self.freq / 1e3))
+        elif cmd.startswith(b"freq "):
+            self.freq = int(cmd[5:]) * 1e3
+        elif cmd in [b"rxpowerdbm?\r", b"txpowerdbm?\r"]:
+            dip = 80 / (1 + ((self.freq - self.f0) / 1e6) ** 2)
+            self.outgoing.put(b"%d\r\n" % round(100 - dip))
+
+
+def fake_bridge12(device):
+    """Build a Bridge12 that talks to `device` without touching comports."""
+    return bare_instance(
+        Bridge12,
+        is_open=False,
+        write=device.write,
+        reply_timeout=1,
+        safe_rx_level_int=180,
+        _query_lock=threading.RLock(),
+        _history=defaultdict(lambda: deque(maxlen=100)),
+        tuning_curves=None,
+        _trust_stored_survey=True,
+        _stream=reply_stream(device.readline),
+    )
+
+
+class TestReplyStream(unittest.TestCase):
+    def test_lines_are_timestamped_and_skippable(self):
+        device = FakeB12({})
+        stream = reply_stream(device.readline)
+        for j in [b"MPS Started\r\n", b"12", b"3\r\n"]:
+            device.outgoing.put(j)
+        t, line = stream.next_line(1)
+        self.assertEqual(line, b"MPS Started\r\n")
+        self.assertEqual(stream.next_line(1)[1], b"123\r\n")
+        self.assertIsNone(stream.next_line(0.1))
+        device.outgoing.put(b"stale\r\n")
+        while stream.n_lines < 3:
+            time.sleep(0.01)
+        stream.mark()
+        self.assertIsNone(stream.next_line(0.1))
+        stream.stop()
+        self.assertFalse(stream.thread.is_alive())
+
+
+class TestBridge12Queries(unittest.TestCase):
+    def test_garbage_is_skipped_and_queries_are_pipelined(self):
+        device = FakeB12({b"rxpowerdbm?\r": [50, 51, 50]})
+        b = fake_bridge12(device)
+        device.garbage = [b"Power updated\r\n", b"(front panel)\r\n"]
+        self.assertAlmostEqual(b.rxpowerdbm_float(), 5.0 + 1 / 30)
+        self.assertEqual(len(device.writes), 3)
+        self.assertEqual(b.recent_ints(b"rxpowerdbm?\r"), [50, 51, 50])
+        b._stream.stop()
+
+    def test_inconsistent_reads_ask_for_more(self):
+        device = FakeB12({b"power?\r": [100, 130, 130]})
+        b = fake_bridge12(device)
+        self.assertEqual(b.power_int(), 130)
+        self.assertEqual(len(device.writes), 3)
+        b._stream.stop()
+
+
+class TestConsensus(unittest.TestCase):
+    def test_outliers_are_rejected(self):
+        estimate, err = consensus_estimate([50, 51, 90, 50, 51], n=3, tol=1)
+        self.assertAlmostEqual(estimate, 50.5)
+        self.assertAlmostEqual(err, np.std([50, 51, 50, 51], ddof=1) / 2)
+        self.assertIsNone(consensus_estimate([50, 53, 56], n=3, tol=1))
+
+    def test_noisy_rx_gives_up(self):
+        device = FakeB12({b"rxpowerdbm?\r": [50, 55, 60, 65, 70, 75, 80]})
+        b = fake_bridge12(device)
+        b.consensus_settings = {
+            b"rxpowerdbm?\r": dict(n=3, tol=1, max_reads=5)
+        }
+        with self.assertRaises(ValueError):
+            b.rxpowerdbm_float()
+        self.assertEqual(len(device.writes), 5)
+        b._stream.stop()
+
+    def test_tx_burns_readings(self):
+        device = FakeB12({b"txpowerdbm?\r": [0, 0, 0, 101, 101]})
+        b = fake_bridge12(device)
+        self.assertEqual(
+            b.txpowerdbm_float(return_uncertainty=True), (10.1, 0.0)
+        )
+        b._stream.stop()
+
+
+class TestAdaptiveSweep(unittest.TestCase):
+    def test_points_concentrate_on_the_dip(self):
+        device = DipB12()
+        b = fake_bridge12(device)
+        b.cur_pwr_int = 100
+        b.frq_sweep_10dBm_has_been_run = False
+        b.tuning_curve_data = {}
+        freq, rx, tx = b.adaptive_freq_sweep(
+            np.r_[9.81e9:9.83e9:9j], n_refine=8
+        )
+        self.assertTrue(b.frq_sweep_10dBm_has_been_run)
+        self.assertLess(abs(freq[rx.argmin()] - device.f0), 0.2e6)
+        self.assertEqual(len(freq), 17)
+        self.assertTrue(np.all(np.isnan(tx)))
+        self.assertNotIn(b"txpowerdbm?\r", device.writes)
+        # the small steps of the refinement aren't read back
+        self.assertLess(device.writes.count(b"freq?\r"), len(freq) - 2)
+        np.testing.assert_array_equal(b.tuning_curve_data["10dBm_freq"], freq)
+        b._stream.stop()
+
+    def test_lock_on_dip_sweeps_adaptively(self):
+        device = DipB12()
+        b = fake_bridge12(device)
+        b.cur_pwr_int = 100
+        b.frq_sweep_10dBm_has_been_run = False
+        b.tuning_curve_data = {}
+        b.fit_data = {}
+        for j in ["set_wg", "set_rf", "set_amp"]:
+            setattr(b, j, lambda setting: None)
+
+        def set_power(dBm):
+            b.cur_pwr_int = int(dBm * 10 + 0.5)
+
+        b.set_power = set_power
+        rx, tx, center = b.lock_on_dip()
+        self.assertLess(abs(center - device.f0), 0.1e6)
+        self.assertTrue(np.all(np.isnan(tx)))
+        self.assertNotIn(b"txpowerdbm?\r", device.writes)
+        self.assertEqual(
+            sorted(b.tuning_curve_data)[:3],
+            ["10dBm_freq", "10dBm_rx", "10dBm_tx"],
+        )
+        b._stream.stop()
+
+
+class FakePortInfo:
+    def __init__(self, device, description, hwid):
+        self.device = device
+        self.description = description
+        self.hwid = hwid
+
+    def usb_info(self):
+        return self.hwid
+
+
+class TestBridge12Boot(unittest.TestCase):
+    def test_boot_messages_in_any_order(self):
+        device = FakeB12({})
+        b = fake_bridge12(device)
+        for j in [
+            b"MPS Started\r\n",
+            b"Power updated\r\n",
+            b"some other status\r\n",
+            b"Synthesizer detected\r\n",
+            b"System Ready\r\n",
+        ]:
+            device.outgoing.put(j)
+        b.bridge12_wait(timeout=5)
+        device.outgoing.put(b"MPS Started\r\n")
+        start = time.monotonic()
+        with self.assertRaises(RuntimeError):
+            b.bridge12_wait(timeout=0.3)
+        self.assertLess(time.monotonic() - start, 1)
+        b._stream.stop()
+
+    def test_port_is_cached(self):
+        ports = [
+            FakePortInfo("/dev/ttyS0", "n/a", "PNP0501"),
+            FakePortInfo(
+                "/dev/ttyACM0", "Arduino Due", "USB VID:PID=2A03:003D"
+            ),
+        ]
+        n_calls = []
+
+        def fake_comports():
+            n_calls.append(1)
+            return iter(ports)
+
+        original = bridge12_module.comports
+        bridge12_module.comports = fake_comports
+        try:
+            Bridge12._cached_port = None
+            self.assertEqual(Bridge12.find_port(), "/dev/ttyACM0")
+            self.assertEqual(len(n_calls), 1)
+            ports[1].description = "renamed"
+            self.assertEqual(Bridge12.find_port(), "/dev/ttyACM0")
+            # a stale cache means searching again
+            ports[1].description = "Arduino Due"
+            Bridge12._cached_port = ("/dev/ttyACM1", "PNP0501")
+            self.assertEqual(Bridge12.find_port(), "/dev/ttyACM0")
+            self.assertEqual(len(n_calls), 3)
+        finally:
+            bridge12_module.comports = original
+            Bridge12._cached_port = None
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+from Instruments.dip_tracker import dip_tracker
+
+
+class FakeBridge12:
+    """Stand-in for a Bridge12 feeding a cavity whose dip is at `f0`"""
+
+    def __init__(self, f0, freq, freq_bounds=(9.0e9, 10.0e9)):
+        self.f0 = f0
+        self.freq = freq
+        self.freq_bounds = freq_bounds
+        self.n_verified = 0
+
+    def set_freq(self, Hz, verify=True):
+        # like the Bridge12
+        assert self.freq_bounds[0] <= Hz <= self.freq_bounds[1]
+        self.freq = Hz
+        self.n_verified += verify
+
+    def freq_step_is_small(self, Hz):
+        return abs(Hz - self.freq) <= 1e6
+
+    def get_freq(self):
+        return self.freq
+
+    def rxpowerdbm_float(self):
+        return 10 - 8 / (1 + ((self.freq - self.f0) / 1e6) ** 2)
+
+
+class TestDipTracker(unittest.TestCase):
+    def test_follows_a_drifting_dip(self):
+        b = FakeBridge12(f0=9.8195e9, freq=9.8195e9)
+        tracker = dip_tracker(b, interval=0)
+        for j in range(10):
+            b.f0 += 30e3
+            tracker.step()
+        self.assertAlmostEqual(tracker.center, b.f0, delta=2e3)
+        self.assertAlmostEqual(b.freq, tracker.center)
+        self.assertAlmostEqual(tracker.drift, 300e3, delta=2e3)
+        self.assertEqual(len(tracker.history_array), 10)
+        # only the return to the center is read back
+        self.assertEqual(b.n_verified, 10)
+
+    def test_moves_are_bounded(self):
+        b = FakeBridge12(f0=9.8195e9, freq=9.8195e9)
+        tracker = dip_tracker(b, max_step=0.1e6, max_drift=0.15e6)
+        b.f0 += 1e6
+        self.assertEqual(tracker.step_if_due(), 9.8196e9)
+        self.assertIsNone(tracker.step_if_due())
+        tracker.step()
+        self.assertEqual(tracker.center, 9.81965e9)
+
+    def test_probes_stay_in_bounds(self):
+        b = FakeBridge12(
+            f0=9.8195e9, freq=9.8195e9, freq_bounds=(9.8e9, 9.8195e9)
+        )
+        tracker = dip_tracker(b, interval=0)
+        b.f0 = 9.8193e9
+        for j in range(5):
+            tracker.step()
+        self.assertAlmostEqual(tracker.center, b.f0, delta=2e3)
+        # now, the dip moves past the upper bound, and the center sits on it
+        b.f0 = 9.8205e9
+        for j in range(20):
+            tracker.step()
+        self.assertEqual(tracker.center, 9.8195e9)
+        self.assertFalse(tracker.stopped)
+
+    def test_failures_stop_tracking(self):
+        b = FakeBridge12(f0=9.8195e9, freq=9.8195e9)
+        tracker = dip_tracker(b, interval=0)
+
+        def broken():
+            raise IOError("no reply")
+
+        b.rxpowerdbm_float = broken
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(tracker.step_if_due())
+        self.assertTrue(tracker.stopped)
+        self.assertIsNone(tracker.step_if_due())
+
+    def test_hold(self):
+        b = FakeBridge12(f0=9.8195e9, freq=9.8195e9)
+        tracker = dip_tracker(b, interval=0)
+        tracker.hold()
+        self.assertIsNone(tracker.step_if_due())
+        self.assertEqual(len(tracker.history), 0)
+        tracker.resume()
+        self.assertIsNotNone(tracker.step_if_due())
+
+
+if __name__ == "__main__":
+    unittest.main()
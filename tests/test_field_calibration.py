@@ -0,0 +1,43 @@
+import pathlib
+import tempfile
+import unittest
+
+from Instruments.field_calibration import field_calibration
+
+
+class TestFieldCalibration(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = str(pathlib.Path(self.tempdir.name) / "cal.h5")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_interpolates_between_recent_points(self):
+        cal = field_calibration(self.filename)
+        with self.assertRaises(ValueError):
+            cal.lookup(3500.0)
+        cal.add(3400.0, 20.0, 1.0, timestamp=1)
+        cal.add(3500.0, 21.0, 2.0, timestamp=2)
+        cal.add(3600.0, 22.5, 3.0, timestamp=3)
+        cal.add(3500.2, 21.2, 2.5, timestamp=4)  # supersedes 3500 G
+        # the table persists
+        cal = field_calibration(self.filename)
+        self.assertEqual(len(cal), 4)
+        self.assertEqual(len(cal.points), 3)
+        current, Z0 = cal.lookup(3550.1)
+        self.assertAlmostEqual(current, 21.85)
+        self.assertAlmostEqual(Z0, 2.75)
+        current, Z0 = cal.lookup(3450.1)
+        self.assertAlmostEqual(current, 20.6)
+
+    def test_extrapolates_with_the_nearest_ratio(self):
+        cal = field_calibration(self.filename)
+        cal.add(3500.0, 21.0, 2.0)
+        current, Z0 = cal.lookup(3000.0)
+        self.assertAlmostEqual(current, 18.0)
+        self.assertEqual(Z0, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
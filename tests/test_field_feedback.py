@@ -0,0 +1,152 @@
+import unittest
+
+import numpy as np
+
+from conftest import FakeClock
+import Instruments.field_feedback as field_feedback
+
+
+def simulate(schedule, I_start, tau, dt):
+    """the effective current (that the field follows) after each setting of
+    `schedule`, for a magnet with a first-order lag"""
+    I_eff = I_start
+    retval = []
+    for I_set in schedule:
+        I_eff = I_set + (I_eff - I_set) * np.exp(-dt / tau)
+        retval.append(I_eff)
+    return np.array(retval)
+
+
+class TestMagnetCurrentSchedule(unittest.TestCase):
+    def test_large_step_arrives_early_and_within_limits(self):
+        tau, dt = 20.0, 0.05
+        schedule = field_feedback.magnet_current_schedule(
+            10.0, 20.0, tau, dt, max_step_A=0.5, max_overshoot_A=2.0
+        )
+        I_eff = simulate(schedule, 10.0, tau, dt)
+        self.assertEqual(schedule[-1], 20.0)
+        self.assertAlmostEqual(I_eff[-1], 20.0, delta=2e-3)
+        self.assertLessEqual(schedule.max(), 22.0)
+        self.assertLessEqual(np.abs(np.diff(np.r_[10.0, schedule])).max(), 0.5)
+        # the field doesn't overshoot
+        self.assertLess(I_eff.max(), 20.0 + 2e-3)
+        # with a 2 A overshoot, the lag is cut from many time constants
+        # (ln(10 A / 1 mA) = 9.2) to ln(12 / 2) = 1.8
+        self.assertLess(len(schedule) * dt, 2 * tau)
+
+    def test_respects_the_current_limit(self):
+        schedule = field_feedback.magnet_current_schedule(
+            20.0, 24.5, 5.0, 0.1, max_overshoot_A=2.0
+        )
+        self.assertLessEqual(schedule.max(), 25.0)
+        schedule = field_feedback.magnet_current_schedule(
+            1.0, 0.0, 5.0, 0.1, max_overshoot_A=2.0
+        )
+        self.assertGreaterEqual(schedule.min(), 0.0)
+        with self.assertRaises(ValueError):
+            field_feedback.magnet_current_schedule(20.0, 26.0, 5.0, 0.1)
+
+    def test_no_change(self):
+        schedule = field_feedback.magnet_current_schedule(5.0, 5.0, 20.0, 0.05)
+        np.testing.assert_array_equal(schedule, [5.0])
+
+
+class SlowSupply:
+    """Stands in for the Genesys, where setting the current takes `delay`
+    (on `clock`)."""
+
+    def __init__(self, clock, delay):
+        self.clock = clock
+        self.delay = delay
+        self.settings = []
+
+    @property
+    def I_limit(self):
+        return self.settings[-1]
+
+    @I_limit.setter
+    def I_limit(self, value):
+        self.clock.now += self.delay
+        self.settings.append((self.clock.now, value))
+
+
+class TestFollowSchedule(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.real_time = field_feedback.time
+        field_feedback.time = self.clock
+
+    def tearDown(self):
+        field_feedback.time = self.real_time
+
+    def test_keeps_to_the_schedule(self):
+        gen = SlowSupply(self.clock, 0.1)
+        expected = field_feedback.magnet_current_schedule(10.0, 15.0, 20, 1.0)
+        actual = field_feedback._follow_schedule(gen, 10.0, 15.0, 20, 1.0)
+        np.testing.assert_allclose(actual, expected)
+        self.assertEqual([I for t, I in gen.settings], list(expected))
+        self.assertAlmostEqual(self.clock.now, 1000.0 + len(expected))
+
+    def test_slow_writes_never_skip(self):
+        gen = SlowSupply(self.clock, 2.5)
+        actual = field_feedback._follow_schedule(
+            gen, 10.0, 15.0, 20, 1.0, max_step_A=0.5, max_overshoot_A=2.0
+        )
+        settings = np.array([I for t, I in gen.settings])
+        np.testing.assert_allclose(settings, actual)
+        # the ramp runs late, but every step stays within the limit, and
+        # the current stays within the overshoot
+        self.assertLessEqual(abs(np.diff(np.r_[10.0, settings])).max(), 0.5)
+        self.assertLessEqual(settings.max(), 17.0)
+        self.assertEqual(settings[-1], 15.0)
+        # with the settings held for longer, the field has caught up by
+        # the end of the ramp
+        times = np.array([t for t, I in gen.settings])
+        I_eff = 10.0
+        for j in range(len(settings) - 1):
+            I_eff = settings[j] + (I_eff - settings[j]) * np.exp(
+                -(times[j + 1] - times[j]) / 20
+            )
+        self.assertAlmostEqual(I_eff, 15.0, delta=0.1)
+
+
+class TestSettleDetector(unittest.TestCase):
+    def feed(self, detector, fields, dt=0.1):
+        for j, B in enumerate(fields):
+            detector.add(B, t=j * dt)
+
+    def test_quiet_field_settles_on_min_samples(self):
+        d = field_feedback.settle_detector(0.1, target_G=3500.0)
+        self.feed(d, [3500.01, 3499.99, 3500.02])
+        self.assertFalse(d.settled)
+        d.add(3500.0, t=0.3)
+        self.assertTrue(d.settled)
+        stats = d.stats
+        self.assertEqual(stats["n"], 4)
+        self.assertAlmostEqual(stats["mean_G"], 3500.005)
+        self.assertLess(stats["sem_G"], 0.01)
+
+    def test_one_noisy_reading_does_not_start_over(self):
+        readings = [3500.0, 3500.01, 3500.02, 3499.93, 3500.0, 3500.01]
+        d = field_feedback.settle_detector(0.1, target_G=3500.0)
+        self.feed(d, readings)
+        self.assertTrue(d.settled)
+
+    def test_drift_and_offset(self):
+        d = field_feedback.settle_detector(0.1, target_G=3500.0)
+        self.feed(d, 3500 + np.r_[0:8] * 0.03)
+        self.assertFalse(d.settled)
+        self.assertFalse(d.off_target)  # still moving
+        d.reset()
+        self.feed(d, [3500.5, 3500.51, 3500.49, 3500.5])
+        self.assertFalse(d.settled)
+        self.assertTrue(d.off_target)
+        # without a target, only the drift matters
+        d = field_feedback.settle_detector(0.1)
+        self.feed(d, [3500.5, 3500.51, 3500.49, 3500.5])
+        self.assertTrue(d.settled)
+        self.assertFalse(d.off_target)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import importlib
+import unittest
+
+import numpy as np
+
+from conftest import FakeClock
+from Instruments.field_lock import field_lock
+from Instruments.field_sampler import field_sampler
+
+# (as attributes of Instruments, these are the classes)
+field_lock_module = importlib.import_module("Instruments.field_lock")
+field_sampler_module = importlib.import_module("Instruments.field_sampler")
+
+
+class FakeMagnet:
+    """A magnet whose field drifts linearly, plus 0.43 G per V on Z0, read
+    by a Hall probe; Z0 is set in steps of 1 mV."""
+
+    def __init__(self, clock, drift_G_s=-5e-4):
+        self.clock = clock
+        self.drift_G_s = drift_G_s
+        self.start = clock.now
+        self.Z0 = 1.0
+        self.n_writes = 0
+        self.V_limit = self  # so that shims.V_limit["Z0"] works
+
+    def __getitem__(self, shim_name):
+        return self.Z0
+
+    def __setitem__(self, shim_name, V):
+        self.n_writes += 1
+        self.Z0 = V
+
+    def round_to_allowed(self, which_limit, shim_name, V):
+        return round(float(V), 3)
+
+    @property
+    def field_in_G(self):
+        return (
+            3500.0
+            + self.drift_G_s * (self.clock.now - self.start)
+            + 0.43 * (self.Z0 - 1.0)
+        )
+
+
+class TestFieldLock(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.real_times = field_lock_module.time, field_sampler_module.time
+        field_lock_module.time = self.clock
+        field_sampler_module.time = self.clock
+
+    def tearDown(self):
+        field_lock_module.time, field_sampler_module.time = self.real_times
+
+    def run_for(self, seconds, fs, lock, step=0.25):
+        for j in range(int(seconds / step)):
+            self.clock.now += step
+            fs.sample_if_due()
+            lock.step_if_due()
+
+    def test_lock_follows_drift_and_holds(self):
+        magnet = FakeMagnet(self.clock)
+        fs = field_sampler(magnet)
+        lock = field_lock(fs, magnet, 3500.0, 0.43, max_V=10.0)
+        # an hour of drift is 1.8 G -- the lock should absorb it
+        self.run_for(3600, fs, lock)
+        self.assertLess(abs(fs.mean(60) - 3500.0), 0.05)
+        self.assertAlmostEqual(magnet.Z0, 1 + 1.8 / 0.43, delta=0.05)
+        self.assertFalse(lock.saturated)
+        self.assertEqual(len(lock.history_array), 1800)
+        # while held, Z0 doesn't change
+        lock.hold()
+        writes, Z0 = magnet.n_writes, magnet.Z0
+        self.run_for(60, fs, lock)
+        self.assertEqual(magnet.n_writes, writes)
+        self.assertEqual(magnet.Z0, Z0)
+        lock.resume()
+        self.run_for(600, fs, lock)
+        self.assertLess(abs(fs.mean(60) - 3500.0), 0.05)
+
+    def test_resume_does_not_kick(self):
+        magnet = FakeMagnet(self.clock, drift_G_s=-5e-3)
+        fs = field_sampler(magnet)
+        lock = field_lock(fs, magnet, 3500.0, 0.43, Ki=0.0, max_V=10.0)
+        self.run_for(60, fs, lock)
+        lock.hold()
+        self.run_for(60, fs, lock)  # the field drifts by 0.3 G
+        Z0 = magnet.Z0
+        lock.resume()
+        self.run_for(2, fs, lock)
+        # with only proportional gain, the error that built up during the
+        # hold isn't corrected -- only the drift since the resume
+        self.assertLess(abs(magnet.Z0 - Z0), 0.02)
+
+    def test_default_range(self):
+        magnet = FakeMagnet(self.clock)
+        lock = field_lock(field_sampler(magnet), magnet, 3500.0, 0.43)
+        self.assertEqual((lock.min_V, lock.max_V), (0.0, 6.0))
+
+    def test_steps_are_rate_limited_and_saturate(self):
+        magnet = FakeMagnet(self.clock, drift_G_s=0)
+        magnet.Z0 = 1.0
+        fs = field_sampler(magnet)
+        lock = field_lock(fs, magnet, 3505.0, 0.43, max_step_V=0.05, max_V=3.0)
+        self.run_for(60, fs, lock)
+        steps = np.diff(np.r_[1.0, lock.history_array["Z0"]])
+        self.assertLessEqual(abs(steps).max(), 0.05 + 1e-9)
+        self.run_for(600, fs, lock)
+        self.assertEqual(magnet.Z0, 3.0)
+        self.assertTrue(lock.saturated)
+        # no windup -- as soon as the target is reachable, we come off the
+        # limit
+        lock.target_G = 3500.0
+        self.run_for(10, fs, lock)
+        self.assertLess(magnet.Z0, 3.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
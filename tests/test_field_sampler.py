@@ -0,0 +1,88 @@
+import importlib
+import unittest
+
+import numpy as np
+
+from conftest import FakeClock
+from Instruments.field_sampler import field_sampler
+
+# (Instruments.field_sampler, as an attribute, is the class)
+field_sampler_module = importlib.import_module("Instruments.field_sampler")
+
+
+class FakeHallProbe:
+    """Returns successive entries of `fields`, and counts the reads."""
+
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self.n_reads = 0
+        self.zeroed = False
+
+    @property
+    def field_in_G(self):
+        self.n_reads += 1
+        return self.fields.pop(0)
+
+    def zero_probe(self):
+        self.zeroed = True
+
+
+class TestFieldSampler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.real_time = field_sampler_module.time
+        field_sampler_module.time = self.clock
+
+    def tearDown(self):
+        field_sampler_module.time = self.real_time
+
+    def run_for(self, fs, seconds, step=0.0625):
+        for j in range(int(round(seconds / step))):
+            self.clock.now += step
+            fs.sample_if_due()
+
+    def test_samples_at_a_fixed_rate_and_wraps(self):
+        h = FakeHallProbe(3500 + np.r_[0:100] * 0.01)
+        fs = field_sampler(h, interval=0.25, maxlen=8)
+        self.run_for(fs, 5)
+        self.assertEqual(h.n_reads, 20)
+        self.assertEqual(len(fs), 8)
+        times, fields = fs.window()
+        self.assertTrue(np.all(np.diff(times) > 0))
+        np.testing.assert_allclose(fields, 3500 + np.r_[12:20] * 0.01)
+        # recent readings come from the buffer
+        self.assertAlmostEqual(fs.latest(max_age=1), 3500.19)
+        self.assertEqual(h.n_reads, 20)
+        self.assertEqual(len(fs.history(1.0)), 4)
+        self.assertAlmostEqual(fs.mean(0.5), 3500.185)
+
+    def test_stale_latest_reads_the_probe(self):
+        h = FakeHallProbe([3500.0, 3501.0])
+        fs = field_sampler(h)
+        self.assertEqual(fs.latest(), 3500.0)
+        self.clock.now += 2
+        self.assertEqual(fs.latest(), 3500.0)
+        self.assertEqual(fs.latest(max_age=1), 3501.0)
+        self.assertEqual(fs.mean(1.0), 3501.0)
+
+    def test_stability(self):
+        h = FakeHallProbe([3500.0, 3500.5, 3500.1, 3500.15, 3500.12])
+        fs = field_sampler(h, interval=0.25)
+        self.run_for(fs, 1.25)
+        self.assertFalse(fs.is_stable(0.1, 1.25))
+        self.assertTrue(fs.is_stable(0.1, 0.8))
+        self.assertFalse(fs.is_stable(0.1, 0.3))  # too few readings
+
+    def test_zeroing_clears_the_buffer(self):
+        h = FakeHallProbe([3.0, 0.0])
+        fs = field_sampler(h)
+        fs.sample()
+        fs.zero_probe()
+        self.assertTrue(h.zeroed)
+        self.assertEqual(len(fs), 0)
+        self.assertEqual(fs.field_in_G, 0.0)
+        self.assertEqual(len(fs), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,227 @@
+import unittest
+
+import h5py
+import numpy as np
+
+from conftest import fake_serial_instrument
+from Instruments.gds import GDS_raw_series, GDS_scope
+
+
+def memory_reply(samples, ch=1, vertical_scale=0.1, sampling_period=4e-10):
+    """Build the reply that the scope gives to ``:ACQ<ch>:MEM?``"""
+    preamble = ";".join(
+        [
+            "Format,1.0B",
+            "Memory Length,%d" % len(samples),
+            "Source,CH%d" % ch,
+            "Vertical Units,V",
+            "Vertical Scale,%0.3E" % vertical_scale,
+            "Horizontal Units,S",
+            "Sampling Period,%0.3E" % sampling_period,
+            "Firmware,V1.09",
+            "Waveform Data",
+        ]
+    )
+    data = np.asarray(samples, dtype="i2").tobytes()
+    length = str(len(data)).encode("ascii")
+    return (
+        preamble.encode("ascii")
+        + b";#"
+        + str(len(length)).encode("ascii")
+        + length
+        + data
+        + b"\n"
+    )
+
+
+class FakeScopePort:
+    """Stand-in for the pyserial port of a GDS scope."""
+
+    def __init__(self, memory):
+        """`memory` maps each channel to the reply for ``:ACQ<ch>:MEM?``,
+        or to a list of replies for successive captures."""
+        self.memory = memory
+        self.timeout = None
+        self.pending = b""
+        self.n_reads = 0
+        self.n_single = 0
+        self.trig_state = b"STOP"
+        self.writes = []
+
+    @property
+    def in_waiting(self):
+        return len(self.pending)
+
+    def write(self, text):
+        cmd = text.strip().decode("utf-8")
+        self.writes.append(cmd)
+        if cmd == ":TRIG:STAT?":
+            self.pending += self.trig_state + b"\n"
+        elif cmd.endswith(":STAT?"):
+            self.pending += b"1\n"
+        elif cmd == ":SING":
+            self.n_single += 1
+        elif cmd.endswith(":MEM?"):
+            reply = self.memory[int(cmd[4])]
+            if isinstance(reply, list):
+                reply = reply[self.n_single - 1]
+            self.pending += reply
+
+    def _take(self, n):
+        self.n_reads += 1
+        retval, self.pending = self.pending[:n], self.pending[n:]
+        return retval
+
+    def readline(self):
+        return self._take(self.pending.index(b"\n") + 1)
+
+    def read(self, n=1):
+        return self._take(n)
+
+    def read_until(self, terminator):
+        return self._take(self.pending.index(terminator) + len(terminator))
+
+    def readinto(self, b):
+        data = self._take(len(b))
+        b[: len(data)] = data
+        return len(data)
+
+
+def fake_scope(port):
+    return fake_serial_instrument(GDS_scope, port, "GDS-3254")
+
+
+class TestGDSWaveform(unittest.TestCase):
+    def test_arbitrary_memory_depth(self):
+        """The record length comes from the block header, and the whole
+        exchange takes a handful of reads rather than one per byte."""
+        samples = (np.r_[0:10000] % 2000 - 1000).astype("i2")
+        port = FakeScopePort({1: memory_reply(samples)})
+        d = fake_scope(port).waveform(ch=1)
+        self.assertEqual(d.data.shape, (10000,))
+        np.testing.assert_allclose(d.data, samples / 2.0**15 * 0.1 * 5 * 1.032)
+        np.testing.assert_allclose(d.getaxis("t")[:3], [0, 4e-10, 8e-10])
+        self.assertEqual(d.name(), "CH1")
+        self.assertEqual(port.in_waiting, 0)
+        self.assertLess(port.n_reads, 10)
+
+    def test_block_into_preallocated_buffer(self):
+        """read_block fills a caller-supplied buffer without a copy."""
+        samples = np.r_[-3, -2, -1, 0, 1, 2].astype("i2")
+        reply = memory_reply(samples)
+        port = FakeScopePort({})
+        port.pending = reply[reply.index(b"#") :]
+        out = np.zeros(8, dtype="i2")
+        view = fake_scope(port).read_block(out=out)
+        self.assertEqual(len(view), 12)
+        np.testing.assert_array_equal(out[:6], samples)
+        self.assertEqual(port.pending, b"\n")
+
+    def test_block_header_is_checked(self):
+        port = FakeScopePort({})
+        port.pending = b"#0"
+        with self.assertRaises(ValueError):
+            fake_scope(port).read_block()
+
+
+class TestGDSCapture(unittest.TestCase):
+    def test_channels_from_one_trigger_with_averaging(self):
+        """Each capture arms the scope once and reads every channel; the
+        result is the mean with the standard error of the mean."""
+        t = np.r_[0:500]
+        captures = {
+            2: [memory_reply(t + 10 * j, ch=2) for j in range(4)],
+            3: [memory_reply(-t, ch=3, vertical_scale=0.05)] * 4,
+        }
+        port = FakeScopePort(captures)
+        d = fake_scope(port).capture(channels=[2, 3], n_avg=4)
+        self.assertEqual(port.n_single, 4)
+        self.assertEqual(d.dimlabels, ["ch", "t"])
+        np.testing.assert_array_equal(d.getaxis("ch"), [2, 3])
+        count_2 = 0.1 / 2.0**15 * 5 * 1.032
+        count_3 = 0.05 / 2.0**15 * 5 * 1.032
+        np.testing.assert_allclose(d["ch", 0].data, (t + 15) * count_2)
+        np.testing.assert_allclose(d["ch", 1].data, -t * count_3)
+        expected_sem = np.std(10 * np.r_[0:4], ddof=1) / 2 * count_2
+        np.testing.assert_allclose(d.get_error()[0], expected_sem)
+        np.testing.assert_allclose(d.get_error()[1], 0, atol=1e-15)
+        self.assertEqual(d.get_prop("n_avg"), 4)
+        # one readiness check per capture, not per channel
+        self.assertEqual(
+            len([j for j in port.writes if j.startswith(":ACQ2:STAT")]), 4
+        )
+        self.assertEqual(
+            len([j for j in port.writes if j.startswith(":ACQ3:STAT")]), 0
+        )
+        self.assertEqual(port.writes[-1], ":RUN")
+
+    def test_scope_runs_again_after_a_failed_capture(self):
+        port = FakeScopePort({1: memory_reply(np.r_[0:100].astype("i2"))})
+        port.trig_state = b"SING"
+        with self.assertRaises(RuntimeError):
+            fake_scope(port).capture(timeout=0.05)
+        self.assertEqual(port.writes[-1], ":RUN")
+
+    def test_defaults_are_not_shared(self):
+        """The default channel is 1, and renaming a dimension of one
+        result doesn't change the dimensions of the next."""
+        samples = np.r_[0:100].astype("i2")
+        scope = fake_scope(FakeScopePort({1: memory_reply(samples)}))
+        d = scope.capture()
+        np.testing.assert_array_equal(d.getaxis("ch"), [1])
+        d.rename("ch", "channel")
+        d = scope.waveform(ch=1)
+        d.rename("t", "time")
+        self.assertEqual(scope.waveform(ch=1).dimlabels, ["t"])
+        self.assertEqual(scope.capture().dimlabels, ["ch", "t"])
+
+
+class TestGDSRawSeries(unittest.TestCase):
+    def test_raw_series_scales_lazily_and_round_trips(self):
+        """Raw records stay int16 (also on disk), and are only converted
+        to volts when they are accessed."""
+        t = np.r_[0:300]
+        port = FakeScopePort(
+            {
+                2: [
+                    memory_reply(
+                        t - 100 * j, ch=2, vertical_scale=0.1 * (j + 1)
+                    )
+                    for j in range(5)
+                ]
+            }
+        )
+        g = fake_scope(port)
+        series = GDS_raw_series(array_len=2)
+        for j in range(5):
+            port.n_single += 1
+            self.assertIs(g.waveform(ch=2, raw=series), series)
+        self.assertEqual(len(series), 5)
+        self.assertEqual(series.samples.dtype, np.dtype("i2"))
+        count = 0.1 / 2.0**15 * 5 * 1.032
+        np.testing.assert_allclose(series[3], (t - 300) * 4 * count)
+        np.testing.assert_allclose(series.t[:2], [0, 4e-10])
+        d = series.nddata(slice(1, 3))
+        self.assertEqual(d.dimlabels, ["capture", "t"])
+        np.testing.assert_array_equal(d.getaxis("capture"), [1, 2])
+        np.testing.assert_allclose(d["capture", 1].data, (t - 200) * 3 * count)
+        with h5py.File("raw.h5", "w", driver="core", backing_store=False) as f:
+            series.to_group(f.create_group("noise"))
+            self.assertEqual(f["noise/samples"].dtype, np.dtype("i2"))
+            loaded = GDS_raw_series.from_group(f["noise"])
+        self.assertEqual(len(loaded), 5)
+        self.assertEqual(loaded.name, "CH2")
+        np.testing.assert_allclose(loaded[:], series[:])
+        np.testing.assert_allclose(
+            loaded.nddata(4).data, series.nddata(4).data
+        )
+
+    def test_empty_series_is_not_stored(self):
+        with h5py.File("raw.h5", "w", driver="core", backing_store=False) as f:
+            with self.assertRaises(ValueError):
+                GDS_raw_series().to_group(f.create_group("noise"))
+            self.assertEqual(len(f["noise"]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+
+from conftest import bare_instance
+from Instruments.genesys import genesys
+
+
+class FakeLink:
+    """Stand-in for the VXI-11 link of a Genesys supply.  `stb` is the
+    status byte that it reports, and writes listed in `failing` raise."""
+
+    def __init__(self, stb=0, failing=()):
+        self.stb = stb
+        self.failing = failing
+        self.writes = []
+        self.pending = b""
+
+    def write_raw(self, data):
+        cmd = data.decode("ascii")
+        self.writes.append(cmd)
+        if cmd in self.failing:
+            raise IOError(f"{cmd} timed out")
+        if cmd == "*STB?":
+            self.pending = b"%d\n" % self.stb
+        elif cmd == "*ESR?":
+            self.pending = b"4\n"
+        elif cmd.endswith("?"):
+            self.pending = b"0\n"
+
+    def read_raw(self, num=-1):
+        retval, self.pending = self.pending, b""
+        return retval
+
+
+def fake_genesys(link, interval=0.5):
+    """Build a genesys around `link` without opening a connection."""
+    return bare_instance(
+        genesys,
+        link=None,
+        checking_on=True,
+        _last_status_check=-float("inf"),
+        _status_suspect=False,
+        status_check_interval=interval,
+        write_raw=link.write_raw,
+        read_raw=link.read_raw,
+    )
+
+
+class TestGenesysStatusChecks(unittest.TestCase):
+    def test_status_is_checked_at_most_once_per_interval(self):
+        link = FakeLink()
+        g = fake_genesys(link, interval=60)
+        for j in range(5):
+            g.I_limit = j
+        self.assertEqual(link.writes.count("*STB?"), 1)
+        self.assertEqual(link.writes[0], "*STB?")
+        g = fake_genesys(link, interval=0)
+        link.writes = []
+        g.I_limit = 1
+        g.I_limit = 2
+        self.assertEqual(link.writes.count("*STB?"), 2)
+
+    def test_failed_command_triggers_a_check(self):
+        link = FakeLink(failing=[":CURR 1.000"])
+        g = fake_genesys(link, interval=60)
+        with self.assertRaises(IOError):
+            g.I_limit = 1
+        link.writes = []
+        g.I_limit = 2
+        self.assertEqual(link.writes, ["*STB?", ":CURR 2.000"])
+        link.writes = []
+        g.I_limit = 3
+        self.assertEqual(link.writes, [":CURR 3.000"])
+
+    def test_fault_keeps_being_checked(self):
+        """While the status check fails, every write repeats it, and the
+        checks are back on afterwards."""
+        link = FakeLink(stb=1 << 5)  # ESB
+        g = fake_genesys(link, interval=60)
+        for j in range(2):
+            with self.assertRaises(RuntimeError):
+                g.I_limit = 1
+        self.assertEqual(link.writes.count("*STB?"), 2)
+        self.assertTrue(g.checking_on)
+        link.stb = 0
+        g.I_limit = 1
+        self.assertEqual(link.writes[-2:], ["*STB?", ":CURR 1.000"])
+
+    def test_set_VI_is_one_message(self):
+        link = FakeLink()
+        g = fake_genesys(link, interval=60)
+        g.set_VI(25, 3.5)
+        self.assertEqual(link.writes, ["*STB?", ":VOLT 25.000;:CURR 3.500"])
+
+
+if __name__ == "__main__":
+    unittest.main()
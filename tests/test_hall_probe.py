@@ -0,0 +1,100 @@
+import types
+import unittest
+
+from conftest import bare_instance
+from Instruments.hall_probe import LakeShore475
+
+
+class FakeGPIBSocket:
+    """Stand-in for the socket of a prologix, with a LakeShore 475 behind
+    it that reads `field` in whatever units it's set to."""
+
+    def __init__(self, unit=2, field="0.3500"):
+        self.unit = unit
+        self.field = field
+        self.commands = []
+        self.pending = b""
+
+    def send(self, data):
+        cmd = data.decode("ascii").strip()
+        if cmd.startswith("++"):
+            return
+        self.commands.append(cmd)
+        if cmd == "UNIT?":
+            self.pending = b"%d\r\n" % self.unit
+        elif cmd.startswith("UNIT "):
+            self.unit = int(cmd[5:])
+        elif cmd == "*RST":
+            self.unit = 1
+        elif cmd == "RDGFIELD?":
+            self.pending = self.field.encode("ascii") + b"\r\n"
+
+    def settimeout(self, t):
+        return
+
+    def recv(self, n):
+        retval, self.pending = self.pending, b""
+        return retval
+
+
+def fake_gaussmeter(sock):
+    """Build a LakeShore475 around `sock` without a prologix."""
+    return bare_instance(
+        LakeShore475,
+        address=12,
+        eos=0,
+        prologix_instance=types.SimpleNamespace(
+            current_address=12, current_eos=0
+        ),
+        socket=sock,
+        _has_been_zeroed=True,
+    )
+
+
+class TestLakeShore475Field(unittest.TestCase):
+    def test_units_are_queried_once(self):
+        """Each field reading is one RDGFIELD? round trip once the units
+        are known."""
+        sock = FakeGPIBSocket()
+        h = fake_gaussmeter(sock)
+        for j in range(3):
+            self.assertAlmostEqual(h.field_in_G, 3500.0)
+        self.assertEqual(sock.commands.count("UNIT?"), 1)
+        self.assertEqual(sock.commands.count("RDGFIELD?"), 3)
+        self.assertAlmostEqual(h.field.to("T").magnitude, 0.35)
+        self.assertEqual(sock.commands.count("UNIT?"), 1)
+
+    def test_writing_units_invalidates_the_cache(self):
+        sock = FakeGPIBSocket()
+        h = fake_gaussmeter(sock)
+        self.assertAlmostEqual(h.field_G_fast, 3500.0)
+        h.write("UNIT 1")
+        sock.field = "3499.5"
+        self.assertAlmostEqual(h.field_G_fast, 3499.5)
+        h.unit_code = 2
+        sock.field = "0.35"
+        self.assertAlmostEqual(h.field_G_fast, 3500.0)
+        self.assertEqual(sock.commands.count("UNIT?"), 3)
+
+    def test_reset_invalidates_the_cache(self):
+        sock = FakeGPIBSocket()
+        h = fake_gaussmeter(sock)
+        self.assertAlmostEqual(h.field_G_fast, 3500.0)
+        h.reset()  # back to gauss
+        sock.field = "3499.5"
+        self.assertAlmostEqual(h.field_G_fast, 3499.5)
+        self.assertEqual(sock.commands.count("UNIT?"), 2)
+
+    def test_unknown_units_are_an_error(self):
+        h = fake_gaussmeter(FakeGPIBSocket(unit=7))
+        with self.assertRaises(ValueError):
+            h.field_G_fast
+
+    def test_errors_are_reported(self):
+        h = fake_gaussmeter(FakeGPIBSocket(field="NO PROBE"))
+        with self.assertRaises(ValueError):
+            h.field_G_fast
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import time
+import unittest
+
+import Instruments.power_ramp as power_ramp
+
+
+class FakeBridge12:
+    """Stand-in for a Bridge12 whose Rx only settles `settle_time` seconds
+    after each power step."""
+
+    def __init__(self, settle_time=0.1):
+        self.settle_time = settle_time
+        self.power = 10.0
+        self.steps = []
+        self.last_set = -1
+
+    def power_float(self):
+        return self.power
+
+    def set_power(self, dBm):
+        self.steps.append(dBm)
+        self.power = dBm
+        self.last_set = time.monotonic()
+
+    def rxpowerdbm_float(self):
+        if time.monotonic() - self.last_set < self.settle_time:
+            return self.power / 10 + 50 * (time.monotonic() % 1)
+        return self.power / 10
+
+
+class TestPowerRamp(unittest.TestCase):
+    def test_steps_wait_and_learn(self):
+        b = FakeBridge12()
+        model = power_ramp.settle_model(default=0.01)
+        self.assertTrue(power_ramp.ramp_power(b, 17.5, model))
+        self.assertEqual(b.steps, [13.0, 16.0, 17.5])
+        # the full steps have been learned, and are used for the 1.5 dB one
+        self.assertGreater(model.times[3.0], 0.1)
+        self.assertEqual(model.predict(1.5), model.times[1.5])
+        self.assertGreater(model.predict(2.5), 0.1)
+
+    def test_learns_faster_settling(self):
+        b = FakeBridge12(settle_time=0.05)
+        model = power_ramp.settle_model(default=0.5)
+        for j in range(4):
+            b.power = 10.0
+            self.assertTrue(power_ramp.ramp_power(b, 13.0, model))
+        # the real settle time is much shorter than the default, and the
+        # prediction shrinks toward it
+        self.assertLess(model.predict(3.0), 0.2)
+        self.assertGreater(model.predict(3.0), 0.05)
+
+    def test_timeout(self):
+        b = FakeBridge12(settle_time=10)
+        model = power_ramp.settle_model(default=0.01)
+        self.assertFalse(power_ramp.ramp_power(b, 12, model, timeout=0.2))
+        self.assertEqual(model.times, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,258 @@
+import sys
+import types
+import unittest
+from unittest import mock
+
+import numpy as np
+
+# {{{ Replace the compiled module (which needs the SpinCore drivers) with a
+#     fake board, and then import the real SpinCore_pp package around it --
+#     only while these tests run, so that nothing else sees the fake.
+
+
+class FakeBoard:
+    """Records the calls that the runners make; like the C module,
+    configureTX and init_ppg clear the resident program, and stop_ppg
+    finishes a new one."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = []
+        self.programs = []
+        self.run_args = []
+        self.resident = 0
+        self.count = 0
+
+    def configureTX(self, *args):
+        self.calls.append("configureTX")
+        self.resident = 0
+
+    def configureRX(self, SW_kHz, nPoints, nScans, nEchoes, nPhaseSteps):
+        self.calls.append("configureRX")
+        return nPoints / SW_kHz
+
+    def init_ppg(self):
+        self.calls.append("init_ppg")
+        self.resident = 0
+
+    def load_compiled(self, program):
+        self.calls.append("load_compiled")
+        self.programs.append(program)
+
+    def stop_ppg(self):
+        self.calls.append("stop_ppg")
+        self.count += 1
+        self.resident = self.count
+
+    def resident_ppg(self):
+        return self.resident
+
+    def runBoard(self, expected_s=0.0, poll_s=1e-3, timeout_s=0.0):
+        self.calls.append("runBoard")
+        self.run_args.append((expected_s, timeout_s))
+
+    def getData_into(self, output_array, nPoints, nEchoes, nPhaseSteps):
+        self.calls.append("getData_into")
+        raw = np.arange(2 * nPoints * nEchoes * nPhaseSteps)
+        output_array[:] = raw[0::2] + 1j * raw[1::2]
+
+    def stopBoard(self):
+        self.calls.append("stopBoard")
+
+
+board = FakeBoard()
+compiled_module = types.ModuleType("SpinCore_pp.SpinCore_pp")
+for name in [
+    "configureTX",
+    "configureRX",
+    "init_ppg",
+    "load_compiled",
+    "stop_ppg",
+    "resident_ppg",
+    "runBoard",
+    "getData_into",
+    "stopBoard",
+]:
+    setattr(compiled_module, name, getattr(board, name))
+for name in ["pause", "ppg_element", "load", "getData", "tune", "adc_offset"]:
+    setattr(compiled_module, name, None)  # not used by the runners
+
+# sys.modules (including the SpinCore_pp package that's imported around
+# the fake) goes back to the way it was after the tests
+fake_modules = mock.patch.dict(
+    sys.modules, {"SpinCore_pp.SpinCore_pp": compiled_module}
+)
+
+
+def setUpModule():
+    global compile_ppg, ppg_duration, generic
+    fake_modules.start()
+    for name in list(sys.modules):
+        if (
+            name.split(".")[0] == "SpinCore_pp"
+            and name != compiled_module.__name__
+        ):
+            del sys.modules[name]  # so the package is imported around the fake
+    from SpinCore_pp import compile_ppg, ppg_duration
+    from SpinCore_pp.ppg.generic import generic
+
+
+def tearDownModule():
+    fake_modules.stop()
+
+
+# }}}
+
+ppg_list = [
+    ("phase_reset", 1),
+    ("delay_TTL", 1.0),
+    ("pulse_TTL", 2.0, "ph1", np.r_[0, 1, 2, 3]),
+    ("delay", 10.0),
+    ("acquire", 8.0),
+    ("delay", 1e3),
+]
+
+
+def run(nScans, **kwargs):
+    return generic(
+        ppg_list,
+        nScans=nScans,
+        indirect_idx=0,
+        indirect_len=1,
+        adcOffset=0,
+        carrierFreq_MHz=14.9,
+        nPoints=16,
+        time_per_segment_ms=8.0,
+        SW_kHz=2.0,
+        **kwargs,
+    )
+
+
+class TestCompile(unittest.TestCase):
+    def test_compile(self):
+        program = compile_ppg(
+            [
+                ("phase_reset", 1),
+                ("delay_TTL", 1.0),
+                ("pulse_TTL", 2.0, "ph1", np.r_[0, 1, 2, 3]),
+                ("marker", "echo_label", 4),
+                ("delay", 10.0),
+                ("pulse_TTL", 4.0, 0),
+                ("acquire", 8.0),
+                ("jumpto", "echo_label"),
+                ("delay", 1e3),
+            ]
+        )
+        # the phase cycle repeats the program for each of the 4 phases
+        self.assertEqual(len(program), 4 * 9)
+        np.testing.assert_array_equal(
+            program["opcode"], np.tile([2, 5, 1, 6, 4, 1, 3, 7, 4], 4)
+        )
+        np.testing.assert_array_equal(
+            program["arg1"],
+            np.tile([1.0, 1.0, 2.0, 0.0, 10.0, 4.0, 8.0, 0.0, 1e3], 4),
+        )
+        # the pulse takes its phase from the cycle, and the marker keeps
+        # its repeat count
+        np.testing.assert_array_equal(program["arg2"][2::9], [0, 1, 2, 3])
+        np.testing.assert_array_equal(program["arg2"][3::9], [4] * 4)
+        np.testing.assert_array_equal(program["arg2"][7::9], [0] * 4)
+
+    def test_duration(self):
+        # 8 ms acquisitions, looped 4 times, in each of 4 phase cycle steps
+        program = compile_ppg(
+            [
+                ("phase_reset", 1),
+                ("pulse_TTL", 2.0, "ph1", np.r_[0, 1, 2, 3]),
+                ("marker", "echo_label", 4),
+                ("delay", 10.0),
+                ("acquire", 8.0),
+                ("jumpto", "echo_label"),
+                ("delay", 1e3),
+            ]
+        )
+        loop_us = 1 + 10 + 8e3 + 1
+        self.assertAlmostEqual(
+            ppg_duration(program), 4 * (2 + 2 + 4 * loop_us + 1e3) * 1e-6
+        )
+
+    def test_bad_programs(self):
+        with self.assertRaises(ValueError):
+            compile_ppg([("jumpto", "nowhere"), ("delay", 1.0)])
+        with self.assertRaises(ValueError):
+            compile_ppg([("pulse_sequence", 1.0)])
+
+
+class TestProgramOnce(unittest.TestCase):
+    def setUp(self):
+        board.reset()
+
+    def test_default_programs_every_scan(self):
+        run(3)
+        self.assertEqual(board.calls.count("load_compiled"), 3)
+        # it's compiled once, and the same program is loaded each time
+        for program in board.programs:
+            self.assertIs(program, board.programs[0])
+        np.testing.assert_array_equal(board.programs[0], compile_ppg(ppg_list))
+        self.assertEqual(board.calls.count("configureTX"), 3)
+        self.assertEqual(board.calls.count("runBoard"), 3)
+        # the board is given the length of the scan, and a timeout
+        expected_s = ppg_duration(compile_ppg(ppg_list))
+        self.assertEqual(board.run_args, [(expected_s, expected_s + 10)] * 3)
+        run(1, scan_timeout_s=2.0)
+        self.assertEqual(board.run_args[-1], (expected_s, expected_s + 2))
+
+    def test_programs_once(self):
+        d = run(3, program_once=True)
+        self.assertEqual(board.calls.count("load_compiled"), 1)
+        self.assertEqual(board.calls.count("configureTX"), 1)
+        self.assertEqual(board.calls.count("runBoard"), 3)
+        self.assertEqual(board.calls.count("getData_into"), 3)
+        # every scan lands in its own row of the data
+        raw = np.arange(2 * 16 * 4)
+        expected = raw[0::2] + 1j * raw[1::2]
+        self.assertEqual(d.shape["t"], len(expected))
+        for j in range(3):
+            np.testing.assert_allclose(
+                d["indirect", 0]["nScans", j].data, expected
+            )
+
+    def test_dimensions_must_be_in_order(self):
+        d = run(1)
+        d.reorder("t")
+        with self.assertRaises(ValueError):
+            generic(
+                ppg_list,
+                nScans=1,
+                indirect_idx=1,
+                indirect_len=2,
+                adcOffset=0,
+                carrierFreq_MHz=14.9,
+                nPoints=16,
+                time_per_segment_ms=8.0,
+                SW_kHz=2.0,
+                ret_data=d,
+            )
+
+    def test_reprograms_when_not_resident(self):
+        original_runBoard = board.runBoard
+
+        def runBoard(*args):
+            original_runBoard(*args)
+            if board.calls.count("runBoard") == 2:
+                board.resident = 0  # something else re-initialized it
+
+        sys.modules["SpinCore_pp.ppg.generic"].runBoard = runBoard
+        try:
+            with self.assertLogs(level="WARNING"):
+                run(4, program_once=True)
+        finally:
+            sys.modules["SpinCore_pp.ppg.generic"].runBoard = board.runBoard
+        self.assertEqual(board.calls.count("load_compiled"), 2)
+        self.assertEqual(board.calls.count("runBoard"), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+import threading
+import unittest
+
+from conftest import fake_serial_instrument
+from Instruments.serial_instrument import SerialInstrument
+
+
+class FakePort:
+    """Stand-in for a pyserial port.  `replies` maps each command to the
+    reply the instrument gives, and `slow_reads` gives the number of reads
+    that time out (empty) before the reply shows up."""
+
+    def __init__(self, replies, slow_reads=0):
+        self.replies = replies
+        self.slow_reads = slow_reads
+        self.timeout = 3
+        self.writes = []
+        self.read_timeouts = []
+        self.pending = b""
+        self.blocking_reads = 0
+
+    @property
+    def in_waiting(self):
+        return len(self.pending)
+
+    def write(self, text):
+        self.writes.append(text)
+        self.pending += self.replies[text.strip().decode("utf-8")]
+
+    def readline(self):
+        self.read_timeouts.append(self.timeout)
+        if self.slow_reads > 0:
+            self.slow_reads -= 1
+            return b""
+        line, sep, self.pending = self.pending.partition(b"\n")
+        return line + sep
+
+    def read(self, n):
+        if n > len(self.pending):
+            self.blocking_reads += 1
+        retval, self.pending = self.pending[:n], self.pending[n:]
+        return retval
+
+    def close(self):
+        return
+
+
+class LatePort(FakePort):
+    """A port whose replies show up `latency` seconds after each write, on
+    a simulated clock that only advances while a read waits."""
+
+    def __init__(self, replies, latency):
+        super().__init__(replies)
+        self.latency = latency
+        self.now = 0.0
+        self.scheduled = []  # (arrival time, reply)
+
+    def _arrive(self):
+        while self.scheduled and self.scheduled[0][0] <= self.now:
+            self.pending += self.scheduled.pop(0)[1]
+
+    @property
+    def in_waiting(self):
+        self._arrive()
+        return len(self.pending)
+
+    def write(self, text):
+        self.writes.append(text)
+        self.scheduled.append(
+            (self.now + self.latency, self.replies[text.strip().decode()])
+        )
+
+    def readline(self):
+        self.read_timeouts.append(self.timeout)
+        self._arrive()
+        if b"\n" not in self.pending:
+            if (
+                self.scheduled
+                and self.scheduled[0][0] <= self.now + self.timeout
+            ):
+                self.now = self.scheduled[0][0]
+                self._arrive()
+            else:
+                self.now += self.timeout
+                return b""
+        line, sep, self.pending = self.pending.partition(b"\n")
+        return line + sep
+
+
+def fake_instrument(port, textidn="AFG-2225"):
+    return fake_serial_instrument(SerialInstrument, port, textidn)
+
+
+class TestSerialInstrumentWaits(unittest.TestCase):
+    def test_demand_prompt_reply_is_one_round_trip(self):
+        """An instrument that answers right away costs a single write, and
+        the original timeout is restored."""
+        port = FakePort({"SOUR1:FREQ?": b"+1.0000000E+06\n"})
+        inst = fake_instrument(port)
+        self.assertEqual(inst.demand("SOUR1:FREQ?", 1e6), 1e6)
+        self.assertEqual(len(port.writes), 1)
+        self.assertEqual(port.timeout, 3)
+
+    def test_demand_backs_off_while_busy(self):
+        """While the instrument is busy, each wait doubles the timeout, and
+        late duplicate replies are drained afterwards."""
+        port = FakePort({":CHAN1:DISP?": b"ON\n"}, slow_reads=3)
+        inst = fake_instrument(port)
+        self.assertEqual(inst.demand(":CHAN1:DISP?", "ON"), "ON\n")
+        # then one line is read for each of the 3 resends
+        self.assertEqual(
+            port.read_timeouts, [0.02, 0.04, 0.08, 0.16, 1.0, 1.0, 1.0]
+        )
+        self.assertEqual(port.in_waiting, 0)
+        self.assertEqual(port.blocking_reads, 0)
+
+    def test_late_duplicates_are_not_read_as_the_next_reply(self):
+        """With 100 ms of latency, the replies to the resent queries come
+        after the one that we use, and must not be taken as the reply to
+        the next command."""
+        port = LatePort({"*OPC?": b"1\n", "SOUR1:FREQ?": b"1E6\n"}, 0.1)
+        inst = fake_instrument(port)
+        inst.wait_complete()
+        self.assertEqual(len(port.writes), 3)
+        self.assertEqual(inst.respond("SOUR1:FREQ?"), "1E6\n")
+        self.assertEqual(port.in_waiting, 0)
+        self.assertEqual(port.timeout, 3)
+
+    def test_demand_mismatch_raises(self):
+        port = FakePort({"OUTP1?": b"0\n"})
+        inst = fake_instrument(port)
+        with self.assertRaises(RuntimeError):
+            inst.demand("OUTP1?", 1)
+
+    def test_wait_complete(self):
+        """``*OPC?`` is used to wait, and anything but 1 is an error."""
+        inst = fake_instrument(FakePort({"*OPC?": b"1\n"}))
+        inst.wait_complete()
+        inst = fake_instrument(FakePort({"*OPC?": b"0\n"}))
+        with self.assertRaises(RuntimeError):
+            inst.wait_complete()
+
+    def test_check_idn(self):
+        port = FakePort({"*IDN?": b"GW INSTEK,AFG-2225,GEX,V1.0\n"})
+        inst = fake_instrument(port)
+        self.assertIn("AFG-2225", inst.check_idn())
+        inst = fake_instrument(port, textidn="GDS-3254")
+        with self.assertRaises(AssertionError):
+            inst.check_idn()
+
+    def test_flush_does_not_block_on_empty_port(self):
+        """Flush only ever reads what is already waiting."""
+        port = FakePort({})
+        port.pending = b"garbage\nmore garbage\n"
+        inst = fake_instrument(port)
+        inst.flush()
+        self.assertEqual(port.in_waiting, 0)
+        self.assertEqual(port.blocking_reads, 0)
+
+
+class RendezvousPort(FakePort):
+    """A port whose reply only arrives once the other instrument's port
+    has also been read -- this can only happen if the two are serviced
+    in parallel."""
+
+    def __init__(self, replies, mine, other):
+        super().__init__(replies)
+        self.mine = mine
+        self.other = other
+
+    def readline(self):
+        self.mine.set()
+        if not self.other.wait(timeout=5):
+            return b""
+        return super().readline()
+
+
+class TestSerialInstrumentWorker(unittest.TestCase):
+    def test_queued_calls_run_in_order(self):
+        port = FakePort({"A?": b"a\n", "B?": b"b\n", "C": b""})
+        inst = fake_instrument(port)
+        futures = [
+            inst.respond_async("A?"),
+            inst.write_async("C"),
+            inst.respond_async("B?"),
+        ]
+        self.assertEqual([j.result() for j in futures], ["a\n", None, "b\n"])
+        self.assertEqual(port.writes, [b"A?\n", b"C\n", b"B?\n"])
+        inst.__exit__(None, None, None)
+
+    def test_independent_instruments_overlap(self):
+        """Each port has its own worker, so a slow read on one instrument
+        doesn't hold up the other."""
+        scope_reading, afg_reading = threading.Event(), threading.Event()
+        scope = fake_instrument(
+            RendezvousPort({":ACQ1:STAT?": b"1\n"}, scope_reading, afg_reading)
+        )
+        afg = fake_instrument(
+            RendezvousPort(
+                {"SOUR1:FREQ?": b"1E6\n"}, afg_reading, scope_reading
+            )
+        )
+        scope_result = scope.respond_async(":ACQ1:STAT?")
+        afg_result = afg.respond_async("SOUR1:FREQ?")
+        self.assertEqual(scope_result.result(timeout=10), "1\n")
+        self.assertEqual(afg_result.result(timeout=10), "1E6\n")
+        for j in [scope, afg]:
+            j.__exit__(None, None, None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import inspect
+import pathlib
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from conftest import bare_instance
+from Instruments.bridge12 import Bridge12
+from Instruments.tuning_curve_store import tuning_curve_store
+
+
+def dip(freq, f0):
+    return 10 - 8 / (1 + ((freq - f0) / 1e6) ** 2)
+
+
+class TestTuningCurveStore(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = str(pathlib.Path(self.tempdir.name) / "curves.h5")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_most_recent_compatible_curve(self):
+        store = tuning_curve_store(self.filename)
+        self.assertIsNone(store.latest())
+        now = time.time()
+        wide = np.r_[9.81e9:9.83e9:41j]
+        narrow = np.r_[9.818e9:9.821e9:15j]
+        store.add(wide, dip(wide, 9.8190e9), wide * 0, 10, now - 7200)
+        store.add(wide, dip(wide, 9.8195e9), wide * 0, 10, now - 60)
+        store.add(narrow, dip(narrow, 9.8196e9), narrow * 0, 13, now - 30)
+        # a new store object on the same file sees the same curves
+        store = tuning_curve_store(self.filename)
+        self.assertEqual(len(store.index), 3)
+        curve = store.latest(10, freq_range=(9.812e9, 9.828e9))
+        self.assertEqual(curve["time"], now - 60)
+        np.testing.assert_allclose(curve["freq"], wide)
+        self.assertIsNone(store.latest(10, max_age=10))
+        self.assertEqual(
+            store.latest(freq_range=(9.819e9, 9.82e9))["power"], 13
+        )
+        np.testing.assert_allclose(
+            store.dip_history(10)["dip"], [9.819e9, 9.8195e9]
+        )
+
+    def test_lock_on_dip_reuses_a_fresh_survey(self):
+        """A survey over the grid that lock_on_dip sweeps (which stops one
+        step short of the end of ini_range) is found again."""
+        defaults = inspect.signature(Bridge12.lock_on_dip).parameters
+        ini_range = defaults["ini_range"].default
+        ini_step = defaults["ini_step"].default
+        freq = np.r_[ini_range[0] : ini_range[1] : ini_step]
+        self.assertLess(freq[-1], ini_range[1])
+        tuning_curve_store(self.filename).add(
+            freq, dip(freq, 9.8195e9), freq * 0, 10
+        )
+        cavity = {"f0": 9.8195e9, "freq": None}
+
+        def set_freq(Hz):
+            cavity["freq"] = Hz
+
+        b = bare_instance(
+            Bridge12,
+            is_open=False,
+            tuning_curves=tuning_curve_store(self.filename),
+            tuning_curve_data={},
+            _trust_stored_survey=True,
+            frq_sweep_10dBm_has_been_run=False,
+            survey_max_age=None,
+            set_freq=set_freq,
+            rxpowerdbm_float=lambda: dip(cavity["freq"], cavity["f0"]),
+        )
+        # reuse is opt-in
+        self.assertFalse(b._load_stored_survey(freq))
+        b.survey_max_age = 3600.0
+        self.assertFalse(b._load_stored_survey(freq - 1e7))
+        self.assertTrue(b._load_stored_survey(freq))
+        self.assertTrue(b.frq_sweep_10dBm_has_been_run)
+        np.testing.assert_allclose(b.tuning_curve_data["10dBm_freq"], freq)
+        narrower = np.r_[9.815e9:9.825e9:ini_step]
+        self.assertTrue(b._load_stored_survey(narrower))
+        np.testing.assert_allclose(b.tuning_curve_data["10dBm_freq"], narrower)
+        b._trust_stored_survey = False
+        self.assertFalse(b._load_stored_survey(freq))
+
+    def test_a_stale_survey_is_not_used(self):
+        """If the dip has moved since the survey was stored, the probe
+        around the stored dip catches it."""
+        freq = np.r_[9.81e9:9.83e9:0.5e6]
+        tuning_curve_store(self.filename).add(
+            freq, dip(freq, 9.8195e9), freq * 0, 10
+        )
+        cavity = {"freq": None}
+
+        def set_freq(Hz):
+            cavity["freq"] = Hz
+
+        b = bare_instance(
+            Bridge12,
+            is_open=False,
+            tuning_curves=tuning_curve_store(self.filename),
+            tuning_curve_data={},
+            _trust_stored_survey=True,
+            frq_sweep_10dBm_has_been_run=False,
+            survey_max_age=3600.0,
+            set_freq=set_freq,
+            rxpowerdbm_float=lambda: dip(cavity["freq"], 9.8215e9),
+        )
+        with self.assertLogs(level="INFO"):
+            self.assertFalse(b._load_stored_survey(freq))
+        self.assertFalse(b.frq_sweep_10dBm_has_been_run)
+
+
+if __name__ == "__main__":
+    unittest.main()